@@ -0,0 +1,120 @@
+"""
+Запросы к открытым заявкам в зависимости от накопленной истории: до и после переноса закрытых заявок
+в 'approvals_archive' (ApprovalDB.archive_closed, как в budget_bot/archive.py).
+
+В базе --open открытых заявок вперемешку с оплаченными и отклонёнными, закрытыми год назад.
+Измеряются первая страница /show_not_paid (find_not_paid), страница /approve_batch (find_by_status),
+чтение открытой заявки по id и, после переноса, чтение заявки из архива. Для переноса выводится
+самая долгая пачка - столько соединение с базой и блокировка записи SQLite недоступны обработчикам.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_archive [кол-во закрытых заявок ...] [--open 100] [--batch 500]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from benchmarks.common import make_record, temporary_database
+
+from db import db
+from db.db import CLOSED_STATUSES
+from budget_bot.accruals import record_accruals
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+CHUNK = 50_000
+ROUNDS = 200
+YEAR = 365 * 86400
+
+
+async def fill(closed: int, open_count: int, rnd: random.Random) -> list[int]:
+    """Заполняет базу; возвращает id открытых заявок."""
+
+    total, open_ids = closed + open_count, []
+    open_positions = set(rnd.sample(range(total), open_count))
+    async with db:
+        for start in range(0, total, CHUNK):
+            positions = range(start, min(start + CHUNK, total))
+            statuses = [
+                "Not processed" if position in open_positions else rnd.choice(CLOSED_STATUSES)
+                for position in positions
+            ]
+            records = [make_record(status=status) for status in statuses]
+            ids = await db.insert_records(records, [record_accruals(record) for record in records])
+            open_ids.extend(approval_id for approval_id, status in zip(ids, statuses) if status == "Not processed")
+        await db._cursor.execute(
+            "UPDATE approvals SET closed_at = ? WHERE status IN (?, ?)", (time.time() - YEAR, *CLOSED_STATUSES)
+        )
+        await db._conn.commit()
+    return open_ids
+
+
+async def median_ms(query) -> float:
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        async with db:
+            await query()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+async def measure(open_ids: list[int], rnd: random.Random) -> tuple[float, float, float]:
+    """Медианы, мс: find_not_paid, find_by_status, get_row_by_id открытой заявки."""
+
+    return (
+        await median_ms(lambda: db.find_not_paid(limit=11)),
+        await median_ms(lambda: db.find_by_status("Not processed", limit=21)),
+        await median_ms(lambda: db.get_row_by_id(rnd.choice(open_ids))),
+    )
+
+
+async def archive(batch_size: int) -> tuple[int, float, float]:
+    """Переносит все закрытые заявки пачками: (перенесено, общее время, с; самая долгая пачка, мс)."""
+
+    moved, batches, started = 0, [], time.perf_counter()
+    while True:
+        batch_started = time.perf_counter()
+        async with db:
+            batch = await db.archive_closed(time.time() - YEAR / 2, batch_size)
+        batches.append(time.perf_counter() - batch_started)
+        moved += batch
+        if batch < batch_size:
+            return moved, time.perf_counter() - started, max(batches) * 1000
+
+
+async def main(sizes: list[int], open_count: int, batch_size: int) -> None:
+    print(f"открытых заявок: {open_count}, пачка переноса: {batch_size}, медиана из {ROUNDS} запросов")
+    print(
+        f"{'закрытых':>10} {'архив':>6} {'not_paid, мс':>13} {'by_status, мс':>14} {'по id, мс':>10} "
+        f"{'из архива, мс':>14}"
+    )
+    for size in sizes:
+        rnd = random.Random(size)
+        async with temporary_database("archive.db"):
+            open_ids = await fill(size, open_count, rnd)
+            not_paid, by_status, by_id = await measure(open_ids, rnd)
+            print(f"{size:>10} {'нет':>6} {not_paid:>13.3f} {by_status:>14.3f} {by_id:>10.3f} {'-':>14}")
+
+            moved, elapsed, longest = await archive(batch_size)
+            archived_id = next(approval_id for approval_id in range(1, size + 2) if approval_id not in open_ids)
+            from_archive = await median_ms(lambda: db.get_row_by_id(archived_id))
+            not_paid, by_status, by_id = await measure(open_ids, rnd)
+            print(f"{size:>10} {'да':>6} {not_paid:>13.3f} {by_status:>14.3f} {by_id:>10.3f} {from_archive:>14.3f}")
+            async with db:
+                result = await db._cursor.execute("SELECT COUNT(*) FROM approvals")
+                (hot_rows,) = await result.fetchone()
+        print(
+            f"{'':>10} перенесено {moved} за {elapsed:.1f} с, самая долгая пачка {longest:.1f} мс, "
+            f"в 'approvals' осталось {hot_rows}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("sizes", type=int, nargs="*", default=list(DEFAULT_SIZES))
+    parser.add_argument("--open", type=int, default=100)
+    parser.add_argument("--batch", type=int, default=500)
+    arguments = parser.parse_args()
+    asyncio.run(main(arguments.sizes, arguments.open, arguments.batch))
@@ -0,0 +1,101 @@
+"""
+Пропускная способность загрузки пакета заявок: прежний путь /submit_record (разбор регулярным выражением
+и insert_record на каждую заявку) и загрузка документа (чтение CSV, сверка со справочником, один executemany).
+База создаётся во временном каталоге, Telegram и Google Sheets не используются.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_bulk [кол-во строк ...]
+"""
+import asyncio
+import random
+import re
+import sys
+import time
+
+from benchmarks.common import make_record, temporary_database
+
+from db import db
+from budget_bot.accruals import record_accruals
+from budget_bot.bulk import parse_bulk_rows, read_csv_rows
+from budget_bot.catalog import Catalog
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+SUBMIT_PATTERN = (
+    r"((?:0|[1-9]\d*)(?:\.\d+)?)\s*;\s*([^;]+)\s*;\s*([^;]+)\s*;\s*([^;]+)\s*;\s*([^;]+)\s*;"
+    r"\s*((?:\d{2}\.\d{2}\s*){1,})\s*;\s*([^;]+)$"
+)
+
+
+def make_catalog() -> Catalog:
+    """Справочник из 50 статей по 10 групп и 20 партнёров."""
+
+    return Catalog({
+        f"Статья {i}": {f"Группа {j}": [f"Партнёр {i}-{j}-{k}" for k in range(20)] for j in range(10)}
+        for i in range(50)
+    })
+
+
+def make_csv(catalog: Catalog, lines: int, seed: int = 42) -> bytes:
+    rnd = random.Random(seed)
+    rows = ["сумма;статья;группа;партнёр;комментарий;период;форма оплаты"]
+    for n in range(lines):
+        i = rnd.randrange(len(catalog.items))
+        j = rnd.randrange(len(catalog.groups[i]))
+        partner = rnd.choice(catalog.partners[i][j])
+        rows.append(
+            f"{rnd.randint(100, 100000)};{catalog.items[i]};{catalog.groups[i][j]};{partner};"
+            f"счёт {n};{rnd.randint(1, 12):02d}.24;безнал"
+        )
+    return "\n".join(rows).encode()
+
+
+async def submit_one_by_one(content: bytes) -> int:
+    """Прежний путь: каждая строка разбирается как аргументы /submit_record и вставляется отдельно."""
+
+    inserted = 0
+    for line in content.decode().splitlines()[1:]:
+        match = re.match(SUBMIT_PATTERN, line)
+        record = make_record(
+            amount=match.group(1),
+            expense_item=match.group(2),
+            expense_group=match.group(3),
+            partner=match.group(4),
+            comment=match.group(5),
+            period=match.group(6),
+            payment_method=match.group(7),
+            approvals_needed=1 if float(match.group(1)) < 50000 else 2,
+        )
+        async with db:
+            await db.insert_record(record, record_accruals(record))
+        inserted += 1
+    return inserted
+
+
+async def submit_document(content: bytes, catalog: Catalog) -> int:
+    records, errors = parse_bulk_rows(read_csv_rows(content), catalog)
+    assert not errors, errors[:3]
+    async with db:
+        ids = await db.insert_records(records, [record_accruals(record) for record in records])
+    return len(ids)
+
+
+async def main(sizes: tuple[int, ...]) -> None:
+    catalog = make_catalog()
+    print(f"{'строк':>8} {'по одной, строк/с':>18} {'документом, строк/с':>20} {'ускорение':>10}")
+    for lines in sizes:
+        content = make_csv(catalog, lines)
+        async with temporary_database("one.db"):
+            started = time.perf_counter()
+            assert await submit_one_by_one(content) == lines
+            one_by_one = time.perf_counter() - started
+
+        async with temporary_database("bulk.db"):
+            started = time.perf_counter()
+            assert await submit_document(content, catalog) == lines
+            bulk = time.perf_counter() - started
+
+        print(f"{lines:>8} {lines / one_by_one:>18.0f} {lines / bulk:>20.0f} {one_by_one / bulk:>9.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(tuple(map(int, sys.argv[1:])) or DEFAULT_SIZES))
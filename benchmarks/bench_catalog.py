@@ -0,0 +1,85 @@
+"""
+Сравнение построения справочника категорий: прежний обход DataFrame.iterrows и build_catalog.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_catalog [кол-во строк ...]
+"""
+import random
+import sys
+import time
+import tracemalloc
+
+import benchmarks.common  # noqa: F401 - заглушки переменных окружения до импорта config
+
+import pandas as pd
+
+from budget_bot.sheets import build_catalog
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+
+
+def build_catalog_iterrows(records: list[dict]) -> tuple[dict[str, dict[str, list[str]]], list[str]]:
+    """Прежняя реализация GoogleSheetsManager.get_data, сохранена для сравнения."""
+
+    df = pd.DataFrame(records)
+    unique_items = df["Статья"].unique()
+    data_structure = {}
+
+    for _, row in df.iterrows():
+        category = row["Статья"]
+        group = row["Группа"]
+        partner = row["Партнер"]
+
+        if category not in data_structure:
+            data_structure[category] = {}
+
+        if group not in data_structure[category]:
+            data_structure[category][group] = []
+
+        data_structure[category][group].append(partner)
+
+    return data_structure, unique_items
+
+
+def make_records(rows: int, seed: int = 42) -> list[dict]:
+    """Синтетический лист "категории" в формате get_all_records."""
+
+    rnd = random.Random(seed)
+    items = [f"Статья {i}" for i in range(max(rows // 1000, 5))]
+    groups = [f"Группа {i}" for i in range(max(rows // 200, 10))]
+    return [
+        {"Статья": rnd.choice(items), "Группа": rnd.choice(groups), "Партнер": f"Партнёр {i}"}
+        for i in range(rows)
+    ]
+
+
+def measure(func, records: list[dict]) -> tuple[float, int, tuple]:
+    """Время выполнения в секундах и пиковое потребление памяти в байтах."""
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(records)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main(sizes: tuple[int, ...]) -> None:
+    print(f"{'строк':>10} {'iterrows, с':>12} {'MiB':>8} {'build_catalog, с':>17} {'MiB':>8} {'ускорение':>10}")
+    for rows in sizes:
+        records = make_records(rows)
+        old_time, old_peak, old_result = measure(build_catalog_iterrows, records)
+        new_time, new_peak, new_result = measure(build_catalog, records)
+
+        assert old_result[0] == new_result[0], "Справочники различаются"
+        assert list(old_result[1]) == list(new_result[1]), "Списки статей различаются"
+
+        print(
+            f"{rows:>10} {old_time:>12.3f} {old_peak / 2**20:>8.1f} "
+            f"{new_time:>17.3f} {new_peak / 2**20:>8.1f} {old_time / new_time:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(tuple(map(int, sys.argv[1:])) or DEFAULT_SIZES)
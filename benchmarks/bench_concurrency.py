@@ -0,0 +1,149 @@
+"""
+Нагрузочный тест параллельной обработки обновлений (concurrent_updates с PerUserUpdateProcessor).
+
+1. Пропускная способность: все пользователи одновременно проходят путь заявки из bench_e2e при разных
+   значениях concurrent_updates. Лимиты отправки Telegram (20 сообщений в минуту в группу, 30 в секунду
+   на бота) по умолчанию сняты, иначе число заявок в секунду ограничивает доставка уведомлений в группы,
+   а не обработка обновлений. Задержку обработчиков при действующих лимитах показывает bench_e2e.
+2. Гонки: по каждой из --races заявок одновременно приходят "Одобрить" и "Отклонить" от разных глав отдела,
+   а затем --payers плательщиков одновременно нажимают "Оплачено". Каждая заявка должна перейти
+   ровно в одно состояние и попасть в таблицу ровно один раз.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_concurrency [--users 64] [--levels 1 4 16 64] [--races 200] [--payers 5]
+        [--telegram-limits]
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+
+from benchmarks.common import make_record
+from benchmarks.bench_e2e import HEAD_USER, PAYER_USER, running_application, run_flows
+from config.config import Config
+from config.logging_config import logger
+from db import db
+from budget_bot.accruals import record_accruals
+from budget_bot import rate_limit
+from budget_bot.concurrency import approval_locks
+
+TELEGRAM_LATENCY = 0.05
+SHEETS_LATENCY = 0.3
+INITIATOR_CHAT_ID = 555
+
+
+def lift_telegram_limits() -> None:
+    """Снимает ограничения TelegramRateLimiter: фиктивный Telegram не ограничивает частоту отправки."""
+
+    rate_limit.GROUP_CHAT_RATE = rate_limit.PRIVATE_CHAT_RATE = rate_limit.GLOBAL_RATE = 1_000_000
+    rate_limit.telegram_limiter._global = rate_limit.TokenBucket(1_000_000, 1_000_000)
+    rate_limit.telegram_limiter._chats.clear()
+
+
+async def throughput(users: int, concurrent_updates: int) -> tuple[float, float]:
+    """Заявок в секунду и p95 задержки обработки обновления, мс."""
+
+    async with running_application(users, TELEGRAM_LATENCY, SHEETS_LATENCY, concurrent_updates) as (
+            driver, spreadsheet
+    ):
+        elapsed = await run_flows(driver, spreadsheet, rounds=1)
+    latencies = sorted(value for values in driver.latencies.values() for value in values)
+    return users / elapsed, latencies[int(len(latencies) * 0.95)] * 1000
+
+
+async def races(count: int, payers: int, concurrent_updates: int) -> None:
+    async with running_application(1, TELEGRAM_LATENCY, SHEETS_LATENCY, concurrent_updates) as (
+            driver, spreadsheet
+    ):
+        async with db:
+            records = [
+                make_record(amount=str(1000 + number), comment=f"гонка {number}", period="01.26")
+                for number in range(count)
+            ]
+            approval_ids = await db.insert_records(records, [record_accruals(record) for record in records])
+
+        # Отказы в переходе из-за уже обработанной заявки здесь ожидаемы
+        logger.setLevel(logging.ERROR)
+        rnd = random.Random(0)
+        presses = []
+        for approval_id in approval_ids:
+            # У каждого нажатия свой пользователь: нажатия одного пользователя выполняются по очереди
+            pair = [
+                ("approve", {**HEAD_USER, "id": HEAD_USER["id"] + 1_000 + approval_id * 2}),
+                ("reject", {**HEAD_USER, "id": HEAD_USER["id"] + 1_001 + approval_id * 2}),
+            ]
+            rnd.shuffle(pair)
+            presses.extend((action, user, approval_id) for action, user in pair)
+
+        head_chat, payers_chat = Config.department_head_chat_id[0], Config.payers_chat_ids[0]
+        message = {"message_id": 1, "date": int(time.time()), "chat": {"id": head_chat, "type": "group"}, "text": "-"}
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            driver.callback(action, user, message, f"approval_head_{action}_{approval_id}_{INITIATOR_CHAT_ID}")
+            for action, user, approval_id in presses
+        ))
+
+        pay_buttons = Counter(
+            button["callback_data"]
+            for sent in driver.telegram.messages[payers_chat]
+            for row in sent.get("reply_markup", {}).get("inline_keyboard", [])
+            for button in row
+        )
+        payer_message = {**message, "chat": {"id": payers_chat, "type": "group"}}
+        await asyncio.gather(*(
+            driver.callback("pay", {**PAYER_USER, "id": PAYER_USER["id"] + 100_000 + number}, payer_message, data)
+            for number, data in enumerate(data for data in pay_buttons for _ in range(payers))
+        ))
+        elapsed = time.perf_counter() - started
+
+        deadline = time.monotonic() + 30
+        while len(spreadsheet.appended_rows) < len(pay_buttons) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.5)
+
+        async with db:
+            statuses = Counter()
+            for approval_id in approval_ids:
+                statuses[(await db.get_row_by_id(approval_id))["status"]] += 1
+
+    edited = driver.telegram.edited_texts
+    approved = sum(text.startswith("Запрос на платеж одобрен") for text in edited)
+    rejected = sum(text.endswith("отклонена руководителем департамента.") for text in edited)
+    paid = sum(text.endswith("оплачена.") for text in edited)
+    rows = len(spreadsheet.appended_rows)
+    double = (approved + rejected - count) + sum(hits - 1 for hits in pay_buttons.values()) + (rows - paid)
+
+    print(f"\nгонки: {count} заявок, одновременно 'Одобрить' + 'Отклонить', затем {payers} нажатий 'Оплачено'")
+    print(f"обновлений: {count * 2 + len(pay_buttons) * payers} за {elapsed:.2f} с")
+    print(f"одобрено: {approved}, отклонено: {rejected}, оплачено: {paid}, строк в таблице: {rows}")
+    print(f"статусы в базе: {dict(statuses)}")
+    print(f"двойных переходов: {double}, блокировок в реестре после теста: {len(approval_locks)}")
+
+
+async def main(users: int, levels: list[int], race_count: int, payers: int, telegram_limits: bool) -> None:
+    if not telegram_limits:
+        lift_telegram_limits()
+    print(
+        f"пользователей: {users}, задержка Telegram: {TELEGRAM_LATENCY * 1000:.0f} мс, "
+        f"Google Sheets: {SHEETS_LATENCY * 1000:.0f} мс, лимиты Telegram: {'да' if telegram_limits else 'сняты'}"
+    )
+    print(f"{'concurrent_updates':>19} {'заявок/с':>9} {'p95, мс':>9} {'ускорение':>10}")
+    baseline = None
+    for level in levels:
+        rate, p95 = await throughput(users, level)
+        baseline = baseline or rate
+        print(f"{level:>19} {rate:>9.2f} {p95:>9.0f} {rate / baseline:>9.1f}x")
+    await races(race_count, payers, max(levels))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=64)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--races", type=int, default=200)
+    parser.add_argument("--payers", type=int, default=5)
+    parser.add_argument("--telegram-limits", action="store_true", help="не снимать лимиты отправки Telegram")
+    arguments = parser.parse_args()
+    asyncio.run(main(arguments.users, arguments.levels, arguments.races, arguments.payers, arguments.telegram_limits))
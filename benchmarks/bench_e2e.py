@@ -0,0 +1,339 @@
+"""
+Сквозной офлайн-бенчмарк: приложение из budget_bot.main.build_application обрабатывает синтетические обновления
+без обращений к Telegram и Google. Запросы к Bot API принимает фиктивный транспорт FakeTelegram с задержкой
+--telegram-latency, Google Sheets заменён фиктивными таблицей и листами с задержкой --sheets-latency.
+
+Каждый из --users пользователей --rounds раз проходит /enter_record до подтверждения, затем глава отдела
+одобряет заявку, а плательщик нажимает "Оплачено". Обновления передаются в update_processor приложения,
+как это делает PTB при получении обновлений, поэтому учитывается и настройка concurrent_updates.
+Задержка - время от передачи обновления до окончания его обработки, включая ожидание очереди.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_e2e [--users 20] [--rounds 1] [--telegram-latency 0.05] [--sheets-latency 0.3]
+        [--concurrent-updates 32]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+import statistics
+import time
+import warnings
+from collections import Counter, defaultdict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from benchmarks.common import temporary_db_file
+
+from telegram import Update
+from telegram.request import BaseRequest
+
+from config.config import Config
+from config.logging_config import logger
+from budget_bot.main import build_application
+from budget_bot.sheets import sheets_client
+
+BOT_USER = {"id": 1_000_000, "is_bot": True, "first_name": "Бенчмарк", "username": "bench_bot"}
+FIRST_USER_ID = 10_000
+HEAD_USER = {"id": 900, "is_bot": False, "first_name": "Глава", "username": "head"}
+PAYER_USER = {"id": 901, "is_bot": False, "first_name": "Плательщик", "username": "payer"}
+BUTTON_TIMEOUT = 60
+
+
+class FakeTelegram(BaseRequest):
+    """
+    Транспорт Bot API в памяти: отвечает на каждый запрос после паузы latency и запоминает
+    отправленные сообщения по чатам, чтобы бенчмарк мог нажимать кнопки из них.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self.messages: dict[int, list[dict]] = defaultdict(list)
+        self.edited_texts: list[str] = []
+        self._message_ids = itertools.count(1)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url: str, method: str, request_data=None, *args, **kwargs) -> tuple[int, bytes]:
+        endpoint = url.rsplit("/", 1)[-1]
+        parameters = request_data.parameters if request_data is not None else {}
+        self.calls[endpoint] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        result = True
+        if endpoint == "getMe":
+            result = BOT_USER
+        elif endpoint == "sendMessage":
+            chat_id = int(parameters["chat_id"])
+            result = {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "group"},
+                "from": BOT_USER,
+                "text": parameters["text"],
+            }
+            markup = parameters.get("reply_markup")
+            markup = json.loads(markup) if isinstance(markup, str) else markup
+            # Telegram возвращает в сообщении только inline-клавиатуру, callback_data - всегда строкой
+            if markup and "inline_keyboard" in markup:
+                for row in markup["inline_keyboard"]:
+                    for button in row:
+                        if "callback_data" in button:
+                            button["callback_data"] = str(button["callback_data"])
+                result["reply_markup"] = markup
+            self.messages[chat_id].append(result)
+        elif endpoint == "editMessageText":
+            self.edited_texts.append(parameters["text"])
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+    def find_button(self, chat_id: int, predicate) -> tuple[dict, str] | None:
+        """Последнее сообщение в чате с кнопкой, callback_data которой удовлетворяет predicate."""
+
+        for message in reversed(self.messages[chat_id]):
+            for row in message.get("reply_markup", {}).get("inline_keyboard", []):
+                for button in row:
+                    if predicate(button.get("callback_data", "")):
+                        return message, button["callback_data"]
+        return None
+
+
+class FakeWorksheet:
+    def __init__(self, sheet_id: int, records: list[dict], latency: float):
+        self.id = sheet_id
+        self.records = records
+        self.latency = latency
+
+    async def get_all_records(self) -> list[dict]:
+        await asyncio.sleep(self.latency)
+        return self.records
+
+
+class FakeSpreadsheet:
+    """Таблица с листом записей (id 0) и листом категорий; batch_update копит добавленные строки."""
+
+    def __init__(self, records: list[dict], latency: float):
+        self.latency = latency
+        self.appended_rows: list[dict] = []
+        self._records_sheet = FakeWorksheet(0, [], latency)
+        self._categories_sheet = FakeWorksheet(int(Config.google_sheets_categories_sheet_id), records, latency)
+
+    async def get_worksheet_by_id(self, sheet_id: int) -> FakeWorksheet:
+        await asyncio.sleep(self.latency)
+        if str(sheet_id) == str(Config.google_sheets_categories_sheet_id):
+            return self._categories_sheet
+        return self._records_sheet
+
+    async def batch_update(self, body: dict) -> None:
+        await asyncio.sleep(self.latency)
+        for request in body["requests"]:
+            self.appended_rows.extend(request["appendCells"]["rows"])
+
+
+class FakeClientManager:
+    """Замена CountingClientManager: авторизация без сети, одна и та же таблица на любой ключ."""
+
+    def __init__(self, spreadsheet: FakeSpreadsheet):
+        self.spreadsheet = spreadsheet
+
+    async def authorize(self) -> "FakeClientManager":
+        return self
+
+    async def open_by_key(self, spreadsheet_id: str) -> FakeSpreadsheet:
+        return self.spreadsheet
+
+
+def make_categories(items: int = 10, groups: int = 5, partners: int = 10) -> list[dict]:
+    return [
+        {"Статья": f"Статья {i}", "Группа": f"Группа {j}", "Партнер": f"Партнёр {i}-{j}-{k}"}
+        for i in range(items)
+        for j in range(groups)
+        for k in range(partners)
+    ]
+
+
+class Driver:
+    """Формирует обновления от имени пользователей и передаёт их приложению, замеряя задержку обработки."""
+
+    def __init__(self, application, telegram: FakeTelegram):
+        self.application = application
+        self.telegram = telegram
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self._update_ids = itertools.count(1)
+
+    async def send(self, step: str, data: dict) -> None:
+        update_id = next(self._update_ids)
+        update = Update.de_json({"update_id": update_id, **data}, self.application.bot)
+        started = time.perf_counter()
+        await self.application.update_processor.process_update(update, self.application.process_update(update))
+        self.latencies[step].append(time.perf_counter() - started)
+
+    async def message(self, step: str, user: dict, text: str) -> None:
+        message = {
+            "message_id": next(self._update_ids),
+            "date": int(time.time()),
+            "chat": {"id": user["id"], "type": "private"},
+            "from": user,
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        await self.send(step, {"message": message})
+
+    async def press(self, step: str, user: dict, chat_id: int, predicate) -> str:
+        """
+        Нажатие кнопки в чате chat_id. Уведомления в группы рассылаются в фоне (handlers.notify_chats),
+        поэтому кнопка ожидается до BUTTON_TIMEOUT секунд.
+        """
+
+        deadline = time.monotonic() + BUTTON_TIMEOUT
+        while (found := self.telegram.find_button(chat_id, predicate)) is None:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{step}: в чате {chat_id} нет нужной кнопки")
+            await asyncio.sleep(0.01)
+        message, callback_data = found
+        await self.callback(step, user, message, callback_data)
+        return callback_data
+
+    async def callback(self, step: str, user: dict, message: dict, callback_data: str) -> None:
+        """Нажатие кнопки с callback_data под сообщением message."""
+
+        await self.send(step, {
+            "callback_query": {
+                "id": str(next(self._update_ids)),
+                "from": user,
+                "chat_instance": str(message["chat"]["id"]),
+                "data": callback_data,
+                "message": message,
+            }
+        })
+
+    async def record_flow(self, user_id: int, rnd: random.Random) -> None:
+        """Полный путь одной заявки: ввод через диалог, одобрение главой отдела, оплата."""
+
+        user = {"id": user_id, "is_bot": False, "first_name": f"Пользователь {user_id}", "username": f"u{user_id}"}
+        head_chat, payers_chat = Config.department_head_chat_id[0], Config.payers_chat_ids[0]
+
+        await self.message("enter_record", user, "/enter_record")
+        await self.message("input_sum", user, str(rnd.randint(100, 49_999)))
+        item, group, partner = str(rnd.randrange(10)), str(rnd.randrange(5)), str(rnd.randrange(10))
+        await self.press("input_item", user, user_id, lambda data: data == item)
+        await self.press("input_group", user, user_id, lambda data: data == group)
+        await self.press("input_partner", user, user_id, lambda data: data == partner)
+        await self.message("input_comment", user, f"бенчмарк {user_id}")
+        await self.message("input_dates", user, f"{rnd.randint(1, 12):02d}.26")
+        await self.press("input_payment_type", user, user_id, lambda data: data == "0")
+        await self.press("confirm", user, user_id, lambda data: data == "Подтвердить")
+
+        approve = await self.press(
+            "approval", HEAD_USER, head_chat,
+            lambda data: data.startswith("approval_head_approve_") and data.endswith(f"_{user_id}"),
+        )
+        approval_id = approve.split("_")[3]
+        await self.press("pay", PAYER_USER, payers_chat, lambda data: data == f"pay_{approval_id}")
+
+
+def percentiles(values: list[float]) -> tuple[float, float, float]:
+    if len(values) < 2:
+        value = values[0] * 1000 if values else 0.0
+        return value, value, value
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000
+
+
+@asynccontextmanager
+async def running_application(
+        users: int, telegram_latency: float, sheets_latency: float, concurrent_updates: int
+) -> AsyncIterator[tuple[Driver, FakeSpreadsheet]]:
+    """
+    Запущенное приложение с фиктивными Telegram и Google Sheets и временной базой данных.
+    Пользователи FIRST_USER_ID ... FIRST_USER_ID + users - 1 добавляются в белый список.
+    """
+
+    logger.setLevel(logging.WARNING)
+    warnings.filterwarnings("ignore", module="telegram")
+    Config.white_list = set(range(FIRST_USER_ID, FIRST_USER_ID + users))
+    Config.concurrent_updates = concurrent_updates
+
+    spreadsheet = FakeSpreadsheet(make_categories(), sheets_latency)
+    sheets_client._agcm = FakeClientManager(spreadsheet)
+    telegram = FakeTelegram(telegram_latency)
+
+    with temporary_db_file():
+        application = build_application(request=telegram)
+        await application.initialize()
+        await application.post_init(application)
+        await application.start()
+        try:
+            yield Driver(application, telegram), spreadsheet
+        finally:
+            await application.stop()
+            await application.shutdown()
+            await application.post_shutdown(application)
+
+
+async def run_flows(driver: Driver, spreadsheet: FakeSpreadsheet, rounds: int) -> float:
+    """Все пользователи белого списка одновременно проходят record_flow rounds раз. Возвращает время, с."""
+
+    started = time.perf_counter()
+    for round_number in range(rounds):
+        await asyncio.gather(*(
+            driver.record_flow(user_id, random.Random(user_id * 1000 + round_number))
+            for user_id in Config.white_list
+        ))
+    elapsed = time.perf_counter() - started
+
+    # Выгрузка в таблицу идёт в фоне; ждём, пока все оплаты попадут в лист
+    deadline = time.monotonic() + 30
+    while len(spreadsheet.appended_rows) < len(Config.white_list) * rounds and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    return elapsed
+
+
+async def main(
+        users: int, rounds: int, telegram_latency: float, sheets_latency: float, concurrent_updates: int
+) -> None:
+    async with running_application(users, telegram_latency, sheets_latency, concurrent_updates) as (
+            driver, spreadsheet
+    ):
+        elapsed = await run_flows(driver, spreadsheet, rounds)
+    telegram = driver.telegram
+
+    updates = sum(len(values) for values in driver.latencies.values())
+    print(
+        f"пользователей: {users}, проходов: {rounds}, задержка Telegram: {telegram_latency * 1000:.0f} мс, "
+        f"Google Sheets: {sheets_latency * 1000:.0f} мс, concurrent_updates: {concurrent_updates}"
+    )
+    print(f"{'шаг':>20} {'обновлений':>11} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9}")
+    for step, values in [*driver.latencies.items(), ("всего", [v for vs in driver.latencies.values() for v in vs])]:
+        p50, p95, p99 = percentiles(values)
+        print(f"{step:>20} {len(values):>11} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f}")
+    print(f"обновлений в секунду: {updates / elapsed:.1f}, заявок в секунду: {users * rounds / elapsed:.1f}")
+    print(
+        f"запросов к Bot API: {sum(telegram.calls.values())}, "
+        f"строк выгружено в таблицу: {len(spreadsheet.appended_rows)} (ожидалось {users * rounds})"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--telegram-latency", type=float, default=0.05, help="задержка ответа Bot API, с")
+    parser.add_argument("--sheets-latency", type=float, default=0.3, help="задержка запроса к Google Sheets, с")
+    parser.add_argument("--concurrent-updates", type=int, default=Config.concurrent_updates)
+    arguments = parser.parse_args()
+    asyncio.run(main(
+        arguments.users,
+        arguments.rounds,
+        arguments.telegram_latency,
+        arguments.sheets_latency,
+        arguments.concurrent_updates,
+    ))
@@ -0,0 +1,135 @@
+"""
+Задержка рассылки send_message_to_chats в зависимости от числа получателей.
+Вместо Telegram используется бот-заглушка с фиксированной задержкой ответа.
+
+Затем проверяется обработка ошибок: часть получателей сначала отвечает RetryAfter, один - RetryAfter
+на каждую попытку, ещё несколько - Forbidden. Ожидается, что ограниченные чаты получают сообщение
+после повторов, попыток не больше max_retries + 1, остальные получатели не затронуты, а send_message_to_chats
+возвращает ошибки ровно по недоставленным чатам. При расхождении скрипт завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_fanout [задержка ответа, мс]
+"""
+import asyncio
+import sys
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import benchmarks.common  # noqa: F401 - заглушки переменных окружения до импорта config
+
+from telegram.error import Forbidden, RetryAfter
+
+from budget_bot.handlers import send_message_to_chats
+from budget_bot.rate_limit import telegram_limiter
+
+RECIPIENTS = (1, 3, 10, 20, 30)
+# Получатели проверки ошибок: chat_id -> сколько раз подряд Telegram отвечает RetryAfter
+THROTTLED = {100_001: 1, 100_002: 2, 100_003: 1}
+ALWAYS_THROTTLED = 100_004
+FORBIDDEN = (100_005, 100_006)
+DELIVERED = tuple(range(100_010, 100_030))
+
+
+class FakeBot:
+    """Бот, отвечающий на send_message через delay секунд."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.sent = 0
+
+    async def send_message(self, chat_id: int, text: str, reply_markup=None) -> None:
+        await asyncio.sleep(self.delay)
+        self.sent += 1
+
+
+class FailingBot(FakeBot):
+    """
+    Бот, который отвечает RetryAfter в чаты из throttled (заданное число раз подряд), в чат always_throttled -
+    на каждую попытку, и Forbidden в чаты из forbidden. Число попыток по чатам копится в attempts.
+    """
+
+    def __init__(self, delay: float, throttled: dict[int, int], always_throttled: int, forbidden: tuple[int, ...]):
+        super().__init__(delay)
+        self.throttled = dict(throttled)
+        self.always_throttled = always_throttled
+        self.forbidden = forbidden
+        self.attempts: Counter[int] = Counter()
+        self.delivered: Counter[int] = Counter()
+
+    async def send_message(self, chat_id: int, text: str, reply_markup=None) -> None:
+        self.attempts[chat_id] += 1
+        await asyncio.sleep(self.delay)
+        if chat_id in self.forbidden:
+            raise Forbidden("Forbidden: bot was blocked by the user")
+        if chat_id == self.always_throttled or self.throttled.get(chat_id, 0) > 0:
+            self.throttled[chat_id] = self.throttled.get(chat_id, 0) - 1
+            raise RetryAfter(1)
+        self.sent += 1
+        self.delivered[chat_id] += 1
+
+
+async def check_failures(delay: float) -> int:
+    """Рассылка с ошибками: печатает результаты проверок и возвращает число неудачных."""
+
+    chat_ids = [*THROTTLED, ALWAYS_THROTTLED, *FORBIDDEN, *DELIVERED]
+    bot = FailingBot(delay, THROTTLED, ALWAYS_THROTTLED, FORBIDDEN)
+    retries_before = telegram_limiter.retries
+
+    started = time.perf_counter()
+    failures = await send_message_to_chats(chat_ids, "test", SimpleNamespace(bot=bot))
+    elapsed = time.perf_counter() - started
+
+    max_attempts = telegram_limiter.max_retries + 1
+    checks = {
+        "доставлено после RetryAfter": all(bot.delivered[chat_id] == 1 for chat_id in THROTTLED),
+        "попыток в ограниченные чаты": all(bot.attempts[chat_id] == times + 1 for chat_id, times in THROTTLED.items()),
+        f"не больше {max_attempts} попыток при постоянном RetryAfter": bot.attempts[ALWAYS_THROTTLED] == max_attempts,
+        "повторов в счётчике ограничителя": (
+            telegram_limiter.retries - retries_before == sum(THROTTLED.values()) + telegram_limiter.max_retries
+        ),
+        "Forbidden без повторов": all(bot.attempts[chat_id] == 1 for chat_id in FORBIDDEN),
+        "остальные доставлены один раз": all(bot.delivered[chat_id] == 1 for chat_id in DELIVERED),
+        "ошибки по недоставленным чатам": (
+            set(failures) == {ALWAYS_THROTTLED, *FORBIDDEN}
+            and isinstance(failures[ALWAYS_THROTTLED], RetryAfter)
+            and all(isinstance(failures[chat_id], Forbidden) for chat_id in FORBIDDEN)
+        ),
+    }
+
+    print(f"\nрассылка в {len(chat_ids)} чатов с ошибками: {elapsed:.1f} с")
+    for check, passed in checks.items():
+        print(f"{'ok' if passed else 'ОШИБКА':>6}  {check}")
+    return sum(not passed for passed in checks.values())
+
+
+async def send_sequentially(chat_ids: list[int], text: str, context) -> None:
+    """Прежняя реализация рассылки: по одному чату за раз."""
+
+    for chat_id in chat_ids:
+        await context.bot.send_message(chat_id=chat_id, text=text, reply_markup=None)
+
+
+async def main(delay: float) -> int:
+    print(f"{'получателей':>12} {'по очереди, мс':>15} {'параллельно, мс':>16}")
+    for count in RECIPIENTS:
+        # Отдельный диапазон chat_id на каждый замер, чтобы лимиты на чат не влияли на следующий
+        chat_ids = list(range(count * 1000, count * 1000 + count))
+        context = SimpleNamespace(bot=FakeBot(delay))
+
+        started = time.perf_counter()
+        await send_sequentially(chat_ids, "test", context)
+        sequential = time.perf_counter() - started
+
+        await asyncio.sleep(1)  # пополнение общего лимита на бота
+        started = time.perf_counter()
+        await send_message_to_chats(chat_ids, "test", context)
+        concurrent = time.perf_counter() - started
+
+        print(f"{count:>12} {sequential * 1000:>15.0f} {concurrent * 1000:>16.0f}")
+
+    return 1 if await check_failures(delay) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.1)))
@@ -0,0 +1,89 @@
+"""
+Время построения FuzzyIndex и ответа на inline-запрос по справочнику из заданного числа партнёров.
+Запросы - начала названий, названия с опечаткой и сочетания "партнёр статья"; "найдено" - доля запросов,
+в ответе на которые есть партнёр, из названия которого составлен запрос.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_inline [кол-во партнёров ...]
+"""
+import random
+import statistics
+import sys
+import time
+
+import benchmarks.common  # noqa: F401 - заглушки переменных окружения до импорта config
+
+from budget_bot.catalog import Catalog
+
+DEFAULT_SIZES = (10_000, 100_000)
+QUERIES = 1_000
+LIMIT = 20
+SYLLABLES = ("ро", "ма", "шка", "тех", "снаб", "ком", "торг", "строй", "про", "лес", "мед", "авто", "ин", "вест", "газ")
+FORMS = ("ООО", "ИП", "АО", "ЗАО")
+
+
+def make_name(rnd: random.Random) -> str:
+    word = "".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 4))).capitalize()
+    return f"{rnd.choice(FORMS)} {word} {rnd.randint(1, 999)}"
+
+
+def make_catalog(partners: int, seed: int = 42) -> Catalog:
+    rnd = random.Random(seed)
+    items = [f"Статья {i}" for i in range(100)]
+    options = {item: {f"Группа {j}": [] for j in range(10)} for item in items}
+    for _ in range(partners):
+        options[rnd.choice(items)][f"Группа {rnd.randrange(10)}"].append(make_name(rnd))
+    return Catalog(options)
+
+
+def make_queries(catalog: Catalog, seed: int = 7) -> list[tuple[str, str]]:
+    """
+    Пары (запрос, партнёр). Треть запросов - название без последних 0-3 символов,
+    треть - название без формы собственности с опечаткой, треть - "название статья".
+    """
+
+    rnd = random.Random(seed)
+    entries = [
+        (item, partner)
+        for i, item in enumerate(catalog.items)
+        for partners in catalog.partners[i]
+        for partner in partners
+    ]
+    queries = []
+    for number in range(QUERIES):
+        item, partner = rnd.choice(entries)
+        _, word, suffix = partner.split()
+        if number % 3 == 0:
+            queries.append((partner[:len(partner) - rnd.randint(0, 3)], partner))
+        elif number % 3 == 1:
+            position = rnd.randrange(1, len(word))
+            queries.append((f"{word[:position]}{rnd.choice('аоеиу')}{word[position + 1:]} {suffix}", partner))
+        else:
+            queries.append((f"{word.lower()} {suffix} {item.lower()}", partner))
+    return queries
+
+
+def main(sizes: tuple[int, ...]) -> None:
+    print(f"{'партнёров':>10} {'построение, с':>14} {'p50, мс':>8} {'p95, мс':>8} {'p99, мс':>8} {'найдено':>8}")
+    for size in sizes:
+        catalog = make_catalog(size)
+        started = time.perf_counter()
+        index = catalog.fuzzy_index
+        build = time.perf_counter() - started
+
+        timings, hits = [], 0
+        for query, partner in make_queries(catalog):
+            started = time.perf_counter()
+            found = index.search(query, LIMIT)
+            timings.append((time.perf_counter() - started) * 1000)
+            hits += any(len(path) == 3 and catalog.partners[path[0]][path[1]][path[2]] == partner for path in found)
+
+        percentiles = statistics.quantiles(timings, n=100)
+        print(
+            f"{size:>10} {build:>14.2f} {percentiles[49]:>8.2f} {percentiles[94]:>8.2f} "
+            f"{percentiles[98]:>8.2f} {hits / QUERIES:>8.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main(tuple(map(int, sys.argv[1:])) or DEFAULT_SIZES)
@@ -0,0 +1,129 @@
+"""
+Блокировка цикла событий записью логов: обработчики файла и консоли вызываются прямо из цикла событий
+(прежняя настройка) или через QueueHandler и фоновый поток QueueListener (config/logging_config.py).
+
+Задачи-"обработчики" пишут --records записей в формате горячих путей (%-подстановка аргументов), файл
+ротируется каждые 256 КБ, медленный диск имитируется паузой --disk-delay на каждую запись в файл.
+Консольный вывод направляется в /dev/null. Параллельно таймер каждую миллисекунду замеряет,
+насколько позже положенного он просыпается - это и есть время, на которое цикл событий был занят.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_logging [--records 10000] [--disk-delay 0.0005]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import queue
+import statistics
+import tempfile
+import time
+from logging.handlers import QueueListener
+from pathlib import Path
+
+import benchmarks.common  # noqa: F401 - заглушки переменных окружения до импорта config
+
+from config.logging_config import LocalQueueHandler, create_handlers
+
+TASKS = 50
+TICK = 0.001
+ROTATE_BYTES = 256 * 1024
+
+
+def slow_down(handler: logging.Handler, delay: float) -> None:
+    """Каждая запись обработчика дополнительно ждёт delay секунд, как при медленном диске."""
+
+    emit = handler.emit
+
+    def slow_emit(record: logging.LogRecord) -> None:
+        time.sleep(delay)
+        emit(record)
+
+    handler.emit = slow_emit
+
+
+async def measure(logger: logging.Logger, records: int) -> tuple[float, float, float, float]:
+    """Возвращает (время в вызовах логгера, с; p99 и максимум задержки таймера, мс; общее время, с)."""
+
+    lags, in_logging, done = [], [0.0], asyncio.Event()
+
+    async def ticker() -> None:
+        while not done.is_set():
+            expected = time.perf_counter() + TICK
+            await asyncio.sleep(TICK)
+            lags.append(max(0.0, time.perf_counter() - expected))
+
+    async def worker(number: int) -> None:
+        for step in range(records // TASKS):
+            started = time.perf_counter()
+            logger.info("Заявка %s: шаг %d, пользователь %s, сумма %s", number * 100_000 + step, step, number, 1000.5)
+            in_logging[0] += time.perf_counter() - started
+            await asyncio.sleep(0)
+
+    ticker_task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(number) for number in range(TASKS)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ticker_task
+
+    lag_p99 = statistics.quantiles(lags, n=100, method="inclusive")[98]
+    return in_logging[0], lag_p99 * 1000, max(lags) * 1000, elapsed
+
+
+async def run(mode: str, records: int, disk_delay: float, json_format: bool) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        handlers = create_handlers(
+            str(Path(tmp) / "app.log"), max_bytes=ROTATE_BYTES, backup_count=3, json_format=json_format
+        )
+        file_handler, console_handler = handlers
+        slow_down(file_handler, disk_delay)
+        with open(os.devnull, "w") as devnull:
+            console_handler.setStream(devnull)
+
+            logger = logging.getLogger(f"budget_automation_bot.bench.{mode}")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            listener = None
+            if mode == "напрямую":
+                for handler in handlers:
+                    logger.addHandler(handler)
+            else:
+                log_queue = queue.SimpleQueue()
+                listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+                listener.start()
+                logger.addHandler(LocalQueueHandler(log_queue))
+
+            in_logging, lag_p99, lag_max, elapsed = await measure(logger, records)
+            drain_started = time.perf_counter()
+            if listener is not None:
+                listener.stop()
+            drain = time.perf_counter() - drain_started
+            for handler in handlers:
+                handler.close()
+            logger.handlers.clear()
+
+    title = f"{mode}{', JSON' if json_format else ''}"
+    print(
+        f"{title:>20} {in_logging * 1000:>14.0f} {lag_p99:>13.2f} {lag_max:>13.2f} "
+        f"{records / elapsed:>12.0f} {drain * 1000:>13.0f}"
+    )
+
+
+async def main(records: int, disk_delay: float) -> None:
+    print(f"записей: {records}, задач: {TASKS}, пауза диска: {disk_delay * 1000:.2f} мс на запись")
+    print(
+        f"{'режим':>20} {'в логгере, мс':>14} {'лаг p99, мс':>13} {'лаг max, мс':>13} "
+        f"{'записей/с':>12} {'дозапись, мс':>13}"
+    )
+    await run("напрямую", records, disk_delay, json_format=False)
+    await run("через очередь", records, disk_delay, json_format=False)
+    await run("через очередь", records, disk_delay, json_format=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=10_000)
+    parser.add_argument("--disk-delay", type=float, default=0.0005, help="пауза на каждую запись в файл, с")
+    arguments = parser.parse_args()
+    asyncio.run(main(arguments.records, arguments.disk_delay))
@@ -0,0 +1,81 @@
+"""
+Стоимость сохранения состояния диалогов в зависимости от числа уже сохранённых диалогов:
+PicklePersistence из PTB (перезапись всего файла) и SQLitePersistence (запись только изменённых строк).
+На каждом проходе меняются данные и состояние CHANGED пользователей. База и файл создаются во временном каталоге.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_persistence [кол-во диалогов ...]
+"""
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import temporary_database
+
+from telegram.ext import PicklePersistence
+
+from budget_bot.persistence import SQLitePersistence
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+CHANGED = 50
+ROUNDS = 20
+CONVERSATION = "enter_record"
+
+
+def user_data(user_id: int, step: int) -> dict:
+    """Типичное содержимое user_data незавершённого диалога /enter_record."""
+    return {
+        "chat_id": user_id,
+        "catalog_version": 1,
+        "sum": str(1000 + step),
+        "item": "Статья",
+        "item_index": step % 7,
+        "group": "Группа",
+        "group_index": 0,
+    }
+
+
+async def fill(persistence, size: int) -> None:
+    await persistence.get_user_data()
+    await persistence.get_conversations(CONVERSATION)
+    for user_id in range(size):
+        await persistence.update_user_data(user_id, user_data(user_id, 0))
+        await persistence.update_conversation(CONVERSATION, (user_id, user_id), 1)
+    await persistence.flush()
+
+
+async def measure(persistence) -> float:
+    """Медиана времени одного прохода обновления с последующим flush, мс."""
+
+    timings = []
+    for step in range(1, ROUNDS + 1):
+        started = time.perf_counter()
+        for user_id in range(CHANGED):
+            await persistence.update_user_data(user_id, user_data(user_id, step))
+            await persistence.update_conversation(CONVERSATION, (user_id, user_id), step % 8)
+        await persistence.flush()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+async def main(sizes: tuple[int, ...]) -> None:
+    print(f"{'диалогов':>10} {'PicklePersistence, мс':>22} {'SQLitePersistence, мс':>22}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            pickle_persistence = PicklePersistence(Path(tmp) / "state.pickle", on_flush=True)
+            await fill(pickle_persistence, size)
+            pickle_time = await measure(pickle_persistence)
+
+        async with temporary_database("state.db"):
+            sqlite_persistence = SQLitePersistence()
+            await fill(sqlite_persistence, size)
+            sqlite_time = await measure(sqlite_persistence)
+
+        print(f"{size:>10} {pickle_time:>22.1f} {sqlite_time:>22.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(tuple(map(int, sys.argv[1:])) or DEFAULT_SIZES))
@@ -0,0 +1,126 @@
+"""
+Стоимость отчёта /report в зависимости от числа оплаченных заявок в базе: выборка из таблицы итогов
+'spend_by_month' (ApprovalDB.spend_report) против группировки начислений с соединением с 'approvals'
+при каждом запросе. Итоги обоих способов сверяются.
+
+Заявки распределены по 5 годам, 10 группам и 20 статьям, у каждой от 1 до 3 месяцев начисления.
+Таблица итогов строится переносом уже оплаченных заявок (как при обновлении существующей базы),
+а стоимость её пополнения при оплате измеряется на отдельных заявках через pay_and_enqueue.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_report [кол-во заявок ...]
+"""
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+from benchmarks.common import make_record, temporary_database
+
+from db import db
+from budget_bot.accruals import record_accruals, split_accruals
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+CHUNK = 50_000
+ROUNDS = 20
+PAYMENTS = 200
+YEARS = (20, 21, 22, 23, 24)
+# Отчёт за месяц и за год: (начало, конец) в yyyymm
+RANGES = {"месяц": (202403, 202403), "год": (202301, 202312)}
+
+NAIVE_REPORT_SQL = (
+    "SELECT accruals.month, approvals.expense_group, approvals.expense_item, SUM(accruals.amount), COUNT(*) "
+    "FROM approval_accruals AS accruals JOIN approvals ON approvals.id = accruals.approval_id "
+    "WHERE accruals.month BETWEEN ? AND ? AND approvals.status = 'Paid' "
+    "GROUP BY 1, 2, 3 ORDER BY 1, 2, 3"
+)
+
+
+def make_random_record(rnd: random.Random, status: str) -> dict:
+    year, first = rnd.choice(YEARS), rnd.randint(1, 10)
+    group = rnd.randrange(10)
+    return make_record(
+        amount=str(rnd.randint(100, 500_000)),
+        expense_item=f"Статья {group}-{rnd.randrange(20)}",
+        expense_group=f"Группа {group}",
+        partner=f"Партнёр {rnd.randrange(500)}",
+        period=" ".join(f"{month:02d}.{year}" for month in range(first, first + rnd.randint(1, 3))),
+        approvals_received=1,
+        status=status,
+        approved_by="@head",
+    )
+
+
+async def fill(size: int, rnd: random.Random) -> float:
+    """Заполняет базу оплаченными заявками и строит таблицу итогов; возвращает время переноса, с."""
+
+    async with db:
+        for start in range(0, size, CHUNK):
+            records = [make_random_record(rnd, "Paid") for _ in range(min(CHUNK, size - start))]
+            await db.insert_records(records, [record_accruals(record) for record in records])
+        # Итоги строятся заново, как при первом запуске на существующей базе
+        await db._cursor.execute("PRAGMA user_version = 0")
+        started = time.perf_counter()
+        await db.migrate_accruals(split_accruals)
+    return time.perf_counter() - started
+
+
+async def measure(query) -> tuple[float, list]:
+    """Медиана времени запроса, мс, и его результат."""
+
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        async with db:
+            rows = await query()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, rows
+
+
+async def naive_report(month_from: int, month_to: int) -> list:
+    result = await db._cursor.execute(NAIVE_REPORT_SQL, (month_from, month_to))
+    return [tuple(row) for row in await result.fetchall()]
+
+
+async def pay_cost(rnd: random.Random) -> float:
+    """Медиана времени pay_and_enqueue с пополнением итогов, мс."""
+
+    async with db:
+        records = [make_random_record(rnd, "Approved") for _ in range(PAYMENTS)]
+        approval_ids = await db.insert_records(records, [record_accruals(record) for record in records])
+    timings = []
+    for approval_id in approval_ids:
+        started = time.perf_counter()
+        async with db:
+            await db.pay_and_enqueue(approval_id, "2024-03-01")
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def totals(rows: list) -> tuple[float, int]:
+    return round(sum(row[3] for row in rows), 2), sum(row[4] for row in rows)
+
+
+async def main(sizes: tuple[int, ...]) -> None:
+    print(
+        f"{'заявок':>10} {'отчёт':>6} {'строк':>6} {'итоги, мс':>10} {'группировка, мс':>16} "
+        f"{'совпадают':>10}"
+    )
+    for size in sizes:
+        rnd = random.Random(size)
+        async with temporary_database("report.db"):
+            migration = await fill(size, rnd)
+            for title, (month_from, month_to) in RANGES.items():
+                fast_time, fast_rows = await measure(lambda: db.spend_report(month_from, month_to))
+                naive_time, naive_rows = await measure(lambda: naive_report(month_from, month_to))
+                print(
+                    f"{size:>10} {title:>6} {len(fast_rows):>6} {fast_time:>10.2f} {naive_time:>16.1f} "
+                    f"{'да' if totals(fast_rows) == totals(naive_rows) else 'НЕТ':>10}"
+                )
+            pay_time = await pay_cost(rnd)
+        print(f"{'':>10} перенос итогов: {migration:.1f} с, оплата с пополнением итогов: {pay_time:.2f} мс")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(tuple(map(int, sys.argv[1:])) or DEFAULT_SIZES))
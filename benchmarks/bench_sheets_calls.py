@@ -0,0 +1,160 @@
+"""
+Число обращений к Google Sheets API по счётчику CountingClientManager.api_calls. Менеджер клиента настоящий
+(с gspread_asyncio), а вместо gspread.Client подставлен клиент в памяти, поэтому считаются именно те вызовы
+gspread, которые ушли бы в API.
+
+Проверяется, что:
+1. таблица и каждый лист открываются один раз на процесс, в том числе при одновременных обращениях
+   (SheetsClient.warm_up, многократный GoogleSheetsManager.get_data);
+2. платёж за --months месяцев записывается одним batch_update без отдельных запросов форматирования;
+3. каждая итерация flush_sheets_outbox (пачка до SHEETS_OUTBOX_BATCH_SIZE платежей) - ровно один batch_update.
+
+При расхождении скрипт завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_sheets_calls [--payments 250] [--batch 100] [--months 12]
+"""
+import argparse
+import asyncio
+import math
+import sys
+from collections import Counter
+
+from benchmarks.common import make_record, temporary_database
+
+import gspread
+
+from benchmarks.bench_e2e import make_categories
+from config.config import Config
+from db import db
+from budget_bot.accruals import record_accruals
+from budget_bot.gspread_client import CountingClientManager
+from budget_bot.outbox import flush_sheets_outbox
+from budget_bot.sheets import GoogleSheetsManager, sheets_client
+
+READERS = 20
+
+
+class MemoryWorksheet:
+    """Лист gspread в памяти: только атрибуты и методы, которыми пользуется бот."""
+
+    def __init__(self, sheet_id: int, index: int, records: list[dict]):
+        self.id = sheet_id
+        self.title = f"Лист {sheet_id}"
+        self._properties = {"sheetId": sheet_id, "index": index}
+        self.records = records
+
+    def get_all_records(self, **kwargs) -> list[dict]:
+        return self.records
+
+
+class MemorySpreadsheet:
+    """Таблица gspread в памяти: batch_update копит строки запросов appendCells."""
+
+    def __init__(self, spreadsheet_id: str, records: list[dict]):
+        self.id = spreadsheet_id
+        self.title = "Бюджет"
+        self.requests: list[dict] = []
+        self.appended_rows: list[dict] = []
+        self._worksheets = {
+            0: MemoryWorksheet(0, 0, []),
+            int(Config.google_sheets_categories_sheet_id): MemoryWorksheet(
+                int(Config.google_sheets_categories_sheet_id), 1, records
+            ),
+        }
+
+    def get_worksheet_by_id(self, sheet_id: int) -> MemoryWorksheet:
+        return self._worksheets[int(sheet_id)]
+
+    def batch_update(self, body: dict) -> dict:
+        self.requests.extend(body["requests"])
+        for request in body["requests"]:
+            self.appended_rows.extend(request["appendCells"]["rows"])
+        return {"replies": [{} for _ in body["requests"]]}
+
+
+class MemoryClient:
+    def __init__(self, spreadsheet: MemorySpreadsheet):
+        self.spreadsheet = spreadsheet
+
+    def open_by_key(self, key: str) -> MemorySpreadsheet:
+        return self.spreadsheet
+
+
+def make_payment(months: int) -> dict:
+    """Одобренная заявка на 120000 с начислением на months месяцев 2024 года."""
+
+    return make_record(
+        amount="120000",
+        period=" ".join(f"{month:02d}.24" for month in range(1, months + 1)),
+        approvals_received=1,
+        status="Approved",
+        approved_by="@head",
+    )
+
+
+class Checks:
+    def __init__(self, agcm: CountingClientManager):
+        self.agcm = agcm
+        self.seen = Counter()
+        self.failed = 0
+
+    def step(self, title: str, expected: dict[str, int]) -> None:
+        """Сравнивает обращения к API с прошлого шага с ожидаемыми."""
+
+        calls = self.agcm.api_calls - self.seen
+        self.seen = Counter(self.agcm.api_calls)
+        passed = calls == Counter(expected)
+        self.failed += not passed
+        summary = ", ".join(f"{method}={count}" for method, count in sorted(calls.items())) or "нет"
+        print(f"{'ok' if passed else 'ОШИБКА':>6}  {title}: {summary}")
+        if not passed:
+            print(f"{'':>8}ожидалось: {', '.join(f'{method}={count}' for method, count in sorted(expected.items()))}")
+
+
+async def main(payments: int, batch_size: int, months: int) -> int:
+    spreadsheet = MemorySpreadsheet(Config.google_sheets_spreadsheet_id, make_categories())
+    # gspread_asyncio создаёт клиент через gspread.authorize: здесь он возвращает таблицу в памяти
+    gspread.authorize = lambda credentials: MemoryClient(spreadsheet)
+    agcm = CountingClientManager(lambda: None, gspread_delay=0)
+    sheets_client._agcm = agcm
+    checks = Checks(agcm)
+
+    await sheets_client.warm_up()
+    checks.step("warm_up", {"open_by_key": 1, "get_worksheet_by_id": 2})
+
+    manager = GoogleSheetsManager()
+    await manager.initialize_google_sheets()
+    await asyncio.gather(*(manager.get_data() for _ in range(READERS)))
+    checks.step(f"{READERS} одновременных get_data", {"get_all_records": READERS})
+
+    await manager.add_payment_to_sheet(make_payment(months))
+    checks.step(f"платёж за {months} мес.", {"batch_update": 1})
+    written = len(spreadsheet.appended_rows)
+
+    Config.sheets_outbox_batch_size = batch_size
+    async with temporary_database("sheets_calls.db"):
+        async with db:
+            records = [make_payment(months) for _ in range(payments)]
+            for approval_id in await db.insert_records(records, [record_accruals(record) for record in records]):
+                await db.pay_and_enqueue(approval_id, "2024-03-01")
+        await flush_sheets_outbox(None)
+    flushes = math.ceil(payments / batch_size)
+    checks.step(f"очередь из {payments} платежей, пачка {batch_size}", {"batch_update": flushes})
+
+    rows_ok = len(spreadsheet.appended_rows) == (payments + 1) * months and written == months
+    checks.failed += not rows_ok
+    print(
+        f"{'ok' if rows_ok else 'ОШИБКА':>6}  записано строк: {len(spreadsheet.appended_rows)}, "
+        f"запросов appendCells: {len(spreadsheet.requests)}"
+    )
+    return 1 if checks.failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--payments", type=int, default=250)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--months", type=int, default=12)
+    arguments = parser.parse_args()
+    sys.exit(asyncio.run(main(arguments.payments, arguments.batch, arguments.months)))
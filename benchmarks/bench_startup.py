@@ -0,0 +1,64 @@
+"""
+Время импорта и потребление памяти при запуске бота: python -X importtime и пиковый RSS процесса.
+Каждый замер выполняется в отдельном интерпретаторе, результат - медиана по запускам.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_startup [модуль] [кол-во запусков]
+"""
+import statistics
+import subprocess
+import sys
+
+import benchmarks.common  # noqa: F401 - заглушки переменных окружения наследуются замеряемыми процессами
+
+DEFAULT_MODULE = "budget_bot.main"
+DEFAULT_RUNS = 5
+TOP_MODULES = 15
+
+CHILD_CODE = """
+import resource
+import {module}
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def measure_once(module: str) -> tuple[int, dict[str, int]]:
+    """Один запуск: пиковый RSS в КиБ и суммарное время импорта каждого модуля в мкс."""
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_CODE.format(module=module)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        cumulative[name.strip()] = int(cumulative_us)
+    return int(result.stdout.split()[-1]), cumulative
+
+
+def main(module: str, runs: int) -> None:
+    measurements = [measure_once(module) for _ in range(runs)]
+    rss = statistics.median(rss_kib for rss_kib, _ in measurements)
+    modules = {
+        name: statistics.median(run[name] for _, run in measurements if name in run)
+        for name in measurements[0][1]
+    }
+
+    print(f"Модуль: {module}, запусков: {runs}")
+    print(f"Время импорта: {modules[module] / 1000:.1f} мс")
+    print(f"Пиковый RSS: {rss / 1024:.1f} МиБ")
+    print("\nСамые дорогие пакеты верхнего уровня (суммарно, мс):")
+    top_level = {name: value for name, value in modules.items() if name != module and "." not in name}
+    for name, value in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:TOP_MODULES]:
+        print(f"{value / 1000:>10.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main(
+        sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MODULE,
+        int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_RUNS,
+    )
@@ -0,0 +1,85 @@
+"""
+Проверка выборки начислений по месяцам (ApprovalDB.accruals_by_month):
+
+1. план запроса - поиск по индексу approval_accruals_month по диапазону месяцев, без полного просмотра
+   'approval_accruals';
+2. итоги совпадают с подсчётом по заявкам, включая перенесённые в 'approvals_archive'.
+
+При расхождении скрипт завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python -m benchmarks.check_accruals_index [кол-во заявок]
+"""
+import asyncio
+import random
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks.common import make_record, temporary_database
+from db import db
+from db.db import ACCRUALS_BY_MONTH_SQL, CLOSED_STATUSES
+from budget_bot.accruals import record_accruals
+
+DEFAULT_RECORDS = 20_000
+MONTHS = (202401, 202406)
+YEAR = 365 * 86400
+
+
+def expected_totals(records: list[dict], status: str) -> list[tuple[int, float, int]]:
+    """Начисления по месяцам, посчитанные по самим заявкам."""
+
+    totals = defaultdict(lambda: [0.0, 0])
+    for record in records:
+        if record["status"] != status:
+            continue
+        for month, share in record_accruals(record):
+            if MONTHS[0] <= month <= MONTHS[1]:
+                totals[month][0] += float(share)
+                totals[month][1] += 1
+    return [(month, round(amount, 2), count) for month, (amount, count) in sorted(totals.items())]
+
+
+async def main(count: int) -> int:
+    rnd = random.Random(count)
+    records = [
+        make_record(
+            amount=str(rnd.randint(100, 100_000)),
+            period=" ".join(f"{month:02d}.{year}" for year in (23, 24) for month in rnd.sample(range(1, 13), 2)),
+            status=rnd.choice(("Not processed", *CLOSED_STATUSES)),
+        )
+        for _ in range(count)
+    ]
+
+    async with temporary_database("accruals.db"):
+        async with db:
+            await db.insert_records(records, [record_accruals(record) for record in records])
+            # Половина закрытых заявок переносится в архив
+            await db._cursor.execute(
+                "UPDATE approvals SET closed_at = ? WHERE status IN (?, ?) AND id % 2 = 0",
+                (time.time() - YEAR, *CLOSED_STATUSES),
+            )
+            await db._conn.commit()
+            archived = await db.archive_closed(time.time(), count)
+
+            result = await db._cursor.execute(f"EXPLAIN QUERY PLAN {ACCRUALS_BY_MONTH_SQL}", (*MONTHS, "Paid"))
+            plan = [row[3] for row in await result.fetchall()]
+            found = await db.accruals_by_month(*MONTHS)
+
+    rounded = [(month, round(amount, 2), payments) for month, amount, payments in found]
+    checks = {
+        "поиск по индексу approval_accruals_month": any(
+            line.startswith("SEARCH accruals") and "approval_accruals_month" in line for line in plan
+        ),
+        "нет полного просмотра approval_accruals": not any(line.startswith("SCAN accruals") for line in plan),
+        f"итоги совпадают (в архиве {archived} заявок)": rounded == expected_totals(records, "Paid"),
+    }
+
+    print("\n".join(f"{'':>8}{line}" for line in plan))
+    for check, passed in checks.items():
+        print(f"{'ok' if passed else 'ОШИБКА':>6}  {check}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RECORDS)))
@@ -0,0 +1,70 @@
+"""
+Проверка справочника с числовыми названиями. gspread get_all_records превращает похожие на числа ячейки
+листа "категории" в int и float, а названия из документов массовой загрузки (CSV и XLSX) - всегда строки.
+На листе в памяти (FakeSpreadsheet из bench_e2e) проверяется, что:
+
+1. CatalogCache.refresh загружает справочник и строит индекс inline-поиска;
+2. поиск по началу названия и inline-поиск находят числовые статьи и партнёров;
+3. строки CSV с этими названиями проходят сверку со справочником (parse_bulk_rows).
+
+При ошибке скрипт завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python -m benchmarks.check_catalog_names
+"""
+import asyncio
+import sys
+
+import benchmarks.common  # noqa: F401 - заглушки переменных окружения до импорта config
+
+from benchmarks.bench_e2e import FakeClientManager, FakeSpreadsheet
+from budget_bot.bulk import parse_bulk_rows, read_rows
+from budget_bot.catalog import CatalogCache
+from budget_bot.sheets import sheets_client
+
+RECORDS = [
+    {"Статья": 1000, "Группа": 2024, "Партнер": 7701234567},
+    {"Статья": 1000, "Группа": 2024, "Партнер": " ООО Ромашка "},
+    {"Статья": 1000, "Группа": 10.5, "Партнер": 42},
+    {"Статья": "Аренда", "Группа": "Офис", "Партнер": 2024},
+]
+
+CSV = (
+    "Сумма;Статья;Группа;Партнёр;Комментарий;Период;Способ оплаты\n"
+    "1000;1000;2024;7701234567;счёт;03.24;безнал\n"
+    "1000;1000;2024;ООО Ромашка;счёт;03.24;безнал\n"
+    "1000;1000;10.5;42;счёт;03.24;безнал\n"
+    "1000;Аренда;Офис;2024;счёт;03.24;безнал\n"
+)
+
+
+async def main() -> int:
+    sheets_client._agcm = FakeClientManager(FakeSpreadsheet(RECORDS, 0))
+    cache = CatalogCache(ttl=60)
+
+    try:
+        await cache.refresh()
+    except Exception as e:
+        print(f"{'ОШИБКА':>6}  CatalogCache.refresh: {type(e).__name__}: {e}")
+        return 1
+
+    current = cache.current
+    records, errors = parse_bulk_rows(read_rows("bulk.csv", CSV.encode()), current)
+    found = [current.items[path[0]] for path in current.fuzzy_index.search("1000", 5) if len(path) == 1]
+    checks = {
+        "CatalogCache.refresh": current.items == ("1000", "Аренда"),
+        "названия - строки без пробелов по краям": current.partners[0][0] == ("7701234567", "ООО Ромашка"),
+        "поиск по началу названия": current.search((), "10") == [0] and current.search((0,), "10") == [1],
+        "inline-поиск": found == ["1000"],
+        f"строки CSV сверены со справочником ({len(records)} из 4)": not errors and len(records) == 4,
+    }
+
+    for check, passed in checks.items():
+        print(f"{'ok' if passed else 'ОШИБКА':>6}  {check}")
+    for line_number, error in errors:
+        print(f"{'':>8}строка {line_number}: {error}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
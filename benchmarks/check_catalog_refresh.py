@@ -0,0 +1,96 @@
+"""
+Проверка фонового обновления справочника (CatalogCache.get) при недоступном Google Sheets. Лист "категории"
+в памяти (FakeSpreadsheet из bench_e2e) после первой загрузки начинает отвечать ошибкой; справочник устарел,
+и за время теста --calls раз вызывается get. Проверяется, что:
+
+1. get сразу отдаёт прежнюю версию справочника;
+2. пока идёт фоновое обновление, новое не запускается, а после ошибки следующая попытка
+   откладывается на RETRY_DELAY;
+3. когда лист снова доступен, справочник обновляется.
+
+При ошибке скрипт завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python -m benchmarks.check_catalog_refresh [--calls 1000]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+import benchmarks.common  # noqa: F401 - заглушки переменных окружения до импорта config
+
+from benchmarks.bench_e2e import FakeClientManager, FakeSpreadsheet, make_categories
+from config.logging_config import logger
+from budget_bot.catalog import CatalogCache
+from budget_bot.sheets import sheets_client
+
+SHEETS_LATENCY = 0.05
+RETRY_DELAY = 0.5
+DURATION = 1.2  # секунды вызовов get без учёта накладных расходов на asyncio.sleep
+
+
+class FlakyWorksheet:
+    """Лист категорий, который отвечает ошибкой, пока failing; обращения считаются в calls."""
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+        self.failing = False
+        self.calls = 0
+
+    def __getattr__(self, name: str):
+        return getattr(self.worksheet, name)
+
+    async def get_all_records(self) -> list[dict]:
+        self.calls += 1
+        if self.failing:
+            await asyncio.sleep(self.worksheet.latency)
+            raise ConnectionError("Google Sheets недоступен")
+        return await self.worksheet.get_all_records()
+
+
+async def main(calls: int) -> int:
+    logger.setLevel(logging.CRITICAL)  # ошибки загрузки здесь ожидаемы
+    spreadsheet = FakeSpreadsheet(make_categories(), SHEETS_LATENCY)
+    worksheet = spreadsheet._categories_sheet = FlakyWorksheet(spreadsheet._categories_sheet)
+    sheets_client._agcm = FakeClientManager(spreadsheet)
+
+    cache = CatalogCache(ttl=60)
+    cache.RETRY_DELAY = RETRY_DELAY
+    await cache.get()
+    first = cache.current
+
+    worksheet.failing, worksheet.calls = True, 0
+    cache.loaded_at -= cache.ttl + 1
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    served = []
+    for _ in range(calls):
+        served.append(await cache.get())
+        await asyncio.sleep(DURATION / calls)
+    await asyncio.sleep(SHEETS_LATENCY * 4)  # завершение начатой попытки
+    elapsed = loop.time() - started
+    # Попытка занимает SHEETS_LATENCY, следующая начинается не раньше чем через RETRY_DELAY после ошибки
+    attempts = int(elapsed // (SHEETS_LATENCY + RETRY_DELAY)) + 1
+
+    worksheet.failing = False
+    cache.loaded_at -= cache.ttl + 1
+    worksheet.worksheet.records = make_categories(items=11)
+    await cache.get()
+    await asyncio.sleep(SHEETS_LATENCY * 4)
+
+    checks = {
+        f"get отдаёт прежнюю версию ({calls} вызовов)": all(current is first for current in served),
+        f"попыток загрузки за {elapsed:.1f} с: {worksheet.calls - 1} (не больше {attempts})":
+            1 < worksheet.calls - 1 <= attempts,
+        "после восстановления справочник обновлён": len(cache.current.items) == 11 and cache.current is not first,
+    }
+    for check, passed in checks.items():
+        print(f"{'ok' if passed else 'ОШИБКА':>6}  {check}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    sys.exit(asyncio.run(main(parser.parse_args().calls)))
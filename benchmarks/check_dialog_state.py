@@ -0,0 +1,90 @@
+"""
+Проверка сброса состояния диалога /enter_record. Приложение запускается с фиктивными Telegram и Google Sheets
+из bench_e2e; пользователь выбирает статью, группу и партнёра кнопками, после чего диалог завершается:
+
+1. некорректным комментарием (ConversationHandler.END из input_comment);
+2. командой /stop;
+3. кнопкой "Отмена" на шаге подтверждения.
+
+После каждого завершения user_data должен быть пуст, а в новом диалоге поиск по началу названия
+(browse_options) - искать среди статей, а не среди партнёров прошлого диалога. При ошибке скрипт завершается
+с кодом 1.
+
+Запуск из корня репозитория:
+    python -m benchmarks.check_dialog_state
+"""
+import asyncio
+import sys
+
+import benchmarks.common  # noqa: F401 - заглушки переменных окружения до импорта config
+
+from benchmarks.bench_e2e import FIRST_USER_ID, running_application
+
+USER_ID = FIRST_USER_ID
+USER = {"id": USER_ID, "is_bot": False, "first_name": "Проверка", "username": "check"}
+
+
+async def choose_partner(driver) -> None:
+    """Начало диалога и выбор статьи 1, группы 2 и партнёра 3 кнопками."""
+
+    await driver.message("enter_record", USER, "/enter_record")
+    await driver.message("input_sum", USER, "1000")
+    await driver.press("input_item", USER, USER_ID, lambda data: data == "1")
+    await driver.press("input_group", USER, USER_ID, lambda data: data == "2")
+    await driver.press("input_partner", USER, USER_ID, lambda data: data == "3")
+
+
+async def end_with_comment(driver) -> None:
+    await choose_partner(driver)
+    await driver.message("input_comment", USER, " комментарий с пробела")
+
+
+async def end_with_stop(driver) -> None:
+    await choose_partner(driver)
+    await driver.message("stop", USER, "/stop")
+
+
+async def end_with_cancel(driver) -> None:
+    await choose_partner(driver)
+    await driver.message("input_comment", USER, "проверка")
+    await driver.message("input_dates", USER, "03.26")
+    await driver.press("input_payment_type", USER, USER_ID, lambda data: data == "0")
+    await driver.press("confirm", USER, USER_ID, lambda data: data == "Отмена")
+
+
+def last_text(driver) -> str:
+    return driver.telegram.messages[USER_ID][-1]["text"]
+
+
+async def main() -> int:
+    checks = {}
+    async with running_application(1, 0, 0, 1) as (driver, _):
+        user_data = driver.application.user_data
+        for title, end in (
+                ("некорректный комментарий", end_with_comment),
+                ("/stop", end_with_stop),
+                ('кнопка "Отмена"', end_with_cancel),
+        ):
+            await end(driver)
+            checks[f"{title}: user_data пуст"] = not user_data[USER_ID]
+            if title == 'кнопка "Отмена"':
+                checks[f"{title}: диалог остановлен"] = last_text(driver).startswith("Диалог был остановлен")
+
+            await driver.message("enter_record", USER, "/enter_record")
+            await driver.message("input_sum", USER, "1000")
+            await driver.message("browse", USER, "Статья 7")
+            found = driver.telegram.find_button(USER_ID, lambda data: data == "7")
+            checks[f"{title}: новый диалог ищет среди статей"] = (
+                last_text(driver).startswith("Найдено: 1")
+                and found is not None
+                and found[0] is driver.telegram.messages[USER_ID][-1]
+            )
+            await driver.message("stop", USER, "/stop")
+
+    for check, passed in checks.items():
+        print(f"{'ok' if passed else 'ОШИБКА':>6}  {check}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,155 @@
+"""
+Проверка режима webhook: приложение из budget_bot.main запускается через run (application.run_webhook, как в проде)
+с фиктивным Telegram из bench_e2e и временной базой. Из отдельного потока на локальный адрес webhook
+отправляются записанные обновления в формате Bot API:
+
+1. без заголовка X-Telegram-Bot-Api-Secret-Token и с неверным секретом - PTB должен ответить 403,
+   а обработчики не должны вызываться;
+2. с верным секретом - ответ 200, обработчик /start отвечает пользователю.
+
+Кроме того, при запуске setWebhook должен получить адрес и секрет из Config. При ошибке скрипт завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python -m benchmarks.check_webhook
+"""
+import asyncio
+import json
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.common import temporary_db_file
+from benchmarks.bench_e2e import FakeClientManager, FakeSpreadsheet, FakeTelegram, make_categories
+from config.config import Config
+from budget_bot.main import build_application, run
+from budget_bot.sheets import sheets_client
+
+SECRET = "check-webhook-secret"
+USER = {"id": 700, "is_bot": False, "first_name": "Проверка", "username": "check"}
+TIMEOUT = 10
+
+
+class RecordingTelegram(FakeTelegram):
+    """FakeTelegram, запоминающий параметры последнего вызова каждого метода Bot API."""
+
+    def __init__(self):
+        super().__init__(latency=0)
+        self.parameters: dict[str, dict] = {}
+
+    async def do_request(self, url: str, method: str, request_data=None, *args, **kwargs) -> tuple[int, bytes]:
+        if request_data is not None:
+            self.parameters[url.rsplit("/", 1)[-1]] = request_data.parameters
+        return await super().do_request(url, method, request_data, *args, **kwargs)
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_update(update_id: int) -> dict:
+    """Записанное обновление Bot API: команда /start в личном чате."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": USER["id"], "type": "private"},
+            "from": USER,
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }
+
+
+def post(url: str, update: dict, secret: str | None) -> int:
+    headers = {"Content-Type": "application/json"}
+    if secret is not None:
+        headers["X-Telegram-Bot-Api-Secret-Token"] = secret
+    request = urllib.request.Request(url, data=json.dumps(update).encode(), headers=headers, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def replies(telegram: FakeTelegram) -> int:
+    return len(telegram.messages[USER["id"]])
+
+
+def client(port: int, telegram: RecordingTelegram, results: dict, stop) -> None:
+    """Отправляет обновления, записывает результаты проверок и останавливает приложение."""
+
+    url = f"http://127.0.0.1:{port}/telegram"
+    try:
+        deadline = time.monotonic() + TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+
+        results["без секрета: 403"] = post(url, start_update(1), None) == 403
+        results["неверный секрет: 403"] = post(url, start_update(2), "wrong-secret") == 403
+        time.sleep(0.5)
+        results["отклонённые обновления не обработаны"] = replies(telegram) == 0
+
+        results["верный секрет: 200"] = post(url, start_update(3), SECRET) == 200
+        deadline = time.monotonic() + TIMEOUT
+        while not replies(telegram) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        results["обработчик /start ответил"] = (
+            replies(telegram) == 1 and "Бот по автоматизации" in telegram.messages[USER["id"]][0]["text"]
+        )
+    finally:
+        stop()
+
+
+def main() -> int:
+    port = free_port()
+    Config.bot_mode = "webhook"
+    Config.webhook_listen, Config.webhook_port, Config.webhook_path = "127.0.0.1", port, "telegram"
+    Config.webhook_url = "https://bot.example.com/telegram"
+    Config.webhook_secret_token, Config.webhook_cert, Config.webhook_key = SECRET, None, None
+    Config.white_list = {USER["id"]}
+
+    sheets_client._agcm = FakeClientManager(FakeSpreadsheet(make_categories(), 0))
+    telegram = RecordingTelegram()
+    results: dict[str, bool] = {}
+
+    with temporary_db_file("webhook.db"):
+        application = build_application(request=telegram)
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        thread = threading.Thread(
+            target=client,
+            args=(
+                port,
+                telegram,
+                results,
+                lambda: loop.call_soon_threadsafe(application.stop_running),
+            ),
+        )
+        thread.start()
+        run(application)
+        thread.join()
+        loop.close()
+
+    webhook = telegram.parameters.get("setWebhook", {})
+    results["setWebhook с адресом и секретом"] = (
+        webhook.get("url") == Config.webhook_url and webhook.get("secret_token") == SECRET
+    )
+
+    for check, passed in results.items():
+        print(f"{'ok' if passed else 'ОШИБКА':>6}  {check}")
+    return 0 if len(results) == 6 and all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Общее для скриптов benchmarks/. Модуль импортируется в каждом скрипте первым: бенчмаркам не нужны настоящие
+токены и таблицы, поэтому недостающие переменные окружения заполняются заглушками до импорта config.
+Уже заданные переменные (в окружении) не меняются; config/.env при этом не читается для заданных здесь ключей.
+
+Здесь же - заявка для вставки в базу (make_record) и временная база данных (temporary_database).
+"""
+import os
+
+ENV_STUBS = {
+    "TELEGRAM_BOT_TOKEN": "123456:bench",
+    "DEPARTMENT_HEAD_CHAT_ID": "-100",
+    "FINANCE_CHAT_IDS": "-200",
+    "PAYERS_CHAT_IDS": "-300",
+    "DEVELOPER_CHAT_ID": "-400",
+    "WHITE_LIST": "1",
+    "GOOGLE_SHEETS_SPREADSHEET_ID": "bench",
+    "GOOGLE_SHEETS_CATEGORIES_SHEET_ID": "1",
+    "GOOGLE_SHEETS_RECORDS_SHEET_ID": "0",
+    "METRICS_PORT": "0",
+}
+
+for name, value in ENV_STUBS.items():
+    os.environ.setdefault(name, value)
+
+import tempfile  # noqa: E402
+from collections.abc import AsyncIterator, Iterator  # noqa: E402
+from contextlib import asynccontextmanager, contextmanager  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+from db import db  # noqa: E402
+
+
+def make_record(**fields) -> dict:
+    """
+    Заявка в формате ApprovalDB.insert_record: новая заявка на 1000 за 03.24 с первыми статьёй, группой
+    и партнёром справочника из bench_e2e.make_categories; fields заменяют значения по умолчанию.
+    """
+
+    return {
+        "amount": "1000",
+        "expense_item": "Статья 0",
+        "expense_group": "Группа 0",
+        "partner": "Партнёр 0-0-0",
+        "comment": "бенчмарк",
+        "period": "03.24",
+        "payment_method": "безнал",
+        "approvals_needed": 1,
+        "approvals_received": 0,
+        "status": "Not processed",
+        "approved_by": None,
+        **fields,
+    }
+
+
+@contextmanager
+def temporary_db_file(name: str = "bench.db") -> Iterator[Path]:
+    """Направляет db на файл name во временном каталоге, который удаляется по выходу."""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.db_file = str(Path(tmp) / name)
+        yield Path(tmp)
+
+
+@asynccontextmanager
+async def temporary_database(name: str = "bench.db") -> AsyncIterator[Path]:
+    """Временная база с созданными таблицами (temporary_db_file); соединение закрывается по выходу."""
+
+    with temporary_db_file(name) as tmp:
+        await db.create_table()
+        try:
+            yield tmp
+        finally:
+            await db.close()
@@ -0,0 +1,20 @@
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+
+def split_accruals(period: str, amount: float | str) -> list[tuple[int, float]]:
+    """
+    Месяцы начисления из строки периода "mm.yy mm.yy ..." в виде yyyymm и доля суммы на каждый месяц:
+    сумма делится поровну с округлением до 10 знаков, как в листе учёта. Выбрасывает ValueError при неверной дате.
+    """
+    months = [datetime.strptime(f"01.{date}", "%d.%m.%y") for date in period.split()]
+    if not months:
+        raise ValueError("не указан ни один месяц начисления")
+    share = Decimal(str(amount)) / Decimal(len(months))
+    rounded_share = float(share.quantize(Decimal("0.0000000001"), rounding=ROUND_HALF_UP))
+    return [(month.year * 100 + month.month, rounded_share) for month in months]
+
+
+def record_accruals(record: dict[str, any]) -> list[tuple[int, float]]:
+    """Начисления новой заявки для ApprovalDB.insert_record и insert_records."""
+    return split_accruals(record["period"], record["amount"])
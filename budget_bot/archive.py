@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+from telegram.ext import ContextTypes
+
+from config.config import Config
+from config.logging_config import logger
+from db import db
+from budget_bot.metrics import JOB_SECONDS, timed
+
+_archive_lock = asyncio.Lock()
+
+
+@timed(JOB_SECONDS)
+async def archive_closed_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Перенос заявок, оплаченных или отклонённых более Config.archive_after_days дней назад,
+    из 'approvals' в 'approvals_archive'. Каждая пачка из Config.archive_batch_size заявок переносится
+    отдельной транзакцией, между пачками соединение с базой свободно для обработчиков.
+    """
+
+    if _archive_lock.locked():
+        return
+
+    async with _archive_lock:
+        closed_before = time.time() - Config.archive_after_days * 86400
+        moved = 0
+        while True:
+            async with db:
+                batch = await db.archive_closed(closed_before, Config.archive_batch_size)
+            moved += batch
+            if batch < Config.archive_batch_size:
+                break
+            await asyncio.sleep(0)
+
+        if moved:
+            logger.info("Перенесено в архив закрытых заявок: %d.", moved)
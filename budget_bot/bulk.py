@@ -0,0 +1,115 @@
+import csv
+import io
+import re
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+
+from budget_bot.catalog import Catalog
+
+# Порядок столбцов совпадает с порядком полей /submit_record
+BULK_COLUMNS = ("сумма", "статья", "группа", "партнёр", "комментарий", "период", "форма оплаты")
+AMOUNT_PATTERN = re.compile(r"(?:0|[1-9]\d*)(?:\.\d+)?")
+PERIOD_PATTERN = re.compile(r"\d{2}\.\d{2}")
+
+
+def read_csv_rows(content: bytes) -> Iterator[list[str]]:
+    """Построчное чтение CSV в UTF-8 (в том числе с BOM из Excel). Разделитель ';' или ','."""
+
+    text = io.TextIOWrapper(io.BytesIO(content), encoding="utf-8-sig", newline="")
+    first_line = text.readline()
+    delimiter = ";" if first_line.count(";") >= first_line.count(",") else ","
+    text.seek(0)
+    yield from csv.reader(text, delimiter=delimiter)
+
+
+def read_xlsx_rows(content: bytes) -> Iterator[list[str]]:
+    """
+    Построчное чтение первого листа XLSX в режиме read_only. Требует openpyxl (extra "xlsx").
+    Период, сохранённый Excel как число (9.22 вместо "09.22"), приводится к виду mm.yy.
+    """
+
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Загрузка XLSX недоступна: не установлен пакет openpyxl. Отправьте файл в формате CSV.")
+
+    workbook = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            cells = ["" if value is None else str(value) for value in row]
+            if len(row) > 5 and isinstance(row[5], float):
+                cells[5] = f"{row[5]:05.2f}"
+            yield cells
+    finally:
+        workbook.close()
+
+
+def read_rows(file_name: str, content: bytes) -> Iterator[list[str]]:
+    """Строки загруженного документа в зависимости от расширения файла."""
+
+    if file_name.lower().endswith(".xlsx"):
+        return read_xlsx_rows(content)
+    return read_csv_rows(content)
+
+
+def parse_bulk_line(cells: list[str], catalog: Catalog) -> dict[str, any]:
+    """
+    Проверка одной строки документа и преобразование её в запись для таблицы 'approvals'.
+    Статья, группа и партнёр сверяются со справочником. При ошибке выбрасывает ValueError с описанием.
+    """
+
+    cells = [cell.strip() for cell in cells]
+    if len(cells) < len(BULK_COLUMNS) or any(not cell for cell in cells[:len(BULK_COLUMNS)]):
+        raise ValueError(f"нужно заполнить {len(BULK_COLUMNS)} столбцов: {', '.join(BULK_COLUMNS)}")
+
+    amount, item, group, partner, comment, period, payment_method = cells[:len(BULK_COLUMNS)]
+    amount = amount.replace(",", ".").replace(" ", "")
+    if not AMOUNT_PATTERN.fullmatch(amount):
+        raise ValueError(f"некорректная сумма '{amount}'")
+
+    period_dates = period.split()
+    for date in period_dates:
+        if not PERIOD_PATTERN.fullmatch(date):
+            raise ValueError(f"некорректный период '{period}', ожидается mm.yy через пробел")
+        try:
+            datetime.strptime(date, "%m.%y")
+        except ValueError:
+            raise ValueError(f"некорректная дата начисления '{date}'")
+
+    if not catalog.contains(item, group, partner):
+        raise ValueError(f"нет в справочнике: {item} / {group} / {partner}")
+
+    return {
+        "amount": amount,
+        "expense_item": item,
+        "expense_group": group,
+        "partner": partner,
+        "comment": comment,
+        "period": " ".join(period_dates),
+        "payment_method": payment_method,
+        "approvals_needed": 1 if float(amount) < 50000 else 2,
+        "approvals_received": 0,
+        "status": "Not processed",
+        "approved_by": None,
+    }
+
+
+def parse_bulk_rows(
+        rows: Iterable[list[str]], catalog: Catalog
+) -> tuple[list[dict[str, any]], list[tuple[int, str]]]:
+    """
+    Проверка всех строк документа. Пустые строки и строка заголовка (первая строка, где сумма не число)
+    пропускаются. Возвращает записи для вставки и ошибки в виде (номер строки, описание).
+    """
+
+    records, errors = [], []
+    for line_number, cells in enumerate(rows, start=1):
+        if not any(cell.strip() for cell in cells):
+            continue
+        if line_number == 1 and not AMOUNT_PATTERN.fullmatch(cells[0].strip().replace(",", ".").replace(" ", "")):
+            continue
+        try:
+            records.append(parse_bulk_line(cells, catalog))
+        except ValueError as e:
+            errors.append((line_number, str(e)))
+    return records, errors
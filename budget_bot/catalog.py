@@ -0,0 +1,279 @@
+import asyncio
+import hashlib
+import json
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from config.config import Config
+from config.logging_config import logger
+from budget_bot.sheets import GoogleSheetsManager
+
+
+class PrefixIndex:
+    """Отсортированный без учёта регистра список названий для поиска по началу названия двоичным поиском."""
+
+    __slots__ = ("keys", "positions")
+
+    def __init__(self, names: tuple[str, ...]):
+        pairs = sorted((name.casefold(), position) for position, name in enumerate(names))
+        self.keys = [key for key, _ in pairs]
+        self.positions = [position for _, position in pairs]
+
+    def search(self, prefix: str, limit: int | None = None) -> list[int]:
+        """Позиции названий, начинающихся с prefix, в исходном порядке; при limit - первые limit по алфавиту."""
+        prefix = prefix.strip().casefold()
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + "\U0010ffff", start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return sorted(self.positions[start:end])
+
+
+def trigrams(text: str) -> set[str]:
+    """Триграммы строки без учёта регистра; пробел в начале даёт больший вес началу названия."""
+    text = " " + " ".join(text.casefold().split())
+    return {text[position:position + 3] for position in range(len(text) - 2)}
+
+
+class FuzzyIndex:
+    """
+    Поиск по всем статьям и партнёрам справочника для inline-режима. Сначала ищутся статьи и партнёры, название
+    которых начинается с запроса, затем статьи и записи "партнёр статья" с наибольшей долей общих с запросом триграмм,
+    что допускает опечатки. Путь статьи - (i,), партнёра - (i, j, k).
+    Кандидаты набираются по самым редким триграммам запроса, поэтому частые сочетания букв не замедляют поиск.
+    """
+
+    __slots__ = ("paths", "texts", "prefix_index", "postings")
+
+    MIN_SIMILARITY = 0.4
+    CANDIDATE_POSTINGS = 10_000  # сколько позиций из списков триграмм просматривается при наборе кандидатов
+    CANDIDATES_PER_RESULT = 5
+
+    def __init__(self, catalog: "Catalog"):
+        self.paths: list[tuple[int, ...]] = [(i,) for i in range(len(catalog.items))]
+        self.texts: list[str] = list(catalog.items)
+        names = list(catalog.items)
+        for i, item in enumerate(catalog.items):
+            for j, partners in enumerate(catalog.partners[i]):
+                for k, partner in enumerate(partners):
+                    self.paths.append((i, j, k))
+                    self.texts.append(f"{partner} {item}")
+                    names.append(partner)
+
+        self.prefix_index = PrefixIndex(tuple(names))
+        postings = defaultdict(list)
+        for position, text in enumerate(self.texts):
+            for trigram in trigrams(text):
+                postings[trigram].append(position)
+        self.postings: dict[str, list[int]] = dict(postings)
+
+    def search(self, query: str, limit: int) -> list[tuple[int, ...]]:
+        """До limit путей (статья,) и (статья, группа, партнёр), лучше всего подходящих под запрос."""
+        found = self.prefix_index.search(query, limit)
+        query_trigrams = trigrams(query)
+
+        if len(found) < limit and len(query_trigrams) >= 3:
+            seen = set(found)
+            scored = [
+                (len(query_trigrams & trigrams(self.texts[position])) / len(query_trigrams), position)
+                for position in self._candidates(query_trigrams, limit * self.CANDIDATES_PER_RESULT)
+                if position not in seen
+            ]
+            scored.sort(key=lambda pair: (-pair[0], pair[1]))
+            found += [position for score, position in scored if score >= self.MIN_SIMILARITY][:limit - len(found)]
+
+        return [self.paths[position] for position in found]
+
+    def _candidates(self, query_trigrams: set[str], count: int) -> list[int]:
+        """Записи, чаще всего встречающиеся в списках самых редких триграмм запроса."""
+        lists = sorted((self.postings[trigram] for trigram in query_trigrams if trigram in self.postings), key=len)
+        counts, budget = Counter(), self.CANDIDATE_POSTINGS
+        for number, positions in enumerate(lists):
+            if number >= 2 and len(positions) > budget:
+                break
+            counts.update(positions)
+            budget -= len(positions)
+        return [position for position, _ in counts.most_common(count)]
+
+
+def content_version(options_dict: dict[str, dict[str, list[str]]]) -> int:
+    """
+    Номер версии справочника - хэш его содержимого с учётом порядка. Одинаков для одинакового справочника
+    в любом процессе, поэтому номер из сохранённого диалога или inline-кода после перезапуска указывает
+    либо на тот же справочник, либо ни на какой.
+    """
+    content = json.dumps(options_dict, ensure_ascii=False, separators=(",", ":")).encode()
+    return int.from_bytes(hashlib.blake2b(content, digest_size=6).digest(), "big")
+
+
+class Catalog:
+    """
+    Неизменяемая версия справочника. Статьи, группы и партнёры хранятся в кортежах и адресуются индексами:
+    items[i] - статья, groups[i][j] - группа статьи, partners[i][j][k] - партнёр группы.
+    Один экземпляр разделяется всеми диалогами, в user_data хранятся только номер версии и индексы.
+    """
+
+    __slots__ = ("version", "items", "groups", "partners", "_entries", "_prefix_indexes", "_fuzzy_index")
+
+    def __init__(self, options_dict: dict[str, dict[str, list[str]]]):
+        self.version = content_version(options_dict)
+        self.items: tuple[str, ...] = tuple(options_dict)
+        self.groups: tuple[tuple[str, ...], ...] = tuple(tuple(options_dict[item]) for item in self.items)
+        self.partners: tuple[tuple[tuple[str, ...], ...], ...] = tuple(
+            tuple(tuple(options_dict[item][group]) for group in groups)
+            for item, groups in zip(self.items, self.groups)
+        )
+        self._entries: frozenset[tuple[str, str, str]] = frozenset(
+            (item, group, partner)
+            for item, groups in options_dict.items()
+            for group, partners in groups.items()
+            for partner in partners
+        )
+        self._prefix_indexes: dict[tuple[int, ...], PrefixIndex] = {}
+        self._fuzzy_index: FuzzyIndex | None = None
+
+    def options(self, path: tuple[int, ...]) -> tuple[str, ...]:
+        """Варианты выбора на уровне path: () - статьи, (i,) - группы статьи i, (i, j) - партнёры группы j."""
+        if not path:
+            return self.items
+        if len(path) == 1:
+            return self.groups[path[0]]
+        return self.partners[path[0]][path[1]]
+
+    def search(self, path: tuple[int, ...], prefix: str) -> list[int]:
+        """Индексы вариантов уровня path, начинающихся с prefix. Индекс уровня строится при первом поиске."""
+        index = self._prefix_indexes.get(path)
+        if index is None:
+            index = self._prefix_indexes[path] = PrefixIndex(self.options(path))
+        return index.search(prefix)
+
+    @property
+    def fuzzy_index(self) -> FuzzyIndex:
+        """Индекс для inline-поиска по всем статьям и партнёрам, строится при первом обращении."""
+        if self._fuzzy_index is None:
+            self._fuzzy_index = FuzzyIndex(self)
+        return self._fuzzy_index
+
+    def contains(self, item: str, group: str, partner: str) -> bool:
+        """Есть ли в справочнике партнёр partner в группе group статьи item."""
+        return (item, group, partner) in self._entries
+
+    def same_content(self, other: "Catalog | None") -> bool:
+        """Совпадает ли содержимое справочника с другой версией."""
+        return (
+            other is not None
+            and self.items == other.items
+            and self.groups == other.groups
+            and self.partners == other.partners
+        )
+
+
+class CatalogCache:
+    """
+    Общий для процесса кэш справочника статей, групп и партнёров с листа "категории".
+    Обновляется фоновой задачей; при ошибке обновления продолжает отдавать последние полученные данные
+    и повторяет загрузку не раньше чем через RETRY_DELAY секунд.
+    Прежние версии справочника живут, пока на них ссылается хотя бы один незавершённый диалог.
+    """
+
+    RETRY_DELAY = 60  # секунды до повторной загрузки после ошибки, не больше ttl
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.current: Catalog | None = None
+        self.loaded_at: float | None = None
+        self._versions: dict[int, Catalog] = {}
+        self._refs: Counter = Counter()
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    @property
+    def is_stale(self) -> bool:
+        """Справочник не загружен или старше ttl секунд."""
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl
+
+    async def refresh(self) -> None:
+        """
+        Загрузка справочника из Google Sheets. Одновременно выполняется только одна загрузка.
+        Если содержимое не изменилось, текущая версия сохраняется.
+        """
+
+        async with self._lock:
+            manager = GoogleSheetsManager()
+            await manager.initialize_google_sheets()
+            options_dict, _ = await manager.get_data()
+            fresh = Catalog(options_dict)
+            self.loaded_at = time.monotonic()
+
+            if fresh.same_content(self.current):
+                logger.info("Справочник категорий не изменился.")
+                return
+
+            # Индекс inline-поиска строится в отдельном потоке до публикации версии
+            await asyncio.to_thread(lambda: fresh.fuzzy_index)
+            self._set_current(fresh)
+            logger.info(f"Справочник категорий обновлён: {len(fresh.items)} статей, версия {fresh.version}.")
+
+    def _set_current(self, fresh: Catalog) -> None:
+        """Публикация новой версии. Предыдущая удаляется, если на неё не ссылается ни один диалог."""
+
+        previous = self.current
+        self.current = fresh
+        self._versions[fresh.version] = fresh
+        if previous is not None and not self._refs[previous.version]:
+            self._versions.pop(previous.version, None)
+
+    async def refresh_safely(self) -> bool:
+        """
+        Обновление справочника без выброса исключений. Устаревшие данные остаются в кэше,
+        а следующая попытка из get откладывается на RETRY_DELAY секунд.
+        """
+
+        try:
+            await self.refresh()
+            return True
+        except Exception as e:
+            self.loaded_at = time.monotonic() - self.ttl + min(self.RETRY_DELAY, self.ttl)
+            logger.error(f"Не удалось обновить справочник категорий, используются прежние данные. Ошибка: {e}")
+            return False
+
+    async def get(self) -> Catalog:
+        """
+        Возвращает текущую версию справочника. Google Sheets запрашивается только если справочник ещё ни разу
+        не был загружен; устаревший справочник отдаётся сразу, а обновление запускается в фоне.
+        Одновременно выполняется не больше одной фоновой задачи обновления.
+        """
+
+        if self.current is None:
+            await self.refresh()
+        elif self.is_stale and not self._lock.locked() and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self.refresh_safely())
+
+        return self.current
+
+    async def acquire(self) -> Catalog:
+        """Текущая версия справочника, закреплённая за диалогом до вызова release."""
+
+        current = await self.get()
+        self._refs[current.version] += 1
+        return current
+
+    def version(self, version: int | None) -> Catalog | None:
+        """Версия справочника по номеру или None, если она уже не хранится (например, после перезапуска)."""
+        return self._versions.get(version)
+
+    def release(self, version: int | None) -> None:
+        """Снятие ссылки диалога на версию. Неактуальная версия без ссылок удаляется."""
+
+        if version not in self._refs:
+            return
+
+        self._refs[version] -= 1
+        if self._refs[version] <= 0:
+            del self._refs[version]
+            if self.current is None or version != self.current.version:
+                self._versions.pop(version, None)
+
+
+catalog = CatalogCache(Config.catalog_ttl)
@@ -0,0 +1,70 @@
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Hashable
+from contextlib import asynccontextmanager
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class KeyedLocks:
+    """
+    Реестр asyncio.Lock по ключу. Блокировка создаётся при первом обращении и удаляется,
+    как только её никто не держит и не ждёт, поэтому реестр не растёт с числом заявок и пользователей.
+    """
+
+    def __init__(self):
+        self._locks: dict[Hashable, list] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def __call__(self, key: Hashable) -> AsyncIterator[None]:
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+
+# Смена статуса одной заявки и связанные с ней сообщения выполняются по очереди
+approval_locks = KeyedLocks()
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Параллельная обработка обновлений с сохранением порядка для каждого пользователя в чате.
+    Обновления одного пользователя выполняются по одному в порядке поступления (как того требует
+    ConversationHandler), обновления разных пользователей - параллельно, не более max_concurrent_updates.
+    Ожидающее своей очереди обновление не занимает место в общем лимите.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._user_locks = KeyedLocks()
+
+    async def process_update(self, update: object, coroutine: Awaitable) -> None:
+        key = None
+        if isinstance(update, Update) and update.effective_user is not None:
+            chat_id = update.effective_chat.id if update.effective_chat is not None else None
+            key = (chat_id, update.effective_user.id)
+        if key is None:
+            await super().process_update(update, coroutine)
+            return
+        async with self._user_locks(key):
+            await super().process_update(update, coroutine)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
@@ -1,12 +1,22 @@
 import re
+from collections.abc import Sequence
 from datetime import datetime
 
-from telegram import Update, ForceReply, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import (
+    Update,
+    ForceReply,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+    Message,
+)
 from telegram.ext import ConversationHandler, ContextTypes
 
+from config.config import Config
 from config.logging_config import logger
 from budget_bot.handlers import submit_record_command
-from budget_bot.sheets import GoogleSheetsManager
+from budget_bot.catalog import Catalog, catalog
 
 (
     INPUT_SUM,
@@ -20,27 +30,90 @@ from budget_bot.sheets import GoogleSheetsManager
 ) = range(8)
 
 payment_types: list[str] = ["нал", "безнал", "крипта"]
-
-
-async def create_keyboard(massive: list[str]) -> InlineKeyboardMarkup:
-    """Функция для создания клавиатуры. Каждый кнопка создаётся с новой строки."""
+KEYBOARD_PAGE_SIZE = 20
+SEARCH_HINT = "Или отправьте начало названия для поиска."
+INLINE_RESULTS_LIMIT = 20
+# Последняя строка сообщения, отправленного из inline-режима: #версия.статья или #версия.статья.группа.партнёр
+INLINE_CHOICE_PATTERN = re.compile(r"#(\d+)\.(\d+)(?:\.(\d+)\.(\d+))?$")
+
+
+async def create_keyboard(
+        massive: Sequence[str], indexes: Sequence[int] | None = None, page: int = 0
+) -> InlineKeyboardMarkup:
+    """
+    Функция для создания клавиатуры. Каждая кнопка создаётся с новой строки, на странице не более
+    KEYBOARD_PAGE_SIZE кнопок и кнопки перехода "page_<номер>". indexes - номера показываемых вариантов
+    (например, найденных по началу названия), по умолчанию все.
+    """
+    indexes = range(len(massive)) if indexes is None else indexes
+    pages = max(1, -(-len(indexes) // KEYBOARD_PAGE_SIZE))
+    page = min(max(page, 0), pages - 1)
     keyboard = []
 
-    for number, item in enumerate(massive):
-        button = InlineKeyboardButton(item, callback_data=number)
+    for number in indexes[page * KEYBOARD_PAGE_SIZE:(page + 1) * KEYBOARD_PAGE_SIZE]:
+        button = InlineKeyboardButton(massive[number], callback_data=number)
         keyboard.append([button])
 
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton(f"« Назад ({page}/{pages})", callback_data=f"page_{page - 1}"))
+    if page < pages - 1:
+        navigation.append(InlineKeyboardButton(f"Вперёд » ({page + 2}/{pages})", callback_data=f"page_{page + 1}"))
+    if navigation:
+        keyboard.append(navigation)
+
     return InlineKeyboardMarkup(keyboard)
 
 
+def dialog_path(context: ContextTypes.DEFAULT_TYPE) -> tuple[int, ...]:
+    """Уровень справочника, из которого сейчас выбирает пользователь: (), (статья,) или (статья, группа)."""
+    return tuple(context.user_data[key] for key in ("item_index", "group_index") if key in context.user_data)
+
+
+async def browse_options(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int | None:
+    """
+    Листание списка статей, групп или партнёров и поиск по началу названия: текст, отправленный вместо
+    нажатия кнопки, сужает список. Поиск идёт по отсортированному индексу справочника. Состояние диалога не меняется.
+    """
+    current = await get_dialog_catalog(update, context)
+    if current is None:
+        return ConversationHandler.END
+
+    path = dialog_path(context)
+    options = current.options(path)
+    query = update.callback_query
+
+    if query:
+        await query.answer()
+        prefix = context.user_data.get("options_prefix")
+        indexes = current.search(path, prefix) if prefix else None
+        page = int(query.data.split("_")[1])
+        await query.edit_message_reply_markup(reply_markup=await create_keyboard(options, indexes, page))
+        return None
+
+    prefix = update.message.text
+    indexes = current.search(path, prefix)
+    if not indexes:
+        await update.message.reply_text(f'Ничего не найдено по началу "{prefix}". Попробуйте ещё раз.')
+        return None
+
+    context.user_data["options_prefix"] = prefix
+    await update.message.reply_text(
+        f"Найдено: {len(indexes)}. Выберите вариант:", reply_markup=await create_keyboard(options, indexes)
+    )
+    return None
+
+
 async def enter_record(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Начало диалога. Ввод суммы и получение данных о статьях, группах, партнёрах."""
-    manager = GoogleSheetsManager()
-    await manager.initialize_google_sheets()
-    options_dict, items = await manager.get_data()
+    """
+    Начало диалога. Ввод суммы и закрепление за диалогом текущей версии справочника статей, групп, партнёров.
+    В user_data хранятся только номер версии и индексы выбранных позиций; состояние прошлого диалога сбрасывается.
+    """
+    end_dialog(context)
+    current = await catalog.acquire()
 
     context.user_data["chat_id"] = update.effective_chat.id
-    context.user_data["options"], context.user_data["items"] = options_dict, items
+    context.user_data["catalog_version"] = current.version
 
     bot_message = await update.message.reply_text(
         "Введите сумму:",
@@ -51,6 +124,31 @@ async def enter_record(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     return INPUT_SUM
 
 
+def release_catalog(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Освобождение версии справочника, закреплённой за диалогом."""
+    catalog.release(context.user_data.pop("catalog_version", None))
+
+
+def end_dialog(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Сброс состояния диалога: освобождение версии справочника и очистка user_data, в том числе item_index,
+    group_index и options_prefix, по которым browse_options и dialog_path определяют уровень справочника.
+    """
+    release_catalog(context)
+    context.user_data.clear()
+
+
+async def get_dialog_catalog(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Catalog | None:
+    """Версия справочника, с которой начат диалог. Если её уже нет в памяти, диалог нужно начать заново."""
+    current = catalog.version(context.user_data.get("catalog_version"))
+    if current is None:
+        end_dialog(context)
+        await update.effective_message.reply_text(
+            "Справочник категорий был обновлён. Начните заново с командой /enter_record"
+        )
+    return current
+
+
 async def input_sum(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработчик ввода суммы и выбор категории."""
     user_sum = update.message.text
@@ -69,15 +167,19 @@ async def input_sum(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
     del context.user_data["enter_sum_message_id"]
 
+    current = await get_dialog_catalog(update, context)
+    if current is None:
+        return ConversationHandler.END
+
     context.user_data["sum"] = user_sum
     await update.message.reply_text(f"Введена сумма: {user_sum}")
 
-    items = context.user_data["items"]
-
-    reply_markup = await create_keyboard(items)
+    reply_markup = await create_keyboard(current.items)
 
     await update.message.reply_text(
-        "Выберите статью расхода:", reply_markup=reply_markup
+        f"Выберите статью расхода:\n{SEARCH_HINT}\n"
+        f"Статью или партнёра можно найти сразу: наберите @{context.bot.username} и название.",
+        reply_markup=reply_markup,
     )
 
     return INPUT_ITEM
@@ -86,55 +188,65 @@ async def input_sum(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 async def input_item(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработчик выбора категории платежа."""
     query = update.callback_query
-    selected_item = context.user_data["items"][int(query.data)]
-    logger.info(f"Выбрана статья расхода: {selected_item}")
-    await query.edit_message_text(f"Выбрана статья расхода: {selected_item}")
+    current = await get_dialog_catalog(update, context)
+    if current is None:
+        return ConversationHandler.END
 
+    item_index = int(query.data)
+    logger.info("Выбрана статья расхода: %s", current.items[item_index])
+    await query.edit_message_text(f"Выбрана статья расхода: {current.items[item_index]}")
+    return await select_item(query.message, context, current, item_index)
+
+
+async def select_item(message: Message, context: ContextTypes.DEFAULT_TYPE, current: Catalog, item_index: int) -> int:
+    """
+    Переход к выбору группы после выбора статьи кнопкой или через inline-режим.
+    Единственная группа и единственный партнёр выбираются сразу.
+    """
+    selected_item = current.items[item_index]
+    context.user_data.pop("options_prefix", None)
+    context.user_data.pop("group", None)
+    context.user_data.pop("group_index", None)
     context.user_data["item"] = selected_item
-    context.user_data["options"] = context.user_data["options"].get(selected_item)
-    groups = list(context.user_data["options"].keys())
-    context.user_data["groups"] = groups
-
-    del context.user_data["items"]
+    context.user_data["item_index"] = item_index
+    groups = current.groups[item_index]
 
     if len(groups) == 1:
 
-        selected_group = context.user_data["groups"][0]
-        logger.info(f"Выбрана группа расхода: {selected_group}")
+        selected_group = groups[0]
+        logger.info("Выбрана группа расхода: %s", selected_group)
         context.user_data["group"] = selected_group
-        partners = context.user_data["options"].get(selected_group)
-        context.user_data["partners"] = context.user_data["options"].get(selected_group)
-        del context.user_data["options"]
-        del context.user_data["groups"]
+        context.user_data["group_index"] = 0
+        partners = current.partners[item_index][0]
 
         await context.bot.send_message(
             context.user_data["chat_id"], f"Выбрана группа расхода: {selected_group}"
         )
 
         if len(partners) == 1:
-            selected_partner = context.user_data["partners"][0]
-            logger.info(f"Выбран партнёр расхода: {selected_partner}")
+            selected_partner = partners[0]
+            logger.info("Выбран партнёр расхода: %s", selected_partner)
             context.user_data["partner"] = selected_partner
-            del context.user_data["partners"]
+            release_catalog(context)
 
             await context.bot.send_message(
                 context.user_data["chat_id"], f"Выбран партнёр: {selected_partner}"
             )
 
-            await query.message.reply_text(
+            await message.reply_text(
                 "Введите комментарий для отчёта:",
                 reply_markup=ForceReply(selective=True),
             )
             return INPUT_COMMENT
 
-        reply_markup = await create_keyboard(context.user_data["partners"])
-        await query.message.reply_text("Выберите партнёра:", reply_markup=reply_markup)
+        reply_markup = await create_keyboard(partners)
+        await message.reply_text(f"Выберите партнёра:\n{SEARCH_HINT}", reply_markup=reply_markup)
 
         return INPUT_PARTNER
 
     reply_markup = await create_keyboard(groups)
-    await query.message.reply_text(
-        "Выберите группу расхода:", reply_markup=reply_markup
+    await message.reply_text(
+        f"Выберите группу расхода:\n{SEARCH_HINT}", reply_markup=reply_markup
     )
 
     return INPUT_GROUP
@@ -143,21 +255,26 @@ async def input_item(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 async def input_group(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработчик выбора группы расходов."""
     query = update.callback_query
-    selected_group = context.user_data["groups"][int(query.data)]
-    logger.info(f"Выбрана группа расхода: {selected_group}")
+    current = await get_dialog_catalog(update, context)
+    if current is None:
+        return ConversationHandler.END
+
+    item_index = context.user_data["item_index"]
+    group_index = int(query.data)
+    selected_group = current.groups[item_index][group_index]
+    logger.info("Выбрана группа расхода: %s", selected_group)
     await query.edit_message_text(f"Выбрана группа расхода: {selected_group}")
 
+    context.user_data.pop("options_prefix", None)
     context.user_data["group"] = selected_group
-    partners = context.user_data["options"].get(selected_group)
-    context.user_data["partners"] = partners
-    del context.user_data["options"]
-    del context.user_data["groups"]
+    context.user_data["group_index"] = group_index
+    partners = current.partners[item_index][group_index]
 
     if len(partners) == 1:
-        selected_partner = context.user_data["partners"][0]
-        logger.info(f"Выбран партнёр расхода: {selected_partner}")
+        selected_partner = partners[0]
+        logger.info("Выбран партнёр расхода: %s", selected_partner)
         context.user_data["partner"] = selected_partner
-        del context.user_data["partners"]
+        release_catalog(context)
         await context.bot.send_message(
             context.user_data["chat_id"], f"Выбран партнёр: {selected_partner}"
         )
@@ -168,8 +285,8 @@ async def input_group(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
         )
         return INPUT_COMMENT
 
-    reply_markup = await create_keyboard(context.user_data["partners"])
-    await query.message.reply_text("Выберите партнёра:", reply_markup=reply_markup)
+    reply_markup = await create_keyboard(partners)
+    await query.message.reply_text(f"Выберите партнёра:\n{SEARCH_HINT}", reply_markup=reply_markup)
 
     return INPUT_PARTNER
 
@@ -177,12 +294,18 @@ async def input_group(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
 async def input_partner(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработчик выбора партнёра к группе расходов платежа и создание цитирования для ввода комментария"""
     query = update.callback_query
-    selected_partner = context.user_data["partners"][int(query.data)]
-    logger.info(f"Выбран партнёр расхода: {selected_partner}")
+    current = await get_dialog_catalog(update, context)
+    if current is None:
+        return ConversationHandler.END
+
+    item_index, group_index = context.user_data["item_index"], context.user_data["group_index"]
+    selected_partner = current.partners[item_index][group_index][int(query.data)]
+    logger.info("Выбран партнёр расхода: %s", selected_partner)
     await query.edit_message_text(f"Выбран партнёр: {selected_partner}")
 
+    context.user_data.pop("options_prefix", None)
     context.user_data["partner"] = selected_partner
-    del context.user_data["partners"]
+    release_catalog(context)
 
     await query.message.reply_text(
         "Введите комментарий для отчёта:",
@@ -191,16 +314,99 @@ async def input_partner(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     return INPUT_COMMENT
 
 
+async def inline_search(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Inline-запрос "@бот текст": подсказки статей и партнёров из справочника по началу названия
+    или по словам из названий партнёра и статьи, с допуском опечаток.
+    """
+    inline_query = update.inline_query
+    if inline_query.from_user.id not in Config.white_list or len(inline_query.query.strip()) < 2:
+        await inline_query.answer([], cache_time=0, is_personal=True)
+        return
+
+    current = await catalog.get()
+    results = []
+    for path in current.fuzzy_index.search(inline_query.query, INLINE_RESULTS_LIMIT):
+        code = ".".join(map(str, (current.version, *path)))
+        if len(path) == 1:
+            item = current.items[path[0]]
+            results.append(
+                InlineQueryResultArticle(
+                    id=code,
+                    title=item,
+                    description="Статья расхода",
+                    input_message_content=InputTextMessageContent(f"{item}\n#{code}"),
+                )
+            )
+            continue
+
+        i, j, k = path
+        item, group, partner = current.items[i], current.groups[i][j], current.partners[i][j][k]
+        results.append(
+            InlineQueryResultArticle(
+                id=code,
+                title=partner,
+                description=f"{item} / {group}",
+                input_message_content=InputTextMessageContent(f"{partner}\n{item} / {group}\n#{code}"),
+            )
+        )
+
+    await inline_query.answer(results, cache_time=60, is_personal=True)
+
+
+async def choose_from_inline(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int | None:
+    """
+    Выбор через inline-режим на шаге выбора статьи, группы или партнёра. Для партнёра статья, группа и партнёр
+    заполняются сразу и диалог переходит к вводу комментария, для статьи - к выбору её группы.
+    """
+    version, i, j, k = INLINE_CHOICE_PATTERN.search(update.message.text).groups()
+    chosen = catalog.version(int(version))
+    if k is None:
+        current = await get_dialog_catalog(update, context)
+        if current is None:
+            return ConversationHandler.END
+        # Индексы кода относятся к версии из результата поиска, статья ищется по названию в версии диалога
+        try:
+            item_index = current.items.index(chosen.items[int(i)])
+        except (AttributeError, IndexError, ValueError):
+            await update.message.reply_text("Справочник категорий был обновлён. Найдите статью ещё раз.")
+            return None
+
+        logger.info("Выбрана через поиск статья расхода: %s", current.items[item_index])
+        await update.message.reply_text(f"Выбрана статья расхода: {current.items[item_index]}")
+        return await select_item(update.message, context, current, item_index)
+
+    i, j, k = int(i), int(j), int(k)
+    try:
+        item, group, partner = chosen.items[i], chosen.groups[i][j], chosen.partners[i][j][k]
+    except (AttributeError, IndexError):
+        await update.message.reply_text("Справочник категорий был обновлён. Найдите партнёра ещё раз.")
+        return None
+
+    logger.info("Выбраны через поиск статья %s, группа %s, партнёр %s", item, group, partner)
+    context.user_data.pop("options_prefix", None)
+    context.user_data["item"], context.user_data["group"], context.user_data["partner"] = item, group, partner
+    release_catalog(context)
+
+    await update.message.reply_text(f"Выбраны статья: {item}, группа: {group}, партнёр: {partner}")
+    await update.message.reply_text(
+        "Введите комментарий для отчёта:",
+        reply_markup=ForceReply(selective=True),
+    )
+    return INPUT_COMMENT
+
+
 async def input_comment(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработчик ввода комментария к платежу и создание цитирования для ввода дат"""
     user_comment = update.message.text
 
     pattern = r"^\S.*"
     if not re.fullmatch(pattern, user_comment):
+        end_dialog(context)
         await update.message.reply_text("Некорректный комментарий. Попробуйте ещё раз")
         return ConversationHandler.END
 
-    logger.info(f"Введён комментарий {user_comment}")
+    logger.info("Введён комментарий %s", user_comment)
     context.user_data["comment"] = user_comment
 
     await update.message.from_user.delete_message(update.message.message_id)
@@ -238,7 +444,7 @@ async def input_dates(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
         return INPUT_DATES
 
     context.user_data["dates"] = user_dates
-    logger.info(f"Введены даты: {user_dates}")
+    logger.info("Введены даты: %s", user_dates)
     await update.message.reply_text(f"Введены даты: {user_dates}")
 
     await update.message.from_user.delete_message(update.message.message_id)
@@ -254,7 +460,7 @@ async def input_payment_type(update: Update, context: ContextTypes.DEFAULT_TYPE)
     query = update.callback_query
     await query.answer()
     payment_type = payment_types[int(query.data)]
-    logger.info(f"Выбран тип платежа: {payment_type}")
+    logger.info("Выбран тип платежа: %s", payment_type)
     await query.edit_message_text(f"Выбран тип платежа: {payment_type}")
 
     final_command = (
@@ -283,31 +489,38 @@ async def input_payment_type(update: Update, context: ContextTypes.DEFAULT_TYPE)
     return CONFIRM_COMMAND
 
 
-async def confirm_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Обработчик подтверждения и отклонения итоговой команды."""
+async def confirm_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int | None:
+    """Обработчик подтверждения и отклонения итоговой команды. В обоих случаях диалог завершается."""
     query = update.callback_query
     await query.answer()
     await query.edit_message_reply_markup(reply_markup=None)
 
     if query.data == "Подтвердить":
         context.args = context.user_data.get("final_command").split()
-        context.user_data.clear()
-        logger.info(f"Платёж подтверждён @{query.from_user.username}")
+        end_dialog(context)
+        logger.info("Платёж подтверждён @%s", query.from_user.username)
         await submit_record_command(update, context)
+        return ConversationHandler.END
 
     elif query.data == "Отмена":
-        logger.info(f"Платёж отменён @{query.from_user.username}")
-        await stop_dialog(update, context)
+        logger.info("Платёж отменён @%s", query.from_user.username)
+        return await stop_dialog(update, context)
 
 
 async def stop_dialog(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Обработчик команды /stop."""
+    """Обработчик команды /stop и кнопки "Отмена"."""
 
-    context.user_data.clear()
+    end_dialog(context)
 
-    await update.message.reply_text(
+    await update.effective_message.reply_text(
         "Диалог был остановлен. Начните заново с командой /enter_record",
         reply_markup=InlineKeyboardMarkup([]),
     )
 
     return ConversationHandler.END
+
+
+async def dialog_timeout(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Завершение брошенного диалога по таймауту: освобождает версию справочника и очищает user_data."""
+
+    end_dialog(context)
@@ -0,0 +1,32 @@
+from collections import Counter
+
+import gspread_asyncio
+from google.oauth2.service_account import Credentials
+
+from config.config import Config
+
+
+def get_credentials() -> Credentials:
+    """Функция для получения данных для авторизации в Google Sheets"""
+
+    creds = Credentials.from_service_account_file(Config.google_sheets_credentials_file)
+    scoped = creds.with_scopes(
+        [
+            "https://spreadsheets.google.com/feeds",
+            "https://www.googleapis.com/auth/spreadsheets",
+            "https://www.googleapis.com/auth/drive",
+        ]
+    )
+    return scoped
+
+
+class CountingClientManager(gspread_asyncio.AsyncioGspreadClientManager):
+    """Менеджер клиента gspread, подсчитывающий обращения к Google Sheets API по имени метода."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.api_calls = Counter()
+
+    async def before_gspread_call(self, method, args, kwargs) -> None:
+        self.api_calls[method.__name__] += 1
+        await super().before_gspread_call(method, args, kwargs)
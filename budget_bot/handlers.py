@@ -1,5 +1,5 @@
+import asyncio
 import re
-import textwrap
 from datetime import datetime
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
@@ -8,7 +8,20 @@ from telegram.ext import ContextTypes
 from config.config import Config
 from config.logging_config import logger
 from db import db
-from budget_bot.sheets import GoogleSheetsManager
+from db.db import OPEN_STATUSES
+from budget_bot.accruals import record_accruals
+from budget_bot.bulk import BULK_COLUMNS, parse_bulk_rows, read_rows
+from budget_bot.catalog import catalog
+from budget_bot.concurrency import approval_locks
+from budget_bot.metrics import JOB_SECONDS, timed
+from budget_bot.outbox import flush_sheets_outbox
+from budget_bot.rate_limit import telegram_limiter
+from budget_bot.sheets import get_today_moscow_time, sheets_client
+
+NOT_PAID_PAGE_SIZE = 10
+NOT_PAID_LINE_WIDTH = 400  # страница из NOT_PAID_PAGE_SIZE заявок укладывается в лимит Telegram 4096 символов
+APPROVE_BATCH_PAGE_SIZE = 20
+BATCH_TEXT_LIMIT = 3500  # список заявок пакета и ошибок загрузки обрезается, чтобы уложиться в 4096 символов
 
 
 async def chat_ids_department(department: str) -> list[int]:
@@ -26,7 +39,7 @@ async def chat_ids_department(department: str) -> list[int]:
 
 
 async def check_access(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    logger.info(update.effective_user.id)
+    logger.info("Обращение пользователя %s", update.effective_user.id)
     if update.effective_user.id not in Config.white_list:
         await update.message.reply_text("Извините, у вас нет доступа к этому боту.")
         logger.warning("В чат пытаются зайти посторонние")
@@ -47,9 +60,12 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     "<i>6)Форма оплаты</i>\n"
     "<i>7)Комментарий к платежу</i>\n"
     "<i>Каждый пункт необходимо указывать строго через запятую.</i>\n\n"
+    f"<i>Пакет заявок можно загрузить файлом CSV или XLSX со столбцами: {', '.join(BULK_COLUMNS)}</i>\n\n"
     "<i>Вы можете просмотреть необработанные заявки командой /show_not_processed</i>\n\n"
     "<i>Одобрить заявку можно командой /approve_record указав id заявки</i>\n\n"
+    "<i>Одобрить или отклонить сразу несколько заявок можно командой /approve_batch</i>\n\n"
     "<i>Отклонить заявку можно командой /reject_record указав id заявки</i>\n\n"
+    "<i>Итоги оплаченных заявок по статьям, группам и месяцам - команда /report [mm.yy] [mm.yy]</i>\n\n"
     f"<i>Ваш chat_id - {update.message.chat_id}</i>",
     parse_mode="HTML"
     )
@@ -126,7 +142,7 @@ async def submit_record_command(update: Update, context: ContextTypes.DEFAULT_TY
 
     try:
         async with db:
-            approval_id: int = await db.insert_record(record_dict)
+            approval_id: int = await db.insert_record(record_dict, record_accruals(record_dict))
     except Exception as e:
         raise RuntimeError(f"Произошла ошибка при добавлении счёта в базу данных. {e}")
 
@@ -135,6 +151,89 @@ async def submit_record_command(update: Update, context: ContextTypes.DEFAULT_TY
     )
 
 
+async def submit_document(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Обработчик загруженного файла CSV/XLSX с пакетом заявок, по одной заявке в строке.
+    Строки сверяются со справочником категорий, корректные добавляются в базу одной транзакцией
+    и отправляются на одобрение одним сообщением; ошибки по строкам возвращаются одним ответом.
+    """
+
+    document = update.message.document
+    file = await document.get_file()
+    content = bytes(await file.download_as_bytearray())
+    current = await catalog.get()
+
+    try:
+        records, errors = parse_bulk_rows(read_rows(document.file_name, content), current)
+    except Exception as e:
+        await update.message.reply_text(f"Не удалось прочитать файл {document.file_name}: {e}")
+        return
+
+    reply = f"Принято заявок: {len(records)}."
+    if errors:
+        reply += f" Строк с ошибками: {len(errors)}.\n" + truncate_lines(
+            [f"строка {line_number}: {error}" for line_number, error in errors], "ошибок"
+        )
+    await update.message.reply_text(reply)
+    logger.info("Загружен пакет из %s: принято %d, ошибок %d.", document.file_name, len(records), len(errors))
+
+    if not records:
+        return
+
+    try:
+        async with db:
+            approval_ids = await db.insert_records(records, [record_accruals(record) for record in records])
+    except Exception as e:
+        raise RuntimeError(f"Произошла ошибка при добавлении пакета заявок в базу данных. {e}")
+
+    batch = [{**record, "id": approval_id} for approval_id, record in zip(approval_ids, records)]
+    await create_and_send_batch_approval_message(
+        approval_ids[0], approval_ids[-1], update.effective_chat.id, batch, "head", context
+    )
+
+
+def expected_status_for(department: str) -> str:
+    """Статус заявок, ожидающих решения отдела department: 'Not processed' для 'head', 'Pending' для 'finance'."""
+
+    return "Not processed" if department == "head" else "Pending"
+
+
+def format_record_line(record: dict) -> str:
+    """Строка заявки в списках пакетов: id, сумма, статья / группа / партнёр, период, форма оплаты, комментарий."""
+
+    return (
+        f'{record["id"]}: {record["amount"]}, {record["expense_item"]} / {record["expense_group"]} / '
+        f'{record["partner"]}, {record["period"]}, {record["payment_method"]}, {record["comment"]}'
+    )
+
+
+def page_window(
+        rows: list[dict], page_size: int, after_id: int, before_id: int | None
+) -> tuple[list[dict], bool, bool]:
+    """
+    Страница списка с курсором по id из выборки с limit=page_size + 1: вперёд - записи после after_id,
+    назад - записи перед before_id. Возвращает строки страницы и признаки наличия предыдущей и следующей страниц.
+    """
+
+    if before_id is None:
+        return rows[:page_size], after_id > 0, len(rows) > page_size
+    return rows[-page_size:], len(rows) > page_size, True
+
+
+def truncate_lines(lines: list[str], noun: str) -> str:
+    """Склеивает строки, пока текст укладывается в BATCH_TEXT_LIMIT; остаток заменяется счётчиком."""
+
+    text, length = [], 0
+    for shown, line in enumerate(lines):
+        line = line[:NOT_PAID_LINE_WIDTH]
+        if length + len(line) > BATCH_TEXT_LIMIT:
+            text.append(f"... и ещё {len(lines) - shown} {noun}")
+            break
+        text.append(line)
+        length += len(line) + 1
+    return "\n".join(text)
+
+
 async def reject_record_command(
         update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
@@ -155,13 +254,11 @@ async def reject_record_command(
 
     row_id = row_id[0]
 
-    async with db:
-        result = await db.get_row_by_id(row_id)
-
-        if not result:
-            raise RuntimeError(f"Запись с id: {row_id} не найдена.")
+    async with approval_locks(row_id), db:
+        result = await db.transition(row_id, OPEN_STATUSES, {"status": "Rejected"})
 
-        await db.update_row_by_id(row_id, {"status": "Rejected"})
+    if not result:
+        raise RuntimeError(f"Открытая заявка с id: {row_id} не найдена.")
 
     await update.message.reply_text(f"Заявка {row_id} отклонена.")
 
@@ -201,7 +298,45 @@ async def create_and_send_approval_message(
     )
 
     chat_ids = await chat_ids_department(department)
-    await send_message_to_chats(chat_ids, message_text, context, reply_markup)
+    notify_chats(chat_ids, message_text, context, reply_markup)
+
+
+async def create_and_send_batch_approval_message(
+        first_id: int,
+        last_id: int,
+        initiator_chat_id: str | int,
+        records: list[dict],
+        department: str,
+        context: ContextTypes.DEFAULT_TYPE,
+) -> None:
+    """
+    Одно сообщение на одобрение пакета заявок с id от first_id до last_id: список заявок
+    и кнопки "Одобрить все" и "Отклонить все".
+    """
+
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                "Одобрить все",
+                callback_data=f"batch_{department}_approve_{first_id}_{last_id}_{initiator_chat_id}",
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                "Отклонить все",
+                callback_data=f"batch_{department}_reject_{first_id}_{last_id}_{initiator_chat_id}",
+            )
+        ],
+    ]
+    total = sum(float(record["amount"]) for record in records)
+    lines = [format_record_line(record) for record in records]
+    message_text = (
+        f"Пожалуйста, одобрите пакет запросов на платеж {first_id}-{last_id}: "
+        f"{len(records)} заявок на сумму {total:.2f}.\n" + truncate_lines(lines, "заявок")
+    )
+
+    chat_ids = await chat_ids_department(department)
+    notify_chats(chat_ids, message_text, context, InlineKeyboardMarkup(keyboard))
 
 
 async def create_and_send_payment_message(
@@ -222,24 +357,161 @@ async def create_and_send_payment_message(
         f'{record["payment_method"]}, комментарий: {record["comment"]}'
     )
     chat_ids = await chat_ids_department("payers")
-    await send_message_to_chats(chat_ids, message_text, context, reply_markup)
+    notify_chats(chat_ids, message_text, context, reply_markup)
 
 
-async def send_message_to_chats(chat_ids: list[int], text: str, context: ContextTypes.DEFAULT_TYPE, reply_markup=None):
-    """Отправка сообщения в выбранные телеграм-чаты."""
+async def create_and_send_batch_payment_message(records: list[dict], context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Одно общее сообщение плательщикам о пакете одобренных заявок с кнопкой "Оплачено" для каждой заявки.
+    Заявки выводятся частями по NOT_PAID_PAGE_SIZE, чтобы текст уложился в лимит Telegram.
+    """
 
-    for chat_id in chat_ids:
-        await context.bot.send_message(
-            chat_id=chat_id, text=text, reply_markup=reply_markup
-        )
+    chat_ids = await chat_ids_department("payers")
+    parts = [records[start:start + NOT_PAID_PAGE_SIZE] for start in range(0, len(records), NOT_PAID_PAGE_SIZE)]
+    for number, part in enumerate(parts, start=1):
+        lines = []
+        for record in part:
+            line = (
+                f'{record["id"]}: сумма {record["amount"]}, статья: {record["expense_item"]}, '
+                f'группа: {record["expense_group"]}, партнер: {record["partner"]}, '
+                f'период начисления: {record["period"]}, форма оплаты: {record["payment_method"]}, '
+                f'комментарий: {record["comment"]}, одобрено: {record["approved_by"]}'
+            )
+            lines.append(line[:NOT_PAID_LINE_WIDTH])
+        header = f"Одобрены к оплате заявки ({number}/{len(parts)}). Пожалуйста, оплатите заявки:"
+        keyboard = [
+            [InlineKeyboardButton(f"Оплачено {record['id']}", callback_data=f"pay_{record['id']}_batch")]
+            for record in part
+        ]
+        notify_chats(chat_ids, "\n\n".join([header, *lines]), context, InlineKeyboardMarkup(keyboard))
 
 
-async def add_record_to_google_sheet(record: dict) -> None:
-    """Функция для добавления строки в таблицу Google Sheet."""
+async def send_message_to_chats(
+        chat_ids: list[int], text: str, context: ContextTypes.DEFAULT_TYPE, reply_markup=None
+) -> dict[int, Exception]:
+    """
+    Параллельная отправка сообщения в выбранные телеграм-чаты с соблюдением лимитов Telegram.
+    Ошибка отправки в один чат не прерывает рассылку; возвращает ошибки по chat_id.
+    """
+
+    results = await asyncio.gather(
+        *(
+            telegram_limiter.send_message(context.bot, chat_id, text=text, reply_markup=reply_markup)
+            for chat_id in chat_ids
+        ),
+        return_exceptions=True,
+    )
+
+    failures = {chat_id: result for chat_id, result in zip(chat_ids, results) if isinstance(result, Exception)}
+    for chat_id, error in failures.items():
+        logger.error("Не удалось отправить сообщение в чат %s. Ошибка: %s", chat_id, error)
+    return failures
+
+
+def notify_chats(chat_ids: list[int], text: str, context: ContextTypes.DEFAULT_TYPE, reply_markup=None) -> None:
+    """
+    Рассылка send_message_to_chats в фоновой задаче приложения: обработчик не ждёт лимитов групповых чатов,
+    и следующие обновления того же пользователя не встают за ней в очередь. Незавершённые рассылки
+    дожидаются при остановке приложения.
+    """
+
+    context.application.create_task(
+        send_message_to_chats(chat_ids, text, context, reply_markup), name="notify_chats"
+    )
+
+
+async def refresh_catalog_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Обработчик команды /refresh_catalog. Принудительно перезагружает справочник категорий."""
+
+    if await catalog.refresh_safely():
+        await update.message.reply_text(f"Справочник категорий обновлён. Статей: {len(catalog.current.items)}.")
+    else:
+        await update.message.reply_text("Не удалось обновить справочник категорий, используются прежние данные.")
+
+
+def parse_report_month(text: str) -> int:
+    """Месяц отчёта из строки mm.yy в виде yyyymm. Выбрасывает ValueError при неверной дате."""
+
+    month = datetime.strptime(text, "%m.%y")
+    return month.year * 100 + month.month
+
+
+def format_report_month(month: int) -> str:
+    return f"{month % 100:02d}.{month // 100 % 100:02d}"
+
+
+async def report_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Обработчик команды /report [mm.yy] [mm.yy]. Итоги оплаченных заявок по месяцам начисления, группам и статьям
+    за месяц или период (по умолчанию - текущий месяц). Данные берутся из таблицы итогов 'spend_by_month',
+    поэтому время ответа не зависит от числа заявок в базе.
+    """
+
+    if len(context.args) > 2:
+        await update.message.reply_text("Укажите месяц или начало и конец периода в формате mm.yy.")
+        return
+    try:
+        months = [parse_report_month(text) for text in context.args]
+    except ValueError:
+        await update.message.reply_text('Даты вводятся в формате mm.yy, например: "/report 01.24 06.24".')
+        return
+    if not months:
+        today = await get_today_moscow_time()
+        months = [today.year * 100 + today.month]
+    month_from, month_to = min(months), max(months)
+
+    async with db:
+        rows = await db.spend_report(month_from, month_to)
+
+    period = format_report_month(month_from)
+    if month_to != month_from:
+        period += f" - {format_report_month(month_to)}"
+    if not rows:
+        await update.message.reply_text(f"Оплаченных заявок за {period} нет.")
+        return
+
+    by_month, by_group, by_item = {}, {}, {}
+    for month, group, item, amount, payments in rows:
+        for totals, key in ((by_month, month), (by_group, group), (by_item, (group, item))):
+            total = totals.setdefault(key, [0.0, 0])
+            total[0] += amount
+            total[1] += payments
+
+    lines = [
+        f"Оплаченные заявки за {period}",
+        f"Итого: {sum(total[0] for total in by_month.values()):.2f} "
+        f"(начислений: {sum(total[1] for total in by_month.values())})",
+        "",
+        "По месяцам:",
+        *(f"{format_report_month(month)}: {amount:.2f} ({payments})" for month, (amount, payments) in by_month.items()),
+        "",
+        "По группам:",
+        *(f"{group}: {amount:.2f} ({payments})" for group, (amount, payments) in sorted(by_group.items())),
+        "",
+        "По статьям:",
+        *(
+            f"{group} / {item}: {amount:.2f} ({payments})"
+            for (group, item), (amount, payments) in sorted(by_item.items())
+        ),
+    ]
+    await update.message.reply_text(truncate_lines(lines, "строк"))
+
+
+@timed(JOB_SECONDS)
+async def refresh_catalog_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Периодическое фоновое обновление справочника категорий."""
 
-    manager = GoogleSheetsManager()
-    await manager.initialize_google_sheets()
-    await manager.add_payment_to_sheet(record)
+    await catalog.refresh_safely()
+
+
+@timed(JOB_SECONDS)
+async def warm_up_sheets_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Периодическое продление авторизации в Google Sheets до истечения токена."""
+
+    try:
+        await sheets_client.warm_up()
+    except Exception as e:
+        logger.error(f"Не удалось обновить авторизацию в Google Sheets. Ошибка: {e}")
 
 
 async def process_pay(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -250,25 +522,34 @@ async def process_pay(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     try:
         response_list = update.callback_query.data.split("_")
         approval_id = response_list[1]
+        in_batch = response_list[2:] == ["batch"]
 
     except Exception as e:
         raise RuntimeError(f'Ошибка считывания данных с кнопки "Оплачено". Ошибка: {e}')
 
-    async with db:
-        record = await db.get_row_by_id(approval_id)
-
-        if not record:
-            raise RuntimeError(f"Запись {approval_id} для оплаты не найдена в таблице")
-
-    async with db:
-        await db.update_row_by_id(approval_id, {"status": "Paid"})
-
-    await update.callback_query.edit_message_text(
-        text=f"Заявка {approval_id} оплачена.", reply_markup=InlineKeyboardMarkup([])
-    )
+    # Нажатия на кнопки одной заявки обрабатываются по очереди
+    async with approval_locks(approval_id):
+        # Смена статуса и постановка в очередь на выгрузку в таблицу - одна транзакция
+        paid_date = (await get_today_moscow_time()).isoformat()
+        async with db:
+            record = await db.pay_and_enqueue(approval_id, paid_date)
+
+        if in_batch:
+            # В общем сообщении о пакете убирается только кнопка этой заявки
+            query = update.callback_query
+            await query.answer(f"Заявка {approval_id} оплачена." if record else f"Заявка {approval_id} уже обработана.")
+            keyboard = [row for row in query.message.reply_markup.inline_keyboard if row[0].callback_data != query.data]
+            await query.edit_message_reply_markup(reply_markup=InlineKeyboardMarkup(keyboard))
+        elif record:
+            await update.callback_query.edit_message_text(
+                text=f"Заявка {approval_id} оплачена.", reply_markup=InlineKeyboardMarkup([])
+            )
+        else:
+            await report_already_processed(approval_id, update)
 
-    # При нажатии "Оплачено" добавляем данные в таблицу
-    await add_record_to_google_sheet(record)
+        if record:
+            # Выгрузка в Google Sheets выполняется в фоне, не задерживая ответ пользователю
+            context.job_queue.run_once(flush_sheets_outbox, when=0)
 
 
 async def process_approval(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -283,38 +564,86 @@ async def process_approval(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         initiator_id = response_list[4]
         approved_user = "@" + update.callback_query.from_user.username
 
-        async with db:
-            record = await db.get_row_by_id(approval_id)
-            if not record:
-                raise RuntimeError("Запись в таблице с данным id не найдена.")
+    except Exception as e:
+        raise RuntimeError(f'Ошибка обработки кнопок "Одобрить" и "Отклонить". Ошибка: {e}')
+
+    async with approval_locks(approval_id):
+        await handle_head_approval(
+            context,
+            approval_id,
+            initiator_id,
+            approved_user,
+            department,
+            action,
+            update=update,
+        )
+
 
-            approved_users_in_db = record["approved_by"]
-            if approved_users_in_db:
-                approved_users = f"{approved_users_in_db}, {approved_user}"
-            else:
-                approved_users = approved_user
+async def process_batch_approval(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Обработчик кнопок "Одобрить все" и "Отклонить все" для пакета заявок.
+    Все заявки пакета, ещё ожидающие решения этого отдела, обновляются одним запросом.
+    """
+
+    try:
+        response_list = update.callback_query.data.split("_")
+        department, action = response_list[1:3]
+        first_id, last_id = int(response_list[3]), int(response_list[4])
+        initiator_id = response_list[5]
+        approved_user = "@" + update.callback_query.from_user.username
 
     except Exception as e:
-        raise RuntimeError(f'Ошибка обработки кнопок "Одобрить" и "Отклонить". Ошибка: {e}')
+        raise RuntimeError(f'Ошибка обработки кнопок "Одобрить все" и "Отклонить все". Ошибка: {e}')
 
-    await handle_head_approval(
-        context,
-        approval_id,
-        initiator_id,
-        approved_users,
-        record,
-        department,
-        action,
-        update=update,
+    expected_status = expected_status_for(department)
+    async with db:
+        if action == "reject":
+            records = await db.transition_range(
+                first_id,
+                last_id,
+                expected_status,
+                {"approvals_received": 1 if department == "finance" else 0, "status": "Rejected"},
+            )
+        else:
+            records = await db.approve_range(first_id, last_id, expected_status, approved_user)
+
+    if not records:
+        await update.callback_query.edit_message_text(
+            text=f"Пакет заявок {first_id}-{last_id} уже обработан.", reply_markup=InlineKeyboardMarkup([])
+        )
+        return
+
+    if action == "reject":
+        await update.callback_query.edit_message_text(
+            text=f"Пакет заявок {first_id}-{last_id} отклонён: {len(records)} заявок.",
+            reply_markup=InlineKeyboardMarkup([]),
+        )
+        await context.bot.send_message(
+            initiator_id, f"Пакет заявок {first_id}-{last_id} отклонён {approved_user}: {len(records)} заявок."
+        )
+        return
+
+    pending = [record for record in records if record["status"] == "Pending"]
+    approved = [record for record in records if record["status"] == "Approved"]
+    await update.callback_query.edit_message_text(
+        text=f"Пакет заявок {first_id}-{last_id} одобрен: {len(records)} заявок. "
+             f"Отправлено в финансовый отдел: {len(pending)}, готово к оплате: {len(approved)}.",
+        reply_markup=InlineKeyboardMarkup([]),
     )
 
+    if pending:
+        await create_and_send_batch_approval_message(
+            pending[0]["id"], pending[-1]["id"], initiator_id, pending, "finance", context
+        )
+    if approved:
+        await create_and_send_batch_payment_message(approved, context)
+
 
 async def handle_head_approval(
         context: ContextTypes.DEFAULT_TYPE,
         approval_id: str,
         initiator_id: str,
-        approved_users: str,
-        record: dict,
+        approved_user: str,
         department: str,
         action: str,
         update: Update,
@@ -326,7 +655,7 @@ async def handle_head_approval(
             context,
             approval_id,
             initiator_id,
-            approved_users,
+            approved_user,
             department,
             update=update,
         )
@@ -336,43 +665,58 @@ async def handle_head_approval(
             context,
             approval_id,
             initiator_id,
-            approved_users,
-            record,
+            approved_user,
             department,
             update=update,
         )
 
 
+async def report_already_processed(approval_id: str, update: Update) -> None:
+    """Сообщение о том, что заявку уже обработал другой пользователь."""
+
+    await update.callback_query.edit_message_text(
+        text=f"Заявка {approval_id} уже обработана или не найдена.",
+        reply_markup=InlineKeyboardMarkup([]),
+    )
+
+
 async def reject_payment(
-        context: ContextTypes.DEFAULT_TYPE, approval_id: str, initiator_id: str, approved_users: str, department: str,
+        context: ContextTypes.DEFAULT_TYPE, approval_id: str, initiator_id: str, approved_user: str, department: str,
         update: Update) -> None:
     """Отправка сообщения об отклонении платежа и изменение статуса платежа."""
 
     if department == "finance":
-        approved_by = approved_users.split(", ")
         async with db:
-            await db.update_row_by_id(
+            record = await db.transition(
                 approval_id,
+                "Pending",
                 {
                     "approvals_received": 1,
                     "status": "Rejected",
                 },
             )
+        if not record:
+            await report_already_processed(approval_id, update)
+            return
+
         await update.callback_query.edit_message_text(
             text=f"Заявка {approval_id} отклонена.",
             reply_markup=InlineKeyboardMarkup([]),
         )
 
         await context.bot.send_message(
-            initiator_id, f"Заявка {approval_id} отклонена {approved_by[1]}."
+            initiator_id, f"Заявка {approval_id} отклонена {approved_user}."
         )
 
     else:
 
         async with db:
-            await db.update_row_by_id(
-                approval_id, {"approvals_received": 0, "status": "Rejected"}
+            record = await db.transition(
+                approval_id, "Not processed", {"approvals_received": 0, "status": "Rejected"}
             )
+        if not record:
+            await report_already_processed(approval_id, update)
+            return
 
         await update.callback_query.edit_message_text(
             text=f"Заявка {approval_id} отклонена руководителем департамента.",
@@ -380,7 +724,7 @@ async def reject_payment(
         )
 
         await context.bot.send_message(
-            initiator_id, f"Заявка {approval_id} отклонена {approved_users}."
+            initiator_id, f"Заявка {approval_id} отклонена {approved_user}."
         )
 
 
@@ -388,85 +732,42 @@ async def approve_payment(
         context: ContextTypes.DEFAULT_TYPE,
         approval_id: str,
         initiator_id: str,
-        approved_users: str,
-        record: dict,
+        approved_user: str,
         department: str,
         update: Update,
 ):
     """
-    Функция выполняет одну из трёх команд в зависимости от входных данных:
-    1)отправка сообщения в финансовый отдел на согласование платежа, если платёж более 50000, меняет количество апрувов
-     и статус платежа;
-    2)отправка сообщения об одобрении платежа для главы департамента, если платёж менее 50000, меняет количество
-     апрувов и статус платежа;
-    3)отправка сообщения об одобрении платежа для финансового отдела, меняет количество апрувов и статус платежа.
+    Одобряет заявку одним атомарным запросом к базе и, в зависимости от результата:
+    1)отправляет сообщение в финансовый отдел на согласование платежа, если платёж требует второго апрува
+     (сумма 50000 и более);
+    2)отправляет сообщение плательщикам, если апрувов достаточно.
+    Повторное или одновременное нажатие на уже обработанную заявку отклоняется.
     """
 
-    if department == "head":
-        if float(record["amount"]) >= 50000:
-
-            async with db:
-                await db.update_row_by_id(
-                    approval_id,
-                    {
-                        "approvals_received": 1,
-                        "status": "Pending",
-                        "approved_by": approved_users,
-                    },
-                )
-                record = await db.get_row_by_id(approval_id)
-
-            await update.callback_query.edit_message_text(
-                text="Запрос на одобрение отправлен в финансовый " "отдел.",
-                reply_markup=InlineKeyboardMarkup([]),
-            )
-            await create_and_send_approval_message(
-                approval_id, initiator_id, record, "finance", context=context
-            )
-
-        else:
-
-            async with db:
-                await db.update_row_by_id(
-                    approval_id,
-                    {
-                        "approvals_received": 1,
-                        "status": "Approved",
-                        "approved_by": approved_users,
-                    },
-                )
-
-                record = await db.get_row_by_id(approval_id)
-
-            await update.callback_query.edit_message_text(
-                text="Запрос на платеж одобрен. Заявка готова к оплате.",
-                reply_markup=InlineKeyboardMarkup([]),
-            )
-
-            await create_and_send_payment_message(
-                approval_id, approved_users, record, context
-            )
-
-    elif department == "finance":
+    expected_status = expected_status_for(department)
+    async with db:
+        record = await db.approve(approval_id, expected_status, approved_user)
 
-        async with db:
-            await db.update_row_by_id(
-                approval_id,
-                {
-                    "approvals_received": 2,
-                    "status": "Approved",
-                    "approved_by": approved_users,
-                },
-            )
+    if not record:
+        await report_already_processed(approval_id, update)
+        return
 
-            record = await db.get_row_by_id(approval_id)
+    if record["status"] == "Pending":
+        await update.callback_query.edit_message_text(
+            text="Запрос на одобрение отправлен в финансовый " "отдел.",
+            reply_markup=InlineKeyboardMarkup([]),
+        )
+        await create_and_send_approval_message(
+            approval_id, initiator_id, record, "finance", context=context
+        )
 
+    else:
         await update.callback_query.edit_message_text(
             text="Запрос на платеж одобрен. Заявка готова к оплате.",
             reply_markup=InlineKeyboardMarkup([]),
         )
         await create_and_send_payment_message(
-            approval_id, approved_users, record, context
+            approval_id, record["approved_by"], record, context
         )
 
 
@@ -488,26 +789,228 @@ async def error_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             return
 
 
+async def render_not_paid_page(
+        after_id: int = 0, before_id: int | None = None
+) -> tuple[str, InlineKeyboardMarkup | None]:
+    """Текст одной страницы неоплаченных заявок и кнопки перехода к соседним страницам."""
+
+    async with db:
+        rows = await db.find_not_paid(after_id, before_id, limit=NOT_PAID_PAGE_SIZE + 1)
+    rows, has_prev, has_next = page_window(rows, NOT_PAID_PAGE_SIZE, after_id, before_id)
+
+    if not rows:
+        if after_id or before_id:
+            # Соседняя страница опустела, пока её листали - возвращаемся к началу списка
+            return await render_not_paid_page()
+        return "Заявок не обнаружено", None
+
+    messages = []
+    for record in rows:
+        line = ", ".join([f"{key}: {value}" for key, value in record.items()])
+        if len(line) > NOT_PAID_LINE_WIDTH:
+            line = line[:NOT_PAID_LINE_WIDTH - 3] + "..."
+        messages.append(line)
+
+    buttons = []
+    if has_prev:
+        buttons.append(InlineKeyboardButton("« Назад", callback_data=f"not_paid_prev_{rows[0]['id заявки']}"))
+    if has_next:
+        buttons.append(InlineKeyboardButton("Вперёд »", callback_data=f"not_paid_next_{rows[-1]['id заявки']}"))
+
+    return "\n\n".join(messages), InlineKeyboardMarkup([buttons]) if buttons else None
+
+
 async def show_not_paid(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
-    Возвращает все неоплаченные заявки на платежи из таблицы "approvals"
+    Возвращает первую страницу неоплаченных заявок на платежи из таблицы "approvals"
+    """
+
+    text, reply_markup = await render_not_paid_page()
+    await update.message.reply_text(text, reply_markup=reply_markup)
+
+
+async def show_not_paid_page(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Обработчик кнопок "Назад" и "Вперёд" в списке неоплаченных заявок."""
+
+    query = update.callback_query
+    await query.answer()
+    direction, cursor_id = query.data.split("_")[2:4]
+
+    if direction == "next":
+        text, reply_markup = await render_not_paid_page(after_id=int(cursor_id))
+    else:
+        text, reply_markup = await render_not_paid_page(before_id=int(cursor_id))
+
+    await query.edit_message_text(text, reply_markup=reply_markup)
+
+
+async def department_of_chat(chat_id: int) -> str | None:
+    """Отдел, одобряющий заявки, к которому относится чат: 'head', 'finance' или None."""
+
+    if chat_id in Config.department_head_chat_id:
+        return "head"
+    if chat_id in Config.finance_chat_ids:
+        return "finance"
+    return None
+
+
+async def render_approve_batch_page(
+        department: str, selected: set[int], after_id: int = 0, before_id: int | None = None
+) -> tuple[str, InlineKeyboardMarkup, int]:
+    """
+    Страница заявок, ожидающих одобрения отдела department, с отметками выбора, переходом между страницами
+    и кнопками применения. Возвращает текст, кнопки и after_id, по которому страницу можно показать повторно.
     """
 
     async with db:
-        rows = await db.find_not_paid()
-    messages = []
+        rows = await db.find_by_status(
+            expected_status_for(department), after_id, before_id, limit=APPROVE_BATCH_PAGE_SIZE + 1
+        )
+    rows, has_prev, has_next = page_window(rows, APPROVE_BATCH_PAGE_SIZE, after_id, before_id)
 
-    for i, record in enumerate(rows, start=1):
-        line = ", ".join([f"{key}: {value}" for key, value in record.items()])
-        message_line = f"{i}. {line}"
-        wrapped_message = textwrap.fill(message_line, width=4096)
-        messages.append(wrapped_message)
+    if not rows and (after_id or before_id):
+        # Страница опустела, пока её листали - возвращаемся к началу списка
+        return await render_approve_batch_page(department, selected)
 
-    final_text = "\n\n".join(messages)
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                f'{"✅" if record["id"] in selected else "⬜"} {record["id"]}: {record["amount"]}, '
+                f'{record["expense_item"]} / {record["partner"]}'[:64],
+                callback_data=f'approve_batch_toggle_{record["id"]}',
+            )
+        ]
+        for record in rows
+    ]
 
-    if final_text:
-        await update.message.reply_text(final_text)
+    navigation = []
+    if has_prev:
+        navigation.append(InlineKeyboardButton("« Назад", callback_data=f"approve_batch_prev_{rows[0]['id']}"))
+    if rows:
+        navigation.append(InlineKeyboardButton("Отметить страницу", callback_data="approve_batch_all"))
+    if has_next:
+        navigation.append(InlineKeyboardButton("Вперёд »", callback_data=f"approve_batch_next_{rows[-1]['id']}"))
+    if navigation:
+        keyboard.append(navigation)
+    if selected:
+        keyboard.append([
+            InlineKeyboardButton(f"Одобрить выбранные ({len(selected)})", callback_data="approve_batch_approve"),
+            InlineKeyboardButton(f"Отклонить выбранные ({len(selected)})", callback_data="approve_batch_reject"),
+        ])
+
+    if rows:
+        text = f"Заявки, ожидающие одобрения. Отметьте нужные и примените действие. Выбрано: {len(selected)}."
     else:
-        await update.message.reply_text("Заявок не обнаружено")
+        text = "Заявок, ожидающих одобрения, нет."
+    return text, InlineKeyboardMarkup(keyboard), rows[0]["id"] - 1 if rows else 0
 
-    return
+
+async def approve_batch_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Обработчик команды /approve_batch. Показывает заявки, ожидающие одобрения отдела, к которому относится чат,
+    с отметками для выбора нескольких заявок.
+    """
+
+    department = await department_of_chat(update.effective_chat.id)
+    if department is None:
+        await update.message.reply_text("Одобрять заявки могут только руководитель департамента и финансовый отдел.")
+        return
+
+    context.user_data["approve_batch_selected"] = []
+    text, reply_markup, page_after_id = await render_approve_batch_page(department, set())
+    context.user_data["approve_batch_after"] = page_after_id
+    await update.message.reply_text(text, reply_markup=reply_markup)
+
+
+async def approve_batch_page(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Обработчик кнопок списка /approve_batch: отметка заявок, переход между страницами и применение."""
+
+    query = update.callback_query
+    department = await department_of_chat(update.effective_chat.id)
+    if department is None:
+        await query.answer("Нет прав на одобрение заявок.")
+        return
+
+    action, *cursor = query.data.split("_")[2:]
+    selected = set(context.user_data.get("approve_batch_selected", []))
+    after_id, before_id = context.user_data.get("approve_batch_after", 0), None
+
+    if action in ("approve", "reject"):
+        await apply_approve_batch(update, context, department, action, sorted(selected))
+        return
+
+    if action == "toggle":
+        selected ^= {int(cursor[0])}
+    elif action == "all":
+        async with db:
+            page = await db.find_by_status(expected_status_for(department), after_id, limit=APPROVE_BATCH_PAGE_SIZE)
+        page_ids = {record["id"] for record in page}
+        selected = selected - page_ids if page_ids <= selected else selected | page_ids
+    elif action == "next":
+        after_id = int(cursor[0])
+    elif action == "prev":
+        after_id, before_id = 0, int(cursor[0])
+
+    await query.answer()
+    text, reply_markup, page_after_id = await render_approve_batch_page(department, selected, after_id, before_id)
+    context.user_data["approve_batch_selected"] = sorted(selected)
+    context.user_data["approve_batch_after"] = page_after_id
+    await query.edit_message_text(text, reply_markup=reply_markup)
+
+
+async def apply_approve_batch(
+        update: Update, context: ContextTypes.DEFAULT_TYPE, department: str, action: str, selected: list[int]
+) -> None:
+    """
+    Одобрение или отклонение выбранных заявок одной транзакцией. Заявки, которым нужен второй апрув,
+    отправляются списком в финансовый отдел, готовые к оплате - одним общим сообщением плательщикам.
+    """
+
+    query = update.callback_query
+    if not selected:
+        await query.answer("Не выбрано ни одной заявки.")
+        return
+
+    await query.answer()
+    approved_user = "@" + query.from_user.username
+    expected_status = expected_status_for(department)
+    async with db:
+        if action == "reject":
+            records = await db.transition_many(
+                selected,
+                expected_status,
+                {"approvals_received": 1 if department == "finance" else 0, "status": "Rejected"},
+            )
+        else:
+            records = await db.approve_many(selected, expected_status, approved_user)
+
+    context.user_data.pop("approve_batch_selected", None)
+    context.user_data.pop("approve_batch_after", None)
+
+    skipped = len(selected) - len(records)
+    summary = f"{'Отклонено' if action == 'reject' else 'Одобрено'} заявок: {len(records)}."
+    if skipped:
+        summary += f" Уже обработаны другим пользователем: {skipped}."
+    logger.info("%s: %s", approved_user, summary)
+
+    if action == "reject":
+        await query.edit_message_text(summary, reply_markup=InlineKeyboardMarkup([]))
+        return
+
+    pending = [record for record in records if record["status"] == "Pending"]
+    approved = [record for record in records if record["status"] == "Approved"]
+    await query.edit_message_text(
+        f"{summary} Отправлено в финансовый отдел: {len(pending)}, готово к оплате: {len(approved)}.",
+        reply_markup=InlineKeyboardMarkup([]),
+    )
+
+    if pending:
+        lines = [format_record_line(record) for record in pending]
+        notify_chats(
+            await chat_ids_department("finance"),
+            f"На согласование поступили заявки ({len(pending)}), одобренные {approved_user}. "
+            f"Одобрите их командой /approve_batch.\n" + truncate_lines(lines, "заявок"),
+            context,
+        )
+    if approved:
+        await create_and_send_batch_payment_message(approved, context)
@@ -1,13 +1,19 @@
+from telegram import Update
 from telegram.ext import (
     Application,
     CommandHandler,
     CallbackQueryHandler,
     ConversationHandler,
+    InlineQueryHandler,
     MessageHandler,
+    TypeHandler,
     filters
 )
+from telegram.request import BaseRequest
 
 from config.config import Config
+from config.logging_config import configure_logging
+from db import db
 
 from budget_bot.conversation import (
     enter_record,
@@ -15,12 +21,23 @@ from budget_bot.conversation import (
     input_item,
     input_group,
     input_partner,
+    browse_options,
+    choose_from_inline,
+    inline_search,
+    INLINE_CHOICE_PATTERN,
     input_comment,
     input_dates,
     input_payment_type,
     confirm_command,
     stop_dialog,
+    dialog_timeout,
 )
+from budget_bot import metrics
+from budget_bot.accruals import split_accruals
+from budget_bot.archive import archive_closed_job
+from budget_bot.concurrency import PerUserUpdateProcessor
+from budget_bot.outbox import flush_sheets_outbox
+from budget_bot.persistence import SQLitePersistence
 from budget_bot.handlers import (
     check_access,
     start_command,
@@ -28,8 +45,17 @@ from budget_bot.handlers import (
     error_callback,
     reject_record_command,
     show_not_paid,
+    show_not_paid_page,
     process_pay,
     process_approval,
+    process_batch_approval,
+    approve_batch_command,
+    approve_batch_page,
+    submit_document,
+    refresh_catalog_command,
+    refresh_catalog_job,
+    report_command,
+    warm_up_sheets_job,
 )
 
 (
@@ -44,39 +70,125 @@ from budget_bot.handlers import (
 ) = range(8)
 
 
-def main() -> None:
-    """Основная функция для запуска бота."""
-    application = Application.builder().token(Config.telegram_bot_token).build()
+async def on_startup(application: Application) -> None:
+    """
+    Открытие общего соединения с базой данных, создание схемы, заполнение начислений сохранённых заявок
+    и запуск HTTP-сервера метрик при запуске бота.
+    """
+    await db.connect()
+    await db.create_table()
+    async with db:
+        await db.migrate_accruals(split_accruals)
+    await metrics.start_server(Config.metrics_host, Config.metrics_port)
+
+
+async def on_shutdown(application: Application) -> None:
+    """Остановка HTTP-сервера метрик и закрытие соединения с базой данных при остановке бота."""
+    await metrics.stop_server()
+    await db.close()
+
+
+def build_application(request: BaseRequest | None = None) -> Application:
+    """
+    Сборка приложения со всеми обработчиками и фоновыми задачами.
+    request - транспорт запросов к Bot API; по умолчанию HTTPXRequest, в бенчмарках подменяется на фиктивный.
+    """
+    builder = (
+        Application.builder()
+        .token(Config.telegram_bot_token)
+        .persistence(SQLitePersistence(update_interval=Config.persistence_interval))
+        # Обновления разных пользователей обрабатываются параллельно, одного пользователя - по порядку
+        .concurrent_updates(PerUserUpdateProcessor(Config.concurrent_updates))
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+    )
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    application = builder.build()
     application.add_handler(MessageHandler(~filters.User(user_id=Config.white_list), check_access))
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("submit_record", submit_record_command))
     application.add_handler(CommandHandler("reject_record", reject_record_command))
     application.add_handler(CommandHandler("show_not_paid", show_not_paid))
+    application.add_handler(CommandHandler("refresh_catalog", refresh_catalog_command))
+    application.add_handler(CommandHandler("report", report_command))
+    application.add_handler(CallbackQueryHandler(show_not_paid_page, pattern="^not_paid_.*"))
     application.add_handler(CallbackQueryHandler(process_pay, pattern="^pay_.*"))
     application.add_handler(
         CallbackQueryHandler(process_approval, pattern="^approval_.*")
     )
+    application.add_handler(CallbackQueryHandler(process_batch_approval, pattern="^batch_.*"))
+    application.add_handler(CommandHandler("approve_batch", approve_batch_command))
+    application.add_handler(CallbackQueryHandler(approve_batch_page, pattern="^approve_batch_.*"))
+    application.add_handler(
+        MessageHandler(filters.Document.FileExtension("csv") | filters.Document.FileExtension("xlsx"), submit_document)
+    )
+    # Выбор статьи или партнёра через inline-режим, листание и поиск по началу названия
+    # в списках статей, групп и партнёров
+    browse_handlers = [
+        MessageHandler(filters.VIA_BOT & filters.Regex(INLINE_CHOICE_PATTERN), choose_from_inline),
+        CallbackQueryHandler(browse_options, pattern=r"^page_\d+$"),
+        MessageHandler(filters.TEXT & ~filters.COMMAND, browse_options),
+    ]
     conversation_handler = ConversationHandler(
         entry_points=[CommandHandler("enter_record", enter_record)],
         states={
             INPUT_SUM: [MessageHandler(filters.TEXT & ~filters.COMMAND, input_sum)],
-            INPUT_ITEM: [CallbackQueryHandler(input_item)],
-            INPUT_GROUP: [CallbackQueryHandler(input_group)],
-            INPUT_PARTNER: [CallbackQueryHandler(input_partner)],
+            INPUT_ITEM: [CallbackQueryHandler(input_item, pattern=r"^\d+$"), *browse_handlers],
+            INPUT_GROUP: [CallbackQueryHandler(input_group, pattern=r"^\d+$"), *browse_handlers],
+            INPUT_PARTNER: [CallbackQueryHandler(input_partner, pattern=r"^\d+$"), *browse_handlers],
             INPUT_COMMENT: [
                 MessageHandler(filters.TEXT & ~filters.COMMAND, input_comment)
             ],
             INPUT_DATES: [MessageHandler(filters.TEXT & ~filters.COMMAND, input_dates)],
             INPUT_PAYMENT_TYPE: [CallbackQueryHandler(input_payment_type)],
             CONFIRM_COMMAND: [CallbackQueryHandler(confirm_command)],
+            ConversationHandler.TIMEOUT: [TypeHandler(Update, dialog_timeout)],
         },
         fallbacks=[
             CommandHandler("stop", stop_dialog),
         ],
+        conversation_timeout=Config.conversation_timeout,
+        name="enter_record",
+        persistent=True,
     )
     application.add_handler(conversation_handler)
+    application.add_handler(InlineQueryHandler(inline_search))
     application.add_error_handler(error_callback)
-    application.run_polling(close_loop=False)
+    # Гистограммы длительности по каждому обработчику, см. budget_bot/metrics.py
+    metrics.instrument_handlers(application)
+    metrics.instrument_db(db)
+    application.job_queue.run_repeating(refresh_catalog_job, interval=Config.catalog_ttl, first=0)
+    # Авторизация gspread обновляется раз в 45 минут, токен Google живёт час
+    application.job_queue.run_repeating(warm_up_sheets_job, interval=300, first=0)
+    application.job_queue.run_repeating(flush_sheets_outbox, interval=Config.sheets_outbox_interval, first=0)
+    if Config.archive_after_days:
+        application.job_queue.run_repeating(archive_closed_job, interval=Config.archive_interval, first=0)
+    return application
+
+
+def run(application: Application) -> None:
+    """Запуск приложения в режиме Config.bot_mode до остановки; в benchmarks/check_webhook.py - с фиктивным Telegram."""
+    if Config.bot_mode == "webhook":
+        # Встроенный веб-сервер PTB; TLS включается, если указаны сертификат и ключ
+        application.run_webhook(
+            listen=Config.webhook_listen,
+            port=Config.webhook_port,
+            url_path=Config.webhook_path,
+            webhook_url=Config.webhook_url,
+            secret_token=Config.webhook_secret_token,
+            cert=Config.webhook_cert,
+            key=Config.webhook_key,
+            close_loop=False,
+        )
+    else:
+        application.run_polling(close_loop=False)
+
+
+def main() -> None:
+    """Основная функция для запуска бота."""
+    configure_logging()
+    run(build_application())
 
 
 if __name__ == "__main__":
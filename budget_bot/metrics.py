@@ -0,0 +1,224 @@
+import asyncio
+import functools
+import inspect
+import math
+import time
+from bisect import bisect_left
+
+from telegram.ext import Application, ConversationHandler
+
+from config.logging_config import logger
+
+# Границы корзин гистограмм в секундах: от быстрых запросов к SQLite до медленных запросов к Google Sheets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(names: tuple[str, ...], values: tuple[str, ...], le: str | None = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Гистограмма длительностей в формате Prometheus: счётчики по корзинам, сумма и количество на набор меток."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, labels: tuple[str, ...], value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(BUCKETS), 0.0, 0]
+        series[0][bisect_left(BUCKETS, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = []
+        for labels, (buckets, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, hits in zip(BUCKETS, buckets):
+                cumulative += hits
+                le = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels_text(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels_text(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels_text(self.label_names, labels)} {count}")
+        return lines
+
+
+class Counter:
+    """Монотонный счётчик в формате Prometheus."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, labels: tuple[str, ...] = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_labels_text(self.label_names, labels)} {value}"
+            for labels, value in sorted(self._values.items())
+        ]
+
+
+class MetricsRegistry:
+    """Набор метрик процесса и их вывод в текстовом формате Prometheus."""
+
+    def __init__(self):
+        self._metrics: list[Histogram | Counter] = []
+
+    def histogram(self, name: str, documentation: str, label_names: tuple[str, ...]) -> Histogram:
+        metric = Histogram(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HANDLER_SECONDS = registry.histogram(
+    "budget_bot_handler_seconds", "Длительность обработки обновлений Telegram по обработчикам.", ("handler",)
+)
+JOB_SECONDS = registry.histogram("budget_bot_job_seconds", "Длительность фоновых задач.", ("job",))
+DB_SECONDS = registry.histogram("budget_bot_db_seconds", "Длительность методов ApprovalDB.", ("method",))
+SHEETS_SECONDS = registry.histogram(
+    "budget_bot_sheets_seconds", "Длительность операций с Google Sheets.", ("operation",)
+)
+ERRORS = registry.counter(
+    "budget_bot_errors_total", "Исключения в обработчиках, задачах, базе данных и Google Sheets.", ("source", "name")
+)
+TELEGRAM_RETRIES = registry.counter(
+    "budget_bot_telegram_retries_total", "Повторы отправки сообщений после ответа Telegram RetryAfter."
+)
+
+_sources = {
+    HANDLER_SECONDS: "handler",
+    JOB_SECONDS: "job",
+    DB_SECONDS: "db",
+    SHEETS_SECONDS: "sheets",
+}
+
+
+def timed(histogram: Histogram, name: str | None = None):
+    """
+    Декоратор корутины: длительность каждого вызова попадает в histogram с меткой name (по умолчанию имя функции),
+    исключения считаются в ERRORS. Накладные расходы - два вызова perf_counter и поиск корзины.
+    """
+
+    def decorator(func):
+        labels = (name or func.__name__,)
+        error_labels = (_sources[histogram], labels[0])
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                ERRORS.inc(error_labels)
+                raise
+            finally:
+                histogram.observe(labels, time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_handlers(application: Application) -> None:
+    """Оборачивает callback всех зарегистрированных обработчиков, включая состояния ConversationHandler."""
+
+    def instrument(handlers) -> None:
+        for handler in handlers:
+            if isinstance(handler, ConversationHandler):
+                instrument(handler.entry_points)
+                instrument([state_handler for state in handler.states.values() for state_handler in state])
+                instrument(handler.fallbacks)
+            elif not hasattr(handler.callback, "__wrapped__"):
+                handler.callback = timed(HANDLER_SECONDS)(handler.callback)
+
+    for group in application.handlers.values():
+        instrument(group)
+
+
+def instrument_db(database) -> None:
+    """
+    Оборачивает публичные корутины экземпляра ApprovalDB, кроме открытия и закрытия соединения:
+    длительность каждого запроса к SQLite попадает в DB_SECONDS. Слой базы данных сам метрики не импортирует.
+    """
+
+    for name, _ in inspect.getmembers(type(database), inspect.iscoroutinefunction):
+        if name.startswith("_") or name in ("connect", "close") or hasattr(getattr(database, name), "__wrapped__"):
+            continue
+        setattr(database, name, timed(DB_SECONDS)(getattr(database, name)))
+
+
+_server: asyncio.Server | None = None
+
+
+async def _handle_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.split()
+        if len(parts) >= 2 and parts[1] == b"/metrics":
+            status, body = "200 OK", registry.render().encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def start_server(host: str, port: int) -> None:
+    """Запуск HTTP-сервера с метриками по адресу http://host:port/metrics. Порт 0 отключает сервер."""
+
+    global _server
+    if not port or _server is not None:
+        return
+    _server = await asyncio.start_server(_handle_request, host, port)
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+
+
+async def stop_server() -> None:
+    """Остановка HTTP-сервера с метриками."""
+
+    global _server
+    if _server is None:
+        return
+    _server.close()
+    await _server.wait_closed()
+    _server = None
@@ -0,0 +1,75 @@
+import asyncio
+
+from telegram.ext import ContextTypes
+
+from config.config import Config
+from config.logging_config import logger
+from db import db
+from budget_bot.metrics import JOB_SECONDS, timed
+from budget_bot.sheets import GoogleSheetsManager, get_today_moscow_time, payment_rows
+
+MAX_RETRY_DELAY = 3600  # секунды, верхняя граница экспоненциальной задержки повторов
+
+_flush_lock = asyncio.Lock()
+
+
+@timed(JOB_SECONDS)
+async def flush_sheets_outbox(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Выгрузка оплаченных заявок из очереди 'sheets_outbox' в Google Sheets.
+    Строки многих платежей объединяются в один запрос; при ошибке пачка откладывается
+    с экспоненциальной задержкой. Записи удаляются из очереди только после успешной выгрузки.
+    Запись, по которой нельзя построить строки листа, переносится в 'sheets_outbox_dead' и не задерживает остальные.
+    """
+
+    async with _flush_lock:
+        while True:
+            batch = []
+            async with db:
+                batch = await db.get_outbox_batch(Config.sheets_outbox_batch_size)
+
+            if not batch:
+                return
+
+            today_date = await get_today_moscow_time()
+            rows, entry_ids, attempts, dead = [], [], 0, []
+            for entry_id, payload, entry_attempts in batch:
+                try:
+                    rows.extend(payment_rows(payload, today_date))
+                except (KeyError, TypeError, ValueError, ArithmeticError) as e:
+                    dead.append((entry_id, f"{type(e).__name__}: {e}"))
+                    logger.error(
+                        "Платёж по заявке %s не выгружается в Google Sheets и перенесён в sheets_outbox_dead: %s",
+                        payload.get("id"), e,
+                    )
+                    continue
+                entry_ids.append(entry_id)
+                attempts = max(attempts, entry_attempts)
+
+            if dead:
+                async with db:
+                    await db.dead_letter_outbox(dead)
+
+            try:
+                if rows:
+                    manager = GoogleSheetsManager()
+                    await manager.initialize_google_sheets()
+                    await manager.append_rows(rows)
+                    logger.info("Добавлено строк: %d. Платежей: %d", len(rows), len(entry_ids))
+
+            except Exception as e:
+                delay = min(Config.sheets_outbox_interval * 2 ** (attempts + 1), MAX_RETRY_DELAY)
+                logger.error(
+                    f"Не удалось выгрузить в Google Sheets {len(entry_ids)} платежей, "
+                    f"повтор через {delay} с. Ошибка: {e}"
+                )
+                async with db:
+                    await db.postpone_outbox(entry_ids, delay)
+                return
+
+            if entry_ids:
+                async with db:
+                    await db.delete_outbox(entry_ids)
+
+            if len(batch) < Config.sheets_outbox_batch_size:
+                return
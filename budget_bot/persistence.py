@@ -0,0 +1,150 @@
+import asyncio
+import json
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from config.logging_config import logger
+from db import db
+
+
+class SQLitePersistence(BasePersistence[dict, dict, dict]):
+    """
+    Хранение состояний диалогов, user_data и chat_data в базе данных бота.
+    Каждый пользователь, чат и диалог - отдельная строка в JSON. Application передаёт данные раз в
+    update_interval секунд; записываются только строки, содержимое которых изменилось с прошлой записи,
+    все изменения одного прохода сохраняются одной транзакцией.
+    """
+
+    def __init__(self, update_interval: float = 60):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=True, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        # Последнее записанное в базу содержимое и изменения, ожидающие записи (None - удаление)
+        self._saved_data: dict[tuple[str, int], str] = {}
+        self._saved_conversations: dict[tuple[str, str], str] = {}
+        self._pending_data: dict[tuple[str, int], str | None] = {}
+        self._pending_conversations: dict[tuple[str, str], str | None] = {}
+        self._write_task: asyncio.Task | None = None
+        self._schema_ready = False
+
+    async def _ensure_schema(self) -> None:
+        """Application читает сохранённые данные до post_init, поэтому схема создаётся здесь при первом чтении."""
+        if not self._schema_ready:
+            await db.create_table()
+            self._schema_ready = True
+
+    async def _load_data(self, kind: str) -> dict[int, dict]:
+        await self._ensure_schema()
+        async with db:
+            rows = await db.get_persisted_data(kind)
+
+        for entry_id, value in rows.items():
+            self._saved_data[(kind, entry_id)] = value
+        logger.info(f"Загружены сохранённые данные {kind}: {len(rows)} записей.")
+        return {entry_id: json.loads(value) for entry_id, value in rows.items()}
+
+    async def get_user_data(self) -> dict[int, dict]:
+        return await self._load_data("user")
+
+    async def get_chat_data(self) -> dict[int, dict]:
+        return await self._load_data("chat")
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def get_conversations(self, name: str) -> dict[tuple[int, ...], object]:
+        await self._ensure_schema()
+        async with db:
+            rows = await db.get_persisted_conversations(name)
+
+        for key, state in rows.items():
+            self._saved_conversations[(name, key)] = state
+        logger.info(f"Загружены состояния диалогов {name}: {len(rows)}.")
+        return {tuple(json.loads(key)): json.loads(state) for key, state in rows.items()}
+
+    async def update_conversation(self, name: str, key: tuple[int, ...], new_state: object | None) -> None:
+        state = None if new_state is None else json.dumps(new_state)
+        self._stage(self._pending_conversations, self._saved_conversations, (name, json.dumps(key)), state)
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        self._stage_data("user", user_id, data)
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        self._stage_data("chat", chat_id, data)
+
+    async def update_bot_data(self, data: dict) -> None:
+        pass
+
+    async def update_callback_data(self, data: object) -> None:
+        pass
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._stage(self._pending_data, self._saved_data, ("user", user_id), None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._stage(self._pending_data, self._saved_data, ("chat", chat_id), None)
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    async def flush(self) -> None:
+        """Дожидается записи всех накопленных изменений. Вызывается Application при остановке."""
+        if self._write_task is not None:
+            await self._write_task
+        if self._pending_data or self._pending_conversations:
+            await self._write_pending()
+
+    def _stage_data(self, kind: str, entry_id: int, data: dict) -> None:
+        try:
+            value = json.dumps(data, ensure_ascii=False, sort_keys=True)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Данные {kind} {entry_id} не сериализуются в JSON и не будут сохранены: {e}")
+            return
+        self._stage(self._pending_data, self._saved_data, (kind, entry_id), value)
+
+    def _stage(self, pending: dict, saved: dict, key: tuple, value: str | None) -> None:
+        """Ставит строку в очередь на запись, если её содержимое отличается от уже записанного."""
+        if saved.get(key) == value:
+            pending.pop(key, None)
+            return
+
+        pending[key] = value
+        if self._write_task is None or self._write_task.done():
+            # Application вызывает update_* пачкой через gather; задача записи выполнится после всех них
+            self._write_task = asyncio.create_task(self._write_pending())
+
+    async def _write_pending(self) -> None:
+        while self._pending_data or self._pending_conversations:
+            data, self._pending_data = self._pending_data, {}
+            conversations, self._pending_conversations = self._pending_conversations, {}
+            try:
+                async with db:
+                    await db.save_persistence(data, conversations)
+            except Exception as e:
+                logger.error(f"Не удалось сохранить состояние диалогов, повтор при следующем обновлении: {e}")
+                for key, value in data.items():
+                    self._pending_data.setdefault(key, value)
+                for key, value in conversations.items():
+                    self._pending_conversations.setdefault(key, value)
+                return
+
+            self._remember(self._saved_data, data)
+            self._remember(self._saved_conversations, conversations)
+
+    @staticmethod
+    def _remember(saved: dict, written: dict) -> None:
+        for key, value in written.items():
+            if value is None:
+                saved.pop(key, None)
+            else:
+                saved[key] = value
@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+from telegram import Bot, Message
+from telegram.error import RetryAfter
+
+from config.logging_config import logger
+from budget_bot.metrics import TELEGRAM_RETRIES
+
+GLOBAL_RATE = 30  # сообщений в секунду на бота
+PRIVATE_CHAT_RATE = 1  # сообщений в секунду в личный чат
+GROUP_CHAT_RATE = 20 / 60  # сообщений в секунду в группу
+GROUP_CHAT_BURST = 20  # сообщений в группу подряд без ожидания: лимит Telegram - 20 в минуту
+MAX_CHAT_BUCKETS = 1000
+
+
+class TokenBucket:
+    """Корзина токенов: пополняется со скоростью rate в секунду, вмещает не более capacity токенов."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    @property
+    def is_idle(self) -> bool:
+        """Корзина полна и никто не ждёт токен."""
+        self._refill()
+        return self.tokens >= self.capacity and not self._lock.locked()
+
+    async def acquire(self) -> None:
+        """Забирает один токен, при необходимости дожидаясь пополнения."""
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class TelegramRateLimiter:
+    """
+    Ограничитель отправки сообщений с учётом лимитов Telegram: общий на бота и отдельный на каждый чат.
+    При ответе RetryAfter отправка повторяется после указанной паузы.
+    """
+
+    def __init__(self, max_retries: int = 3):
+        self.max_retries = max_retries
+        self.retries = 0
+        self._global = TokenBucket(GLOBAL_RATE, GLOBAL_RATE)
+        self._chats: dict[int, TokenBucket] = {}
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                self._chats = {key: value for key, value in self._chats.items() if not value.is_idle}
+            if int(chat_id) < 0:
+                bucket = TokenBucket(GROUP_CHAT_RATE, GROUP_CHAT_BURST)
+            else:
+                bucket = TokenBucket(PRIVATE_CHAT_RATE, 1)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    async def send_message(self, bot: Bot, chat_id: int, **kwargs) -> Message:
+        """Отправка сообщения в чат в пределах лимитов."""
+
+        for attempt in range(self.max_retries + 1):
+            await self._chat_bucket(chat_id).acquire()
+            await self._global.acquire()
+            try:
+                return await bot.send_message(chat_id=chat_id, **kwargs)
+            except RetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                TELEGRAM_RETRIES.inc()
+                logger.warning("Telegram ограничил отправку в чат %s, повтор через %s с.", chat_id, e.retry_after)
+                await asyncio.sleep(e.retry_after)
+
+
+telegram_limiter = TelegramRateLimiter()
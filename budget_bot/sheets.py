@@ -1,13 +1,18 @@
-from datetime import datetime
-from decimal import Decimal, ROUND_HALF_UP
+import asyncio
+from datetime import date, datetime
+from typing import TYPE_CHECKING
 
-import gspread_asyncio
-import pandas as pd
 import pytz
-from google.oauth2.service_account import Credentials
 
 from config.config import Config
 from config.logging_config import logger
+from budget_bot.accruals import split_accruals
+from budget_bot.metrics import SHEETS_SECONDS, timed
+
+if TYPE_CHECKING:
+    # gspread_asyncio и стек google-auth загружаются только при первом обращении к Google Sheets
+    import gspread_asyncio
+    from budget_bot.gspread_client import CountingClientManager
 
 date_format = {  # паттерн для преобразования числа даты в необходимый формат
     "numberFormat": {"type": "DATE", "pattern": "dd.mm.yyyy"}
@@ -18,27 +23,145 @@ currency_format = {  # паттерн для преобразования чис
 }
 
 
-async def get_today_moscow_time() -> str:
+sheets_epoch = date(1899, 12, 30)  # нулевой день в серийных датах Google Sheets
+
+
+async def get_today_moscow_time() -> date:
     """Функция для получения текущей даты"""
 
     moscow_tz = pytz.timezone("Europe/Moscow")
-    today = datetime.now(moscow_tz)
-    formatted_date = today.strftime("%d.%m.%Y")
-    return formatted_date
+    return datetime.now(moscow_tz).date()
+
+
+def make_cell(value: str | float | date, cell_format: dict | None = None) -> dict:
+    """Ячейка для запроса appendCells: значение и, при необходимости, формат."""
+
+    if isinstance(value, date):
+        user_value = {"numberValue": (value - sheets_epoch).days}
+    elif isinstance(value, (int, float)):
+        user_value = {"numberValue": value}
+    else:
+        user_value = {"stringValue": str(value)}
+
+    cell = {"userEnteredValue": user_value}
+    if cell_format:
+        cell["userEnteredFormat"] = cell_format
+    return cell
+
+
+def build_payment_rows(payment_info: dict[str, any], paid_date: date) -> list[dict]:
+    """
+    Строки листа учёта для одного платежа: по строке на каждый месяц начисления, сумма делится поровну.
+    Месяцы и доли берутся из "accruals" (строки approval_accruals), а для записей очереди без них - из периода.
+    """
+
+    accruals = payment_info.get("accruals") or split_accruals(payment_info["period"], payment_info["amount"])
+    return [
+        {
+            "values": [
+                make_cell(paid_date, date_format),
+                make_cell(share, currency_format),
+                make_cell(payment_info["expense_item"]),
+                make_cell(payment_info["expense_group"]),
+                make_cell(payment_info["partner"]),
+                make_cell(payment_info["comment"]),
+                make_cell(date(month // 100, month % 100, 1), date_format),
+                make_cell(payment_info["payment_method"]),
+            ]
+        }
+        for month, share in accruals
+    ]
+
+
+def payment_rows(payment_info: dict[str, any], today_date: date) -> list[dict]:
+    """Строки листа учёта для платежа с датой оплаты из ключа "paid_date" (ISO), а при его отсутствии - today_date."""
+
+    paid_date = payment_info.get("paid_date")
+    return build_payment_rows(payment_info, date.fromisoformat(paid_date) if paid_date else today_date)
+
+
+def build_catalog(records: list[dict]) -> tuple[dict[str, dict[str, list[str]]], list[str]]:
+    """
+    Построение словаря статья -> группа -> список партнёров из строк листа "категории"
+    за один проход по строкам. Статьи возвращаются в порядке первого появления.
+    get_all_records превращает похожие на числа ячейки в int и float, поэтому названия приводятся к строкам.
+    """
+
+    data_structure = {}
 
+    for record in records:
+        item, group, partner = (str(record[key]).strip() for key in ("Статья", "Группа", "Партнер"))
+        data_structure.setdefault(item, {}).setdefault(group, []).append(partner)
 
-def get_credentials() -> Credentials:
-    """Функция для получения данных для авторизации в Google Sheets"""
+    return data_structure, list(data_structure)
 
-    creds = Credentials.from_service_account_file(Config.google_sheets_credentials_file)
-    scoped = creds.with_scopes(
-        [
-            "https://spreadsheets.google.com/feeds",
-            "https://www.googleapis.com/auth/spreadsheets",
-            "https://www.googleapis.com/auth/drive",
-        ]
-    )
-    return scoped
+
+class SheetsClient:
+    """
+    Общий для процесса авторизованный клиент Google Sheets.
+    Хранит открытые таблицы и листы, пока не сменится авторизация.
+    """
+
+    def __init__(self, reauth_interval: int = 45):
+        self.reauth_interval = reauth_interval
+        self._agcm: "CountingClientManager | None" = None
+        self._agc: "gspread_asyncio.AsyncioGspreadClient | None" = None
+        self._worksheets: dict[tuple[str, int], "gspread_asyncio.AsyncioGspreadWorksheet"] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def agcm(self) -> "CountingClientManager":
+        """Менеджер клиента gspread, создаётся при первом обращении."""
+
+        if self._agcm is None:
+            from budget_bot.gspread_client import CountingClientManager, get_credentials
+
+            self._agcm = CountingClientManager(get_credentials, reauth_interval=self.reauth_interval)
+        return self._agcm
+
+    async def authorize(self) -> "gspread_asyncio.AsyncioGspreadClient":
+        """
+        Возвращает авторизованный клиент. Новые учётные данные запрашиваются только по истечении
+        reauth_interval минут, при этом сохранённые листы сбрасываются.
+        """
+
+        agc = await self.agcm.authorize()
+        if agc is not self._agc:
+            self._agc = agc
+            self._worksheets.clear()
+        return agc
+
+    async def get_spreadsheet(self, spreadsheet_id: str) -> "gspread_asyncio.AsyncioGspreadSpreadsheet":
+        """Открытая таблица. gspread_asyncio кэширует результат open_by_key для клиента."""
+
+        agc = await self.authorize()
+        return await agc.open_by_key(spreadsheet_id)
+
+    async def get_worksheet(
+            self, spreadsheet_id: str, sheet_id: int
+    ) -> "gspread_asyncio.AsyncioGspreadWorksheet":
+        """Лист таблицы по id. Запрос к API выполняется только при первом обращении."""
+
+        spreadsheet = await self.get_spreadsheet(spreadsheet_id)
+        key = (spreadsheet_id, sheet_id)
+        async with self._lock:
+            if key not in self._worksheets:
+                self._worksheets[key] = await spreadsheet.get_worksheet_by_id(sheet_id)
+                logger.info("Открытие листа %s таблицы %s", sheet_id, spreadsheet_id)
+        return self._worksheets[key]
+
+    @timed(SHEETS_SECONDS)
+    async def warm_up(self) -> None:
+        """
+        Заранее продлевает авторизацию и открывает рабочие листы,
+        чтобы обработчики не ждали получения токена и метаданных таблицы.
+        """
+
+        await self.get_worksheet(Config.google_sheets_spreadsheet_id, 0)
+        await self.get_worksheet(Config.google_sheets_spreadsheet_id, Config.google_sheets_categories_sheet_id)
+
+
+sheets_client = SheetsClient()
 
 
 class GoogleSheetsManager:
@@ -50,14 +173,16 @@ class GoogleSheetsManager:
         self.categories_sheet_id = Config.google_sheets_categories_sheet_id
         self.options_dict = None
         self.items = None
+        self.agcm = None
         self.agc = None
 
-    async def initialize_google_sheets(self) -> gspread_asyncio.AsyncioGspreadClient:
+    @timed(SHEETS_SECONDS)
+    async def initialize_google_sheets(self) -> "gspread_asyncio.AsyncioGspreadClient":
         """Инициализация в Google Sheets"""
 
         try:
-            agcm = gspread_asyncio.AsyncioGspreadClientManager(get_credentials)
-            self.agc = await agcm.authorize()
+            self.agcm = sheets_client.agcm
+            self.agc = await sheets_client.authorize()
             return self.agc
         except Exception as e:
             raise RuntimeError(f"Не удалось авторизоваться в сервисе Google Sheet. Ошибка: {e}")
@@ -65,67 +190,57 @@ class GoogleSheetsManager:
     async def add_payment_to_sheet(self, payment_info: dict[str, str]) -> None:
         """Добавление счёта в таблицу"""
 
+        await self.add_payments_to_sheet([payment_info])
+
+    async def add_payments_to_sheet(self, payments: list[dict[str, str]]) -> None:
+        """
+        Добавление нескольких счетов в таблицу одним запросом.
+        Дата оплаты берётся из ключа "paid_date" (ISO), а при его отсутствии - текущая.
+        """
+
+        today_date = await get_today_moscow_time()
+        rows = [row for payment_info in payments for row in payment_rows(payment_info, today_date)]
+        await self.append_rows(rows)
+        logger.info("Добавлено строк: %d. Платежей: %d", len(rows), len(payments))
+
+    @timed(SHEETS_SECONDS)
+    async def append_rows(self, rows: list[dict]) -> None:
+        """Запись готовых строк листа учёта (см. build_payment_rows) одним запросом appendCells."""
+
         try:
-            spreadsheet = await self.agc.open_by_key(self.sheets_spreadsheet_id)
-            worksheet = await spreadsheet.get_worksheet_by_id(0)
-            logger.info(f"Открытие листа: {self.sheets_spreadsheet_id}")
+            spreadsheet = await sheets_client.get_spreadsheet(self.sheets_spreadsheet_id)
+            worksheet = await sheets_client.get_worksheet(self.sheets_spreadsheet_id, 0)
 
         except Exception as e:
             raise RuntimeError(f"Ошибка при открытии или доступе к листу: {e}")
 
-        today_date = await get_today_moscow_time()
-        period = payment_info["period"].split(" ")
-        months = [
-            datetime.strptime(f"01.{a}", "%d.%m.%y").strftime("%d.%m.%Y")
-            for a in period
-        ]
-        total_sum = Decimal(payment_info["amount"]) / Decimal(len(months))
-        rounded_sum = float(total_sum.quantize(Decimal('0.0000000001'), rounding=ROUND_HALF_UP))
-        for month in months:
-            row_data = [
-                today_date,
-                rounded_sum,
-                payment_info["expense_item"],
-                payment_info["expense_group"],
-                payment_info["partner"],
-                payment_info["comment"],
-                month,
-                payment_info["payment_method"],
-            ]
-            await worksheet.append_row(row_data, value_input_option="USER_ENTERED")
-            logger.info(f"Добавлена строка: {row_data}")
-        await worksheet.format("A3:A", date_format)
-        await worksheet.format("B3:B", currency_format)
-        await worksheet.format("G3:G", date_format)
-
+        # Все строки вместе с форматами дат и суммы записываются одним запросом
+        await spreadsheet.batch_update(
+            {
+                "requests": [
+                    {
+                        "appendCells": {
+                            "sheetId": worksheet.id,
+                            "rows": rows,
+                            "fields": "userEnteredValue,userEnteredFormat",
+                        }
+                    }
+                ]
+            }
+        )
+
+    @timed(SHEETS_SECONDS)
     async def get_data(self) -> tuple[dict[str, dict[str, list[str]]], list[str]]:
         """
         Получение списка статей и списка словарей данных из таблицы "категории"
         """
 
         try:
-            spreadsheet = await self.agc.open_by_key(self.sheets_spreadsheet_id)
-            worksheet = await spreadsheet.get_worksheet_by_id(self.categories_sheet_id)
+            worksheet = await sheets_client.get_worksheet(self.sheets_spreadsheet_id, self.categories_sheet_id)
         except Exception as e:
             raise RuntimeError(f'Ошибка получения данных с листа "категории". Ошибка: {e}')
 
-        df = pd.DataFrame(await worksheet.get_all_records())
-        unique_items = df["Статья"].unique()
-        data_structure = {}
-
-        for _, row in df.iterrows():
-            category = row["Статья"]
-            group = row["Группа"]
-            partner = row["Партнер"]
-
-            if category not in data_structure:
-                data_structure[category] = {}
-
-            if group not in data_structure[category]:
-                data_structure[category][group] = []
-
-            data_structure[category][group].append(partner)
-
+        data_structure, unique_items = build_catalog(await worksheet.get_all_records())
         self.options_dict, self.items = data_structure, unique_items
 
         return data_structure, unique_items
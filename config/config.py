@@ -13,8 +13,27 @@ class Config:
     google_sheets_credentials_file: str = getenv("GOOGLE_SHEETS_CREDENTIALS_FILE")
     google_sheets_categories_sheet_id: int = getenv("GOOGLE_SHEETS_CATEGORIES_SHEET_ID")
     google_sheets_records_sheet_id: int = getenv("GOOGLE_SHEETS_RECORDS_SHEET_ID")
+    catalog_ttl: int = int(getenv("CATALOG_TTL", 600))
+    concurrent_updates: int = int(getenv("CONCURRENT_UPDATES", 32))
+    conversation_timeout: int = int(getenv("CONVERSATION_TIMEOUT", 3600))
+    persistence_interval: int = int(getenv("PERSISTENCE_INTERVAL", 30))
+    metrics_host: str = getenv("METRICS_HOST", "127.0.0.1")
+    metrics_port: int = int(getenv("METRICS_PORT", 9108))  # 0 отключает HTTP-сервер метрик
+    sheets_outbox_interval: int = int(getenv("SHEETS_OUTBOX_INTERVAL", 5))
+    sheets_outbox_batch_size: int = int(getenv("SHEETS_OUTBOX_BATCH_SIZE", 100))
+    archive_after_days: int = int(getenv("ARCHIVE_AFTER_DAYS", 90))  # 0 отключает перенос закрытых заявок в архив
+    archive_interval: int = int(getenv("ARCHIVE_INTERVAL", 3600))
+    archive_batch_size: int = int(getenv("ARCHIVE_BATCH_SIZE", 500))
     department_head_chat_id: list[int] = list(map(int, getenv("DEPARTMENT_HEAD_CHAT_ID").split(",")))
     finance_chat_ids: list[int] = list(map(int, getenv("FINANCE_CHAT_IDS").split(",")))
     payers_chat_ids: list[int] = list(map(int, getenv("PAYERS_CHAT_IDS").split(",")))
     developer_chat_id: list[int] = getenv("DEVELOPER_CHAT_ID")
+    bot_mode: str = getenv("BOT_MODE", "polling")  # "polling" или "webhook"
+    webhook_listen: str = getenv("WEBHOOK_LISTEN", "0.0.0.0")
+    webhook_port: int = int(getenv("WEBHOOK_PORT", 8443))
+    webhook_path: str = getenv("WEBHOOK_PATH", "")
+    webhook_url: str | None = getenv("WEBHOOK_URL") or None
+    webhook_secret_token: str | None = getenv("WEBHOOK_SECRET_TOKEN") or None
+    webhook_cert: str | None = getenv("WEBHOOK_CERT") or None
+    webhook_key: str | None = getenv("WEBHOOK_KEY") or None
     white_list: set[int] = set(map(int, getenv("WHITE_LIST").split(",")))
\ No newline at end of file
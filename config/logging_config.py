@@ -1,6 +1,14 @@
+import atexit
+import copy
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from dotenv import load_dotenv
+
+load_dotenv()
 
 LOG_LEVEL = "INFO"
 LOG_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
@@ -8,33 +16,92 @@ LOG_DIR = "./logs"
 LOG_FILE = os.path.join(LOG_DIR, "app.log")
 MAX_SIZE = 10 * 1024 * 1024
 MAX_FILES = 5
+# LOG_JSON=1 - писать в файл и консоль по одному JSON-объекту на строку
+LOG_JSON = os.getenv("LOG_JSON", "").lower() in ("1", "true", "yes")
+BOT_LOGGER = "budget_automation_bot"
 
 
-def configure_logging(max_bytes=MAX_SIZE, backup_count=MAX_FILES):
-    """Обработчик логгирования в проекте"""
-    # Создаем обработчик файлового логгера
-    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
-    file_handler.setLevel(logging.getLevelName(LOG_LEVEL))
-    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+class JsonFormatter(logging.Formatter):
+    """Запись лога одной строкой JSON: время, уровень, логгер, сообщение и, при наличии, трассировка."""
 
-    # Настраиваем корневой логгер
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.getLevelName(LOG_LEVEL))
-    root_logger.addHandler(file_handler)
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class LocalQueueHandler(QueueHandler):
+    """
+    QueueHandler для очереди внутри процесса. Стандартный prepare форматирует запись и удаляет exc_info,
+    здесь подставляются только аргументы сообщения, а трассировку форматирует обработчик в потоке QueueListener,
+    поэтому JsonFormatter выводит её в поле "exception".
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def create_handlers(
+        log_file: str = LOG_FILE, max_bytes: int = MAX_SIZE, backup_count: int = MAX_FILES, json_format: bool = LOG_JSON
+) -> list[logging.Handler]:
+    """
+    Файловый обработчик для всех логгеров и консольный - только для логгера бота.
+    Оба выполняют запись синхронно, поэтому в приложении вызываются из потока QueueListener.
+    """
+
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    formatter = JsonFormatter() if json_format else logging.Formatter(LOG_FORMAT)
+
+    file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    file_handler.setLevel(logging.getLevelName(LOG_LEVEL))
+    file_handler.setFormatter(formatter)
 
-    # Создаем потоковый обработчик для консоли
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.getLevelName(LOG_LEVEL))
-    console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    console_handler.setFormatter(formatter)
+    console_handler.addFilter(logging.Filter(BOT_LOGGER))
 
-    # Создаем глобальный логгер
-    logger = logging.getLogger("budget_automation_bot")
-    logger.setLevel(logging.getLevelName(LOG_LEVEL))
-    logger.addHandler(console_handler)
+    return [file_handler, console_handler]
 
-    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
 
-    return logger
+# Логгер бота; обработчики подключаются вызовом configure_logging при запуске приложения
+logger = logging.getLogger(BOT_LOGGER)
+_listener: QueueListener | None = None
+
+
+def configure_logging(max_bytes=MAX_SIZE, backup_count=MAX_FILES):
+    """
+    Обработчик логгирования в проекте. Логгеры только кладут записи в очередь (QueueHandler),
+    запись в файл с ротацией и вывод в консоль выполняет фоновый поток QueueListener,
+    поэтому медленный диск не останавливает цикл событий. Повторный вызов ничего не делает.
+    """
+
+    global _listener
+    if _listener is not None:
+        return logger
 
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(
+        log_queue, *create_handlers(max_bytes=max_bytes, backup_count=backup_count), respect_handler_level=True
+    )
+    listener.start()
+    _listener = listener
+    # Записи, оставшиеся в очереди, дописываются при завершении процесса
+    atexit.register(listener.stop)
 
-logger = configure_logging()
+    # Настраиваем корневой логгер
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.getLevelName(LOG_LEVEL))
+    root_logger.addHandler(LocalQueueHandler(log_queue))
+    logger.setLevel(logging.getLevelName(LOG_LEVEL))
+
+    return logger
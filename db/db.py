@@ -1,31 +1,149 @@
+import asyncio
+import json
+import sqlite3
+import time
+from collections.abc import Callable
+
 import aiosqlite
 
 from config.config import Config
 from config.logging_config import logger
 
+# Статусы заявок, которые ещё не оплачены и не отклонены
+OPEN_STATUSES = ("Not processed", "Pending", "Approved")
+_open_statuses_sql = ", ".join(f"'{status}'" for status in OPEN_STATUSES)
+# Окончательные статусы: заявка закрыта, через Config.archive_after_days она переносится в 'approvals_archive'
+CLOSED_STATUSES = ("Paid", "Rejected")
+
+# Одобрение: +1 апрув, 'Approved' при достаточном числе апрувов, иначе 'Pending'; параметры - approver дважды
+_approve_set_sql = (
+    "approvals_received = approvals_received + 1, "
+    "status = CASE WHEN approvals_received + 1 >= approvals_needed THEN 'Approved' ELSE 'Pending' END, "
+    "approved_by = CASE WHEN approved_by IS NULL OR approved_by = '' THEN ? ELSE approved_by || ', ' || ? END"
+)
+
+
+def _with_closed_at(updates: dict[str, any]) -> dict[str, any]:
+    """Добавляет к обновлениям время закрытия заявки, если она переводится в окончательный статус."""
+    if updates.get("status") in CLOSED_STATUSES:
+        return {**updates, "closed_at": time.time()}
+    return updates
+
+
+# UPDATE ... RETURNING (transition, approve, pay_and_enqueue) появился в SQLite 3.35
+MIN_SQLITE_VERSION = (3, 35)
+
+# Версия данных в PRAGMA user_version: 1 - начисления и итоги 'spend_by_month' заполнены по сохранённым заявкам
+ACCRUALS_DATA_VERSION = 1
+
+
+# Повторённый в периоде месяц даёт одну строку с суммой долей
+_insert_accrual_sql = (
+    "INSERT INTO approval_accruals (approval_id, month, amount) VALUES (?,?,?) "
+    "ON CONFLICT (approval_id, month) DO UPDATE SET amount = amount + excluded.amount"
+)
+
+# Начисления за месяцы month_from..month_to по заявкам в статусе: месяцы - по индексу approval_accruals_month,
+# статус - по первичному ключу заявки в 'approvals' или, для перенесённых заявок, в 'approvals_archive'
+ACCRUALS_BY_MONTH_SQL = (
+    "SELECT accruals.month, SUM(accruals.amount), COUNT(*) FROM approval_accruals AS accruals "
+    "WHERE accruals.month BETWEEN ? AND ? AND COALESCE("
+    "(SELECT status FROM approvals WHERE id = accruals.approval_id), "
+    "(SELECT status FROM approvals_archive WHERE id = accruals.approval_id)) = ? "
+    "GROUP BY accruals.month ORDER BY accruals.month"
+)
+
+# Начисление оплаченной заявки прибавляется к итогу месяца по группе и статье расхода
+_add_spend_sql = (
+    "INSERT INTO spend_by_month (month, expense_group, expense_item, amount, payments) VALUES (?,?,?,?,1) "
+    "ON CONFLICT (month, expense_group, expense_item) DO UPDATE SET "
+    "amount = amount + excluded.amount, payments = payments + excluded.payments"
+)
+
+APPROVAL_COLUMNS = (
+    "id",
+    "amount",
+    "expense_item",
+    "expense_group",
+    "partner",
+    "comment",
+    "period",
+    "payment_method",
+    "approvals_needed",
+    "approvals_received",
+    "status",
+    "approved_by",
+)
+# Последний столбец обеих таблиц заявок, closed_at, в словарь заявки не попадает
+_archive_columns_sql = ", ".join((*APPROVAL_COLUMNS, "closed_at"))
+# Следующий id заявки: id перенесённых в архив заявок не используются повторно
+_next_id_sql = (
+    "SELECT MAX(COALESCE((SELECT MAX(id) FROM approvals), 0), COALESCE((SELECT MAX(id) FROM approvals_archive), 0))"
+)
+
 
 class ApprovalDB:
     """База данных для хранения данных о заявке"""
 
     def __init__(self):
         self.db_file = Config.database_path
+        self._conn: aiosqlite.Connection | None = None
+        self._cursor: aiosqlite.Cursor | None = None
+        self._lock = asyncio.Lock()
 
-    async def __aenter__(self) -> 'ApprovalDB':
+    async def connect(self) -> None:
+        """Открывает долгоживущее соединение с базой данных. Повторный вызов ничего не делает."""
+        if self._conn is not None:
+            return
+        if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+            raise RuntimeError(
+                f"Нужен SQLite {'.'.join(map(str, MIN_SQLITE_VERSION))} или новее, установлен {sqlite3.sqlite_version}"
+            )
         self._conn = await aiosqlite.connect(self.db_file)
+        await self._conn.execute("PRAGMA journal_mode=WAL;")
+        await self._conn.execute("PRAGMA synchronous=NORMAL;")
         self._cursor = await self._conn.cursor()
         logger.info("Connected to database.")
+
+    async def close(self) -> None:
+        """Закрывает соединение с базой данных при остановке приложения."""
+        if self._conn is None:
+            return
+        async with self._lock:
+            await self._conn.close()
+            self._conn, self._cursor = None, None
+        logger.info("Disconnected from database.")
+
+    async def __aenter__(self) -> 'ApprovalDB':
+        """
+        Захватывает общее соединение на время одной операции.
+        Соединение открывается один раз и переиспользуется, блоки `async with db` выполняются по очереди.
+        """
+        await self._lock.acquire()
+        try:
+            await self.connect()
+        except Exception:
+            self._lock.release()
+            raise
         return self
 
     async def __aexit__(self, exc_type: any, exc_val: any, exc_tb: any) -> bool:
-        if exc_type:
-            logger.error(f"Произошла ошибка: {exc_type}; {exc_val}; {exc_tb}")
-        if self._conn:
-            await self._conn.close()
-            logger.info("Disconnected from database.")
-        return True
+        try:
+            if exc_type:
+                logger.error("Произошла ошибка: %s; %s; %s", exc_type, exc_val, exc_tb)
+                await self._conn.rollback()
+            else:
+                await self._conn.commit()
+        finally:
+            self._lock.release()
+        return False
 
     async def create_table(self) -> None:
-        """Создает таблицу 'approvals', если она еще не существует."""
+        """
+        Создает таблицы 'approvals', 'approvals_archive', 'approval_accruals', 'spend_by_month', 'sheets_outbox',
+        'sheets_outbox_dead' и таблицы хранения диалогов, если они еще не существуют. Начисления уже сохранённых заявок
+        заполняются отдельно, методом migrate_accruals.
+        """
         async with self:
             await self._cursor.execute(
                 'SELECT name FROM sqlite_master WHERE type="table" AND name="approvals";'
@@ -47,7 +165,8 @@ class ApprovalDB:
                                                    approvals_needed INTEGER, 
                                                    approvals_received INTEGER,
                                                    status TEXT,
-                                                   approved_by TEXT)"""
+                                                   approved_by TEXT,
+                                                   closed_at REAL)"""
                     )
                     await self._conn.commit()
                     logger.info("Таблица 'approvals' создана.")
@@ -56,83 +175,269 @@ class ApprovalDB:
             else:
                 logger.info("Таблица 'approvals' уже существует.")
 
+            await self._cursor.execute(
+                """CREATE TABLE IF NOT EXISTS sheets_outbox
+                                          (id INTEGER PRIMARY KEY,
+                                           approval_id INTEGER,
+                                           payload TEXT,
+                                           attempts INTEGER NOT NULL DEFAULT 0,
+                                           next_attempt_at REAL NOT NULL)"""
+            )
+            await self._cursor.execute(
+                "CREATE INDEX IF NOT EXISTS sheets_outbox_next_attempt_at ON sheets_outbox (next_attempt_at)"
+            )
+            # Записи очереди, по которым нельзя построить строки листа: не выгружаются, ждут ручного разбора
+            await self._cursor.execute(
+                """CREATE TABLE IF NOT EXISTS sheets_outbox_dead
+                                          (id INTEGER PRIMARY KEY,
+                                           approval_id INTEGER,
+                                           payload TEXT,
+                                           error TEXT,
+                                           failed_at REAL NOT NULL)"""
+            )
+            # Состояние диалогов и user_data/chat_data для SQLitePersistence
+            await self._cursor.execute(
+                """CREATE TABLE IF NOT EXISTS persistence_data
+                                          (kind TEXT NOT NULL,
+                                           id INTEGER NOT NULL,
+                                           data TEXT NOT NULL,
+                                           PRIMARY KEY (kind, id))"""
+            )
+            await self._cursor.execute(
+                """CREATE TABLE IF NOT EXISTS persistence_conversations
+                                          (name TEXT NOT NULL,
+                                           key TEXT NOT NULL,
+                                           state TEXT NOT NULL,
+                                           PRIMARY KEY (name, key))"""
+            )
+            # Частичный индекс по статусу: id только открытых заявок, постраничный вывод идёт по нему без сортировки
+            await self._cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS approvals_open_status ON approvals (id) "
+                f"WHERE status IN ({_open_statuses_sql})"
+            )
+            await self._create_archive_table()
+            await self._create_accruals_table()
+            await self._create_spend_table()
+            await self._conn.commit()
+
+    async def _create_archive_table(self) -> None:
+        """
+        Архив закрытых заявок 'approvals_archive' с теми же столбцами, что и 'approvals', и время закрытия
+        заявки closed_at. Заявкам, закрытым до появления столбца, проставляется 0 - они старше любого срока.
+        """
+        result = await self._cursor.execute("SELECT name FROM pragma_table_info('approvals') WHERE name = 'closed_at'")
+        if not await result.fetchone():
+            await self._cursor.execute("ALTER TABLE approvals ADD COLUMN closed_at REAL")
+            await self._cursor.execute(
+                "UPDATE approvals SET closed_at = 0 WHERE status IN ({})".format(
+                    ", ".join(f"'{status}'" for status in CLOSED_STATUSES)
+                )
+            )
+            logger.info(f"В таблицу 'approvals' добавлен столбец closed_at, закрытых заявок: {self._cursor.rowcount}.")
+        # closed_at есть только у закрытых заявок, индекс по нему не содержит открытых
+        await self._cursor.execute(
+            "CREATE INDEX IF NOT EXISTS approvals_closed_at ON approvals (closed_at) WHERE closed_at IS NOT NULL"
+        )
+        await self._cursor.execute(
+            """CREATE TABLE IF NOT EXISTS approvals_archive
+                                      (id INTEGER PRIMARY KEY,
+                                       amount REAL,
+                                       expense_item TEXT,
+                                       expense_group TEXT,
+                                       partner TEXT,
+                                       comment TEXT,
+                                       period TEXT,
+                                       payment_method TEXT,
+                                       approvals_needed INTEGER,
+                                       approvals_received INTEGER,
+                                       status TEXT,
+                                       approved_by TEXT,
+                                       closed_at REAL)"""
+        )
+
+    async def _create_accruals_table(self) -> None:
+        """
+        Таблица месяцев начисления: строка на заявку и месяц (yyyymm) с долей суммы.
+        Первичный ключ служит для выборки по заявке при оплате, индекс по месяцу - для выборки по месяцам.
+        """
+        await self._cursor.execute(
+            """CREATE TABLE IF NOT EXISTS approval_accruals
+                                      (approval_id INTEGER NOT NULL,
+                                       month INTEGER NOT NULL,
+                                       amount REAL NOT NULL,
+                                       PRIMARY KEY (approval_id, month)) WITHOUT ROWID"""
+        )
+        await self._cursor.execute(
+            "CREATE INDEX IF NOT EXISTS approval_accruals_month ON approval_accruals (month, approval_id)"
+        )
+
+    async def _create_spend_table(self) -> None:
+        """
+        Итоги оплаченных заявок: сумма и число начислений на месяц, группу и статью расхода.
+        Пополняется при оплате заявки (pay_and_enqueue), поэтому отчёт за период читает только строки результата.
+        """
+        await self._cursor.execute(
+            """CREATE TABLE IF NOT EXISTS spend_by_month
+                                      (month INTEGER NOT NULL,
+                                       expense_group TEXT NOT NULL,
+                                       expense_item TEXT NOT NULL,
+                                       amount REAL NOT NULL,
+                                       payments INTEGER NOT NULL,
+                                       PRIMARY KEY (month, expense_group, expense_item)) WITHOUT ROWID"""
+        )
 
-    async def insert_record(self, record: dict[str, any]) -> int:
+    async def migrate_accruals(self, split_accruals: Callable[[str, float], list[tuple[int, float]]]) -> None:
+        """
+        Однократное заполнение 'approval_accruals' по заявкам, сохранённым до её появления, и пересчёт итогов
+        'spend_by_month' по оплаченным заявкам. Разбиение периода на месяцы передаёт вызывающий код
+        (budget_bot.accruals.split_accruals); заявки с неверным периодом пропускаются.
+        Выполненный перенос отмечается в PRAGMA user_version.
         """
-        Добавляет новую запись в таблицу 'approvals'.
+        result = await self._cursor.execute("PRAGMA user_version")
+        (version,) = await result.fetchone()
+        if version >= ACCRUALS_DATA_VERSION:
+            return
+
+        try:
+            rows, skipped = [], 0
+            result = await self._cursor.execute(
+                "SELECT id, amount, period FROM approvals "
+                "WHERE NOT EXISTS (SELECT 1 FROM approval_accruals WHERE approval_id = approvals.id)"
+            )
+            for approval_id, amount, period in await result.fetchall():
+                try:
+                    rows.extend((approval_id, month, share) for month, share in split_accruals(period or "", amount))
+                except (ValueError, ArithmeticError):
+                    skipped += 1
+            await self._cursor.executemany(_insert_accrual_sql, rows)
+
+            await self._cursor.execute("DELETE FROM spend_by_month")
+            await self._cursor.execute(
+                "INSERT INTO spend_by_month (month, expense_group, expense_item, amount, payments) "
+                "SELECT accruals.month, COALESCE(paid.expense_group, ''), COALESCE(paid.expense_item, ''), "
+                "SUM(accruals.amount), COUNT(*) FROM approval_accruals AS accruals "
+                "JOIN (SELECT id, expense_group, expense_item FROM approvals WHERE status = 'Paid' UNION ALL "
+                "SELECT id, expense_group, expense_item FROM approvals_archive WHERE status = 'Paid') AS paid "
+                "ON paid.id = accruals.approval_id GROUP BY 1, 2, 3"
+            )
+            totals = self._cursor.rowcount
+            await self._cursor.execute(f"PRAGMA user_version = {ACCRUALS_DATA_VERSION}")
+            await self._conn.commit()
+        except Exception as e:
+            await self._conn.rollback()
+            raise RuntimeError(f"Не удалось заполнить начисления сохранённых заявок: {e}")
+
+        logger.info(
+            f"Начисления сохранённых заявок заполнены: строк {len(rows)}, пропущено заявок {skipped}, "
+            f"строк итогов {totals}."
+        )
+
+    async def insert_record(self, record: dict[str, any], accruals: list[tuple[int, float]]) -> int:
+        """
+        Добавляет новую запись в таблицу 'approvals' и её начисления в 'approval_accruals'.
 
         Args:
             record (dict[str, any]): Словарь с данными для вставки.
+            accruals (list[tuple[int, float]]): Месяцы начисления (yyyymm) и доли суммы,
+                см. budget_bot.accruals.record_accruals.
 
         Returns:
             int: ID вставленной записи.
         """
         try:
+            result = await self._cursor.execute(_next_id_sql)
+            (last_id,) = await result.fetchone()
+            approval_id = last_id + 1
             await self._cursor.execute(
-                "INSERT INTO approvals (amount, expense_item, expense_group, partner, comment, period, payment_method,"
-                "approvals_needed, approvals_received, status, approved_by) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
-                list(record.values()),
+                "INSERT INTO approvals (id, amount, expense_item, expense_group, partner, comment, period,"
+                "payment_method, approvals_needed, approvals_received, status, approved_by) "
+                "VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+                [approval_id, *record.values()],
+            )
+            await self._cursor.executemany(
+                _insert_accrual_sql, [(approval_id, month, share) for month, share in accruals]
             )
             await self._conn.commit()
             logger.info("Запись добавлена успешно.")
-            return self._cursor.lastrowid
+            return approval_id
         except Exception as e:
+            await self._conn.rollback()
             raise RuntimeError(f"Не удалось добавить запись: {e}")
 
+    async def insert_records(
+            self, records: list[dict[str, any]], accruals: list[list[tuple[int, float]]]
+    ) -> list[int]:
+        """
+        Добавляет пакет записей в таблицу 'approvals' одним executemany в одной транзакции,
+        accruals - начисления каждой записи в том же порядке.
+        Записям присваиваются идущие подряд id, следующие за максимальным (с учётом архива); возвращает их по порядку.
+        """
+        try:
+            result = await self._cursor.execute(_next_id_sql)
+            (last_id,) = await result.fetchone()
+            ids = list(range(last_id + 1, last_id + 1 + len(records)))
+            await self._cursor.executemany(
+                "INSERT INTO approvals (id, amount, expense_item, expense_group, partner, comment, period,"
+                "payment_method, approvals_needed, approvals_received, status, approved_by) "
+                "VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+                [(approval_id, *record.values()) for approval_id, record in zip(ids, records)],
+            )
+            await self._cursor.executemany(
+                _insert_accrual_sql,
+                [
+                    (approval_id, month, share)
+                    for approval_id, record_accruals in zip(ids, accruals)
+                    for month, share in record_accruals
+                ],
+            )
+            await self._conn.commit()
+            logger.info("Добавлено записей: %d.", len(ids))
+            return ids
+        except Exception as e:
+            await self._conn.rollback()
+            raise RuntimeError(f"Не удалось добавить записи: {e}")
+
     async def get_row_by_id(self, row_id: int) -> dict[str, any] | None:
-        """Получаем словарь из названий и значений столбцов по id"""
+        """
+        Получаем словарь из названий и значений столбцов по id; перенесённая в архив заявка ищется в архиве.
+        Архивные заявки доступны только для чтения: transition и approve меняют только 'approvals',
+        поэтому для них заявка из архива считается уже обработанной.
+        """
         try:
             result = await self._cursor.execute(
                 "SELECT * FROM approvals WHERE id=?", (row_id,)
             )
             row = await result.fetchone()
+            if row is None:
+                result = await self._cursor.execute("SELECT * FROM approvals_archive WHERE id=?", (row_id,))
+                row = await result.fetchone()
             if row is None:
                 return None
             logger.info("Данные строки получены успешно")
-            return dict(
-                zip(
-                    (
-                        "id",
-                        "amount",
-                        "expense_item",
-                        "expense_group",
-                        "partner",
-                        "comment",
-                        "period",
-                        "payment_method",
-                        "approvals_needed",
-                        "approvals_received",
-                        "status",
-                        "approved_by",
-                    ),
-                    row,
-                )
-            )
+            return dict(zip(APPROVAL_COLUMNS, row))
         except Exception as e:
             raise RuntimeError(f"Не удалось получить запись: {e}")
 
-    async def update_row_by_id(self, row_id: int, updates: dict[str, any]) -> None:
-        """Функция меняет значения столбцов.
-        :param принимает id строки row_id и словарь updates из названий и значений столбцов"""
-        try:
-            await self._cursor.execute(
-                "UPDATE approvals SET {} WHERE id = ?".format(
-                    ", ".join([f"{key} = ?" for key in updates.keys()])
-                ),
-                list(updates.values()) + [row_id],
-            )
-            await self._conn.commit()
-            logger.info("Запись обновлена успешно.")
-        except Exception as e:
-            raise RuntimeError(f"Не удалось обновить запись: {e}. ID заявки: {row_id}, Обновления: {updates}")
-
-    async def find_not_paid(self) -> list[dict[str, str]]:
-        """Функция возвращает все данные по всем неоплаченным заявкам на платёж"""
+    async def find_not_paid(
+            self, after_id: int = 0, before_id: int | None = None, limit: int = 10
+    ) -> list[dict[str, str]]:
+        """
+        Функция возвращает страницу неоплаченных заявок на платёж, упорядоченных по id:
+        до limit заявок с id больше after_id или, если указан before_id, до limit заявок перед ним.
+        """
         try:
-            result = await self._cursor.execute(
-                "SELECT * FROM approvals WHERE status != ? AND status != ?",
-                ("Paid", "Rejected"),
-            )
+            if before_id is None:
+                result = await self._cursor.execute(
+                    f"SELECT * FROM approvals WHERE status IN ({_open_statuses_sql}) AND id > ? "
+                    "ORDER BY id LIMIT ?",
+                    (after_id, limit),
+                )
+            else:
+                result = await self._cursor.execute(
+                    f"SELECT * FROM (SELECT * FROM approvals WHERE status IN ({_open_statuses_sql}) AND id < ? "
+                    "ORDER BY id DESC LIMIT ?) ORDER BY id",
+                    (before_id, limit),
+                )
             rows = await result.fetchall()
             if not rows:
                 return []
@@ -161,4 +466,352 @@ class ApprovalDB:
                 for row in rows
             ]
         except Exception as e:
-            raise RuntimeError(f"Не удалось получить записи: {e}")
\ No newline at end of file
+            raise RuntimeError(f"Не удалось получить записи: {e}")
+
+    async def transition(
+            self, row_id: int, expected_status: str | tuple[str, ...], updates: dict[str, any]
+    ) -> dict[str, any] | None:
+        """
+        Атомарный переход заявки: обновление выполняется одним запросом UPDATE ... RETURNING и только если
+        заявка находится в статусе expected_status (или одном из них). Возвращает обновлённую заявку
+        или None, если её статус уже изменился, например, после одновременного нажатия другим пользователем.
+        """
+        expected = (expected_status,) if isinstance(expected_status, str) else tuple(expected_status)
+        updates = _with_closed_at(updates)
+        try:
+            result = await self._cursor.execute(
+                "UPDATE approvals SET {} WHERE id = ? AND status IN ({}) RETURNING *".format(
+                    ", ".join([f"{key} = ?" for key in updates.keys()]),
+                    ", ".join("?" * len(expected)),
+                ),
+                list(updates.values()) + [row_id, *expected],
+            )
+            row = await result.fetchone()
+            await self._conn.commit()
+        except Exception as e:
+            raise RuntimeError(f"Не удалось обновить запись: {e}. ID заявки: {row_id}, Обновления: {updates}")
+
+        if row is None:
+            logger.warning("Заявка %s не в статусе %s, переход отклонён.", row_id, expected)
+            return None
+        return dict(zip(APPROVAL_COLUMNS, row))
+
+    async def approve(self, row_id: int, expected_status: str, approver: str) -> dict[str, any] | None:
+        """
+        Атомарное одобрение заявки из статуса expected_status: увеличивает число апрувов, дописывает approver
+        в 'approved_by' и переводит заявку в 'Approved', если апрувов достаточно, иначе в 'Pending'.
+        Возвращает обновлённую заявку или None, если её статус уже изменился.
+        """
+        try:
+            result = await self._cursor.execute(
+                f"UPDATE approvals SET {_approve_set_sql} WHERE id = ? AND status = ? RETURNING *",
+                (approver, approver, row_id, expected_status),
+            )
+            row = await result.fetchone()
+            await self._conn.commit()
+        except Exception as e:
+            raise RuntimeError(f"Не удалось одобрить заявку {row_id}: {e}")
+
+        if row is None:
+            logger.warning("Заявка %s не в статусе %s, одобрение отклонено.", row_id, expected_status)
+            return None
+        return dict(zip(APPROVAL_COLUMNS, row))
+
+    async def _update_returning(
+            self, set_sql: str, set_params: list, where_sql: str, where_params: list
+    ) -> list[dict[str, any]]:
+        """Один UPDATE ... RETURNING по условию where_sql; возвращает обновлённые заявки по возрастанию id."""
+        result = await self._cursor.execute(
+            f"UPDATE approvals SET {set_sql} WHERE {where_sql} RETURNING *", set_params + where_params
+        )
+        rows = await result.fetchall()
+        await self._conn.commit()
+        return sorted((dict(zip(APPROVAL_COLUMNS, row)) for row in rows), key=lambda record: record["id"])
+
+    async def transition_range(
+            self, first_id: int, last_id: int, expected_status: str, updates: dict[str, any]
+    ) -> list[dict[str, any]]:
+        """
+        Переход одним запросом всех заявок с id от first_id до last_id, находящихся в статусе expected_status.
+        Возвращает обновлённые заявки; заявки в другом статусе не изменяются.
+        """
+        updates = _with_closed_at(updates)
+        try:
+            return await self._update_returning(
+                ", ".join([f"{key} = ?" for key in updates.keys()]),
+                list(updates.values()),
+                "id BETWEEN ? AND ? AND status = ?",
+                [first_id, last_id, expected_status],
+            )
+        except Exception as e:
+            raise RuntimeError(f"Не удалось обновить заявки {first_id}-{last_id}: {e}. Обновления: {updates}")
+
+    async def transition_many(
+            self, row_ids: list[int], expected_status: str, updates: dict[str, any]
+    ) -> list[dict[str, any]]:
+        """
+        Переход одним запросом выбранных заявок row_ids, находящихся в статусе expected_status.
+        Возвращает обновлённые заявки; заявки в другом статусе не изменяются.
+        """
+        updates = _with_closed_at(updates)
+        try:
+            return await self._update_returning(
+                ", ".join([f"{key} = ?" for key in updates.keys()]),
+                list(updates.values()),
+                "id IN (SELECT value FROM json_each(?)) AND status = ?",
+                [json.dumps(row_ids), expected_status],
+            )
+        except Exception as e:
+            raise RuntimeError(f"Не удалось обновить заявки {row_ids}: {e}. Обновления: {updates}")
+
+    async def approve_range(
+            self, first_id: int, last_id: int, expected_status: str, approver: str
+    ) -> list[dict[str, any]]:
+        """
+        Одобрение одним запросом всех заявок с id от first_id до last_id в статусе expected_status,
+        по тем же правилам, что и approve. Возвращает обновлённые заявки.
+        """
+        try:
+            return await self._update_returning(
+                _approve_set_sql,
+                [approver, approver],
+                "id BETWEEN ? AND ? AND status = ?",
+                [first_id, last_id, expected_status],
+            )
+        except Exception as e:
+            raise RuntimeError(f"Не удалось одобрить заявки {first_id}-{last_id}: {e}")
+
+    async def approve_many(self, row_ids: list[int], expected_status: str, approver: str) -> list[dict[str, any]]:
+        """
+        Одобрение одним запросом выбранных заявок row_ids в статусе expected_status,
+        по тем же правилам, что и approve. Возвращает обновлённые заявки.
+        """
+        try:
+            return await self._update_returning(
+                _approve_set_sql,
+                [approver, approver],
+                "id IN (SELECT value FROM json_each(?)) AND status = ?",
+                [json.dumps(row_ids), expected_status],
+            )
+        except Exception as e:
+            raise RuntimeError(f"Не удалось одобрить заявки {row_ids}: {e}")
+
+    async def find_by_status(
+            self, status: str, after_id: int = 0, before_id: int | None = None, limit: int = 10
+    ) -> list[dict[str, any]]:
+        """
+        Страница заявок в открытом статусе status, упорядоченных по id: до limit заявок с id больше after_id
+        или, если указан before_id, до limit заявок перед ним. Условие по OPEN_STATUSES позволяет
+        использовать частичный индекс approvals_open_status.
+        """
+        try:
+            if before_id is None:
+                result = await self._cursor.execute(
+                    f"SELECT * FROM approvals WHERE status = ? AND status IN ({_open_statuses_sql}) AND id > ? "
+                    "ORDER BY id LIMIT ?",
+                    (status, after_id, limit),
+                )
+            else:
+                result = await self._cursor.execute(
+                    f"SELECT * FROM (SELECT * FROM approvals WHERE status = ? AND status IN ({_open_statuses_sql}) "
+                    "AND id < ? ORDER BY id DESC LIMIT ?) ORDER BY id",
+                    (status, before_id, limit),
+                )
+            return [dict(zip(APPROVAL_COLUMNS, row)) for row in await result.fetchall()]
+        except Exception as e:
+            raise RuntimeError(f"Не удалось получить заявки в статусе {status}: {e}")
+
+    async def accruals_by_month(
+            self, month_from: int, month_to: int, status: str = "Paid"
+    ) -> list[tuple[int, float, int]]:
+        """
+        Начисления по месяцам с month_from по month_to включительно (yyyymm) по заявкам в статусе status:
+        список (месяц, сумма, число заявок).
+        """
+        try:
+            result = await self._cursor.execute(ACCRUALS_BY_MONTH_SQL, (month_from, month_to, status))
+            return [tuple(row) for row in await result.fetchall()]
+        except Exception as e:
+            raise RuntimeError(f"Не удалось получить начисления за {month_from}-{month_to}: {e}")
+
+    async def spend_report(self, month_from: int, month_to: int) -> list[tuple[int, str, str, float, int]]:
+        """
+        Итоги оплаченных заявок с month_from по month_to включительно (yyyymm) из таблицы 'spend_by_month':
+        список (месяц, группа, статья, сумма, число начислений), упорядоченный по месяцу, группе и статье.
+        """
+        try:
+            result = await self._cursor.execute(
+                "SELECT month, expense_group, expense_item, amount, payments FROM spend_by_month "
+                "WHERE month BETWEEN ? AND ? ORDER BY month, expense_group, expense_item",
+                (month_from, month_to),
+            )
+            return [tuple(row) for row in await result.fetchall()]
+        except Exception as e:
+            raise RuntimeError(f"Не удалось получить отчёт за {month_from}-{month_to}: {e}")
+
+    async def pay_and_enqueue(self, row_id: int, paid_date: str) -> dict[str, any] | None:
+        """
+        Одной транзакцией переводит одобренную заявку в статус 'Paid', добавляет её начисления к итогам
+        'spend_by_month' и ставит данные платежа в очередь 'sheets_outbox' на выгрузку в Google Sheets.
+        Возвращает оплаченную заявку или None, если заявка не в статусе 'Approved'.
+        """
+        try:
+            result = await self._cursor.execute(
+                "UPDATE approvals SET status = ?, closed_at = ? WHERE id = ? AND status = ? RETURNING *",
+                ("Paid", time.time(), row_id, "Approved"),
+            )
+            row = await result.fetchone()
+            if row is None:
+                await self._conn.rollback()
+                logger.warning("Заявка %s не в статусе 'Approved', оплата отклонена.", row_id)
+                return None
+
+            record = dict(zip(APPROVAL_COLUMNS, row))
+            result = await self._cursor.execute(
+                "SELECT month, amount FROM approval_accruals WHERE approval_id = ? ORDER BY month", (row_id,)
+            )
+            accruals = [list(row) for row in await result.fetchall()]
+            await self._cursor.executemany(
+                _add_spend_sql,
+                [
+                    (month, record["expense_group"] or "", record["expense_item"] or "", amount)
+                    for month, amount in accruals
+                ],
+            )
+            # Строки листа учёта строятся по уже разделённым суммам, без повторного разбора периода
+            payload = {**record, "paid_date": paid_date, "accruals": accruals}
+            await self._cursor.execute(
+                "INSERT INTO sheets_outbox (approval_id, payload, next_attempt_at) VALUES (?,?,?)",
+                (row_id, json.dumps(payload, ensure_ascii=False), time.time()),
+            )
+            await self._conn.commit()
+            logger.info("Заявка %s оплачена и поставлена в очередь на выгрузку.", row_id)
+            return record
+        except Exception as e:
+            await self._conn.rollback()
+            raise RuntimeError(f"Не удалось отметить оплату заявки {row_id}: {e}")
+
+    async def archive_closed(self, closed_before: float, limit: int) -> int:
+        """
+        Переносит в 'approvals_archive' до limit заявок, закрытых раньше closed_before (unix-время),
+        одной короткой транзакцией. Возвращает число перенесённых заявок.
+        Начисления заявок и итоги 'spend_by_month' остаются на месте: они хранятся по id заявки и месяцу.
+        """
+        try:
+            result = await self._cursor.execute(
+                "SELECT id FROM approvals WHERE closed_at < ? LIMIT ?", (closed_before, limit)
+            )
+            row_ids = json.dumps([row_id for (row_id,) in await result.fetchall()])
+            await self._cursor.execute(
+                f"INSERT INTO approvals_archive ({_archive_columns_sql}) SELECT {_archive_columns_sql} FROM approvals "
+                "WHERE id IN (SELECT value FROM json_each(?))",
+                (row_ids,),
+            )
+            await self._cursor.execute("DELETE FROM approvals WHERE id IN (SELECT value FROM json_each(?))", (row_ids,))
+            moved = self._cursor.rowcount
+            await self._conn.commit()
+            return moved
+        except Exception as e:
+            await self._conn.rollback()
+            raise RuntimeError(f"Не удалось перенести закрытые заявки в архив: {e}")
+
+    async def get_outbox_batch(self, limit: int) -> list[tuple[int, dict[str, any], int]]:
+        """Возвращает до limit записей очереди, срок выгрузки которых наступил: (id, данные платежа, попытки)."""
+        try:
+            result = await self._cursor.execute(
+                "SELECT id, payload, attempts FROM sheets_outbox WHERE next_attempt_at <= ? "
+                "ORDER BY next_attempt_at, id LIMIT ?",
+                (time.time(), limit),
+            )
+            rows = await result.fetchall()
+            return [(entry_id, json.loads(payload), attempts) for entry_id, payload, attempts in rows]
+        except Exception as e:
+            raise RuntimeError(f"Не удалось получить записи очереди выгрузки: {e}")
+
+    async def delete_outbox(self, entry_ids: list[int]) -> None:
+        """Удаляет выгруженные записи из очереди."""
+        try:
+            await self._cursor.executemany(
+                "DELETE FROM sheets_outbox WHERE id = ?", [(entry_id,) for entry_id in entry_ids]
+            )
+            await self._conn.commit()
+        except Exception as e:
+            raise RuntimeError(f"Не удалось удалить записи очереди выгрузки: {e}")
+
+    async def dead_letter_outbox(self, entries: list[tuple[int, str]]) -> None:
+        """Переносит записи очереди (id, ошибка) в 'sheets_outbox_dead', откуда они больше не выгружаются."""
+        try:
+            await self._cursor.executemany(
+                "INSERT INTO sheets_outbox_dead (id, approval_id, payload, error, failed_at) "
+                "SELECT id, approval_id, payload, ?, ? FROM sheets_outbox WHERE id = ?",
+                [(error, time.time(), entry_id) for entry_id, error in entries],
+            )
+            await self._cursor.executemany(
+                "DELETE FROM sheets_outbox WHERE id = ?", [(entry_id,) for entry_id, _ in entries]
+            )
+            await self._conn.commit()
+        except Exception as e:
+            await self._conn.rollback()
+            raise RuntimeError(f"Не удалось перенести записи очереди выгрузки в 'sheets_outbox_dead': {e}")
+
+    async def postpone_outbox(self, entry_ids: list[int], delay: float) -> None:
+        """Откладывает следующую попытку выгрузки записей на delay секунд и увеличивает счётчик попыток."""
+        try:
+            await self._cursor.executemany(
+                "UPDATE sheets_outbox SET attempts = attempts + 1, next_attempt_at = ? WHERE id = ?",
+                [(time.time() + delay, entry_id) for entry_id in entry_ids],
+            )
+            await self._conn.commit()
+        except Exception as e:
+            raise RuntimeError(f"Не удалось отложить записи очереди выгрузки: {e}")
+
+    async def get_persisted_data(self, kind: str) -> dict[int, str]:
+        """Возвращает сохранённые данные вида kind ('user' или 'chat'): id пользователя или чата -> JSON."""
+        try:
+            result = await self._cursor.execute("SELECT id, data FROM persistence_data WHERE kind = ?", (kind,))
+            return dict(await result.fetchall())
+        except Exception as e:
+            raise RuntimeError(f"Не удалось получить сохранённые данные {kind}: {e}")
+
+    async def get_persisted_conversations(self, name: str) -> dict[str, str]:
+        """Возвращает сохранённые состояния диалогов обработчика name: ключ диалога (JSON) -> состояние (JSON)."""
+        try:
+            result = await self._cursor.execute(
+                "SELECT key, state FROM persistence_conversations WHERE name = ?", (name,)
+            )
+            return dict(await result.fetchall())
+        except Exception as e:
+            raise RuntimeError(f"Не удалось получить состояния диалогов {name}: {e}")
+
+    async def save_persistence(
+            self,
+            data: dict[tuple[str, int], str | None],
+            conversations: dict[tuple[str, str], str | None],
+    ) -> None:
+        """
+        Одной транзакцией записывает изменённые user_data/chat_data и состояния диалогов.
+        Значение None означает удаление записи, остальные записи вставляются или заменяются.
+        """
+        try:
+            await self._cursor.executemany(
+                "INSERT INTO persistence_data (kind, id, data) VALUES (?,?,?) "
+                "ON CONFLICT (kind, id) DO UPDATE SET data = excluded.data",
+                [(kind, entry_id, value) for (kind, entry_id), value in data.items() if value is not None],
+            )
+            await self._cursor.executemany(
+                "DELETE FROM persistence_data WHERE kind = ? AND id = ?",
+                [key for key, value in data.items() if value is None],
+            )
+            await self._cursor.executemany(
+                "INSERT INTO persistence_conversations (name, key, state) VALUES (?,?,?) "
+                "ON CONFLICT (name, key) DO UPDATE SET state = excluded.state",
+                [(name, key, value) for (name, key), value in conversations.items() if value is not None],
+            )
+            await self._cursor.executemany(
+                "DELETE FROM persistence_conversations WHERE name = ? AND key = ?",
+                [key for key, value in conversations.items() if value is None],
+            )
+            await self._conn.commit()
+        except Exception as e:
+            await self._conn.rollback()
+            raise RuntimeError(f"Не удалось сохранить состояние диалогов: {e}")